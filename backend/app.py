@@ -1,21 +1,68 @@
+# Standard library
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from io import BytesIO
+
 # Third-party
-from fastapi import FastAPI, UploadFile, Form, File, HTTPException
+from fastapi import FastAPI, UploadFile, Form, File, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 # Local modules
-from src.ocr import extract_text_via_ocr
+from src.ocr import extract_text_via_ocr, shutdown_local_ocr
+from src.bcbp import read_boarding_pass_barcode, bcbp_to_text
 from src.nlp import extract_location_info
-from src.gemma import call_gemma, extract_keywords_from_preferences
+from src.gemma import call_gemma_async, stream_gemma, extract_keywords_from_preferences
 from config.prompts import (
     build_fallback_prompt,
     build_live_itinerary_prompt,
     build_user_query_prompt
 )
-from src.searx import search_searx
+from src.searx import search_searx, search_searx_many
+from src.clients import open_clients, close_clients
+from src.pipeline import StageGraph
+from src.matcher import PhraseMatcher
+from src.enrich import enrich_results
+from src.itineraries import save_itinerary, get_itinerary
+from src.sessions import SESSION_STORE, SESSION_TTL, SESSION_HEADER, SESSION_COOKIE, resolve_session_id
+from src.memory import (
+    remember_turn,
+    load_chat_summary,
+    memory_turns,
+    fold_chat_memory,
+    HISTORY_TOKEN_BUDGET,
+    ANSWER_MAX_TOKENS
+)
+from src.artifacts import artifact_inputs, artifact_key, get_artifact
+from src.metrics import ServerTimingMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics, span
+from src.profiler import (
+    PROFILER_ENABLED, TOKEN_HEADER as PROFILE_TOKEN_HEADER, ProfilerMiddleware,
+    authorized as profiler_authorized, start_window, list_profiles, get_profile
+)
+from src.logger import get_logger
 
 
-app = FastAPI()
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens the shared upstream HTTP clients on startup and releases them (and the
+    local OCR worker pool) on shutdown.
+    """
+    open_clients(["gemma", "searx", "ocr_space", "azure_ocr"])
+    yield
+    await close_clients()
+    shutdown_local_ocr()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,7 +70,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware)
+if PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
 
 class TextInput(BaseModel):
     """Input model for parsed OCR text."""
@@ -33,17 +84,244 @@ class TextInput(BaseModel):
 class AskRequest(BaseModel):
     user_query: str
 
-last_context = {
-    "city": None,
-    "airport": None,
-    "arrival_time": None,
-    "arrival_date": None
+# Preference phrases that switch off a section of the itinerary
+EXCLUSION_PHRASES = {
+    # Rentals - Detect if user has a car or doesn't need rental
+    "skip_rentals": [
+        "have a car","has a car", "own car", "my car", "rented a car", "already have car",
+        "don't need rental", "rental not needed", "rental sorted", "car sorted",
+        "bringing my own car", "using personal car", "self-driving", "car arranged"
+    ],
+    # Hotels - Detect if user has accommodation
+    "skip_hotels": [
+        "have accommodation", "hotel is booked", "already booked hotel",
+        "no hotel", "don't need hotel", "staying at", "staying with",
+        "place to stay", "friend's place", "airbnb", "lodging sorted",
+        "arranged stay", "accommodation sorted", "sleeping at relative's",
+        "guesthouse booked", "residence arranged", "living with someone"
+    ],
+    # Restaurants - Detect if user doesn't want food suggestions
+    "skip_restaurants": [
+        "no food", "skip meals", "don't want restaurants", "bring my own food",
+        "meals are sorted", "eating at hotel", "already have food", "eating with family",
+        "self-catering", "meal plan included", "staying with someone who'll feed me",
+        "homemade meals", "not interested in dining out", "food taken care of",
+        "will cook", "will order in", "on a diet", "not eating out"
+    ],
 }
+EXCLUSION_MATCHER = PhraseMatcher(EXCLUSION_PHRASES)
+
+
+def _session_id(request: Request) -> tuple[str, bool]:
+    """
+    Returns the caller's session ID (from the session header or cookie) and whether it is new.
+    """
+    return resolve_session_id(request.headers.get(SESSION_HEADER), request.cookies.get(SESSION_COOKIE))
+
+
+def _attach_session(response: Response, session_id: str, created: bool) -> None:
+    """
+    Echoes the session ID back to the client, setting the cookie for new sessions.
+    """
+    response.headers[SESSION_HEADER] = session_id
+    if created:
+        response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_TTL, httponly=True, samesite="lax")
+
+
+async def extract_trip(ticket: dict, context: dict) -> dict:
+    """
+    Extracts the trip fields from the ticket text and merges in the barcode fields.
+
+    The barcode's `flight_date` is the departure date, so it is kept as its own
+    field and never used as the arrival date.
+
+    Args:
+        ticket (dict): `text` of the ticket and the decoded `barcode` fields (or None).
+        context (dict): The session's trip context; updated in place.
+
+    Returns:
+        dict: The extracted trip fields.
+
+    Raises:
+        HTTPException: 400 if no destination was found.
+    """
+    structured_data = await extract_location_info(ticket["text"])
+    barcode = ticket["barcode"]
+    if barcode and isinstance(structured_data, dict):
+        # Barcode fields are exact, so they win over anything inferred from text
+        structured_data.update({
+            key: barcode[key]
+            for key in ("origin_code", "airport_code", "flight_number", "flight_date")
+            if barcode.get(key)
+        })
+    destination = structured_data.get("destination")
+    airport = structured_data.get("airport_name") or structured_data.get("airport_code")
+    arrival_time = structured_data.get("arrival_time", "TBD")
+    arrival_date = structured_data.get("arrival_date", "TBD")
+
+    if destination:
+        context["city"] = destination
+    if airport:
+        context["airport"] = airport
+    if arrival_time:
+        context["arrival_time"] = arrival_time
+    if arrival_date:
+        context["arrival_date"] = arrival_date
+
+    if not destination:
+        raise HTTPException(status_code=400, detail="Destination not found in extracted data")
+    return structured_data
+
+
+async def _prepare_itinerary(file: UploadFile, preferences: str, top_k: int, session: dict, progress=None) -> dict:
+    """
+    Runs every pipeline step up to (but excluding) the final itinerary LLM call.
+
+    Shared by the blocking and the streaming itinerary endpoints. The steps run
+    as a `StageGraph`: keyword extraction only needs the preferences, so it
+    overlaps ticket reading and extraction, and each search batch starts as
+    soon as its inputs are known.
+
+    Args:
+        file (UploadFile): Image file of the boarding pass or travel ticket.
+        preferences (str): Comma-separated freeform preferences.
+        top_k (int): Number of suggestions to include per category.
+        session (dict): The caller's session state; its trip context is updated in place.
+        progress (callable, optional): Called as `progress(stage, message)` when a step starts.
+
+    Returns:
+        dict: The itinerary `prompt` plus the `city`, `origin`, `airport`,
+              `arrival_time` and per-stage `timings` (ms) returned to the client.
+    """
+    if progress is None:
+        progress = lambda stage, message: None
+
+    user_prefs = [p.strip() for p in preferences.split(",") if p.strip()]
+
+    # One scan over all preferences (phrases never span the newline separator)
+    matched = EXCLUSION_MATCHER.labels("\n".join(user_prefs))
+    exclusion_flags = {flag: flag in matched for flag in EXCLUSION_PHRASES}
+
+    async def read_ticket_text():
+        # Step 1: Boarding-pass barcode (local), falling back to OCR
+        image_data = await file.read()
+        await file.seek(0)
+        barcode = await read_boarding_pass_barcode(image_data)
+        if barcode:
+            text = bcbp_to_text(barcode)
+        else:
+            text = await extract_text_via_ocr(file)
+        if not text:
+            raise HTTPException(status_code=500, detail="OCR failed to extract text")
+        return {"text": text, "barcode": barcode}
+
+    async def trip_stage(ticket):
+        # Step 2: NLP Extraction
+        return await extract_trip(ticket, session["context"])
+
+    # Step 3: Web search (all queries fanned out concurrently)
+    multiplier = 2.5
+    search_k = int(top_k * multiplier)
+
+    async def search_categories(trip):
+        destination = trip["destination"]
+        searches = []
+
+        if not exclusion_flags["skip_restaurants"]:
+            searches.append({"query": f"best restaurants in {destination}", "tag": "restaurant", "max_results": search_k})
+            searches.append({"query": f"cheap restaurants in {destination}", "tag": "restaurant", "max_results": search_k})
+
+        if not exclusion_flags["skip_hotels"]:
+            searches.append({"query": f"best hotels in {destination}", "tag": "hotel", "max_results": search_k})
+            searches.append({"query": f"budget hotels in {destination}", "tag": "hotel", "max_results": search_k})
+
+        if not exclusion_flags["skip_rentals"]:
+            searches.append({"query": f"car rentals in {destination}", "tag": "rental", "max_results": search_k})
+
+        return [item for results in await search_searx_many(searches) for item in results]
+
+    async def extract_keywords():
+        # Only depends on the preferences, so it overlaps ticket reading and extraction
+        return await extract_keywords_from_preferences(user_prefs)
+
+    async def search_keywords(trip, keywords):
+        # Additional dynamic searches from LLM-extracted preferences
+        searches = [
+            {"query": f"{keyword} in {trip['destination']}", "tag": "general", "max_results": search_k}
+            for keyword in keywords
+        ]
+        return [item for results in await search_searx_many(searches) for item in results]
+
+    async def enrich_search_results(category_results, keyword_results):
+        # De-duplicate and annotate (price, tier, category hint) in one pass
+        return enrich_results(category_results + keyword_results)
+
+    graph = StageGraph("itinerary pipeline")
+    graph.add("ticket", read_ticket_text)
+    graph.add("keywords", extract_keywords)
+    graph.add("trip", trip_stage, deps=("ticket",))
+    graph.add("category_results", search_categories, deps=("trip",))
+    graph.add("keyword_results", search_keywords, deps=("trip", "keywords"))
+    graph.add("results", enrich_search_results, deps=("category_results", "keyword_results"))
+
+    stage_messages = {
+        "ticket": ("ocr", "Reading your ticket..."),
+        "trip": ("extraction", "Extracting trip details..."),
+    }
+
+    def on_stage_start(name):
+        if name in stage_messages:
+            progress(*stage_messages[name])
+        elif name == "category_results":
+            progress("search", f"Searching live results for {session['context']['city']}...")
+
+    results, timings = await graph.run(on_start=on_stage_start)
+    structured_data = results["trip"]
+    destination = structured_data.get("destination")
+    airport = structured_data.get("airport_name") or structured_data.get("airport_code")
+    arrival_time = structured_data.get("arrival_time", "TBD")
+    arrival_date = structured_data.get("arrival_date", "TBD")
+    search_results = results["results"]
+
+    has_results = len(search_results) > 0
+
+    with span("prompt"):
+        if has_results:
+            if exclusion_flags["skip_rentals"]:
+                user_prefs.append("Skip car rental suggestions — traveler already has a vehicle.")
+            if exclusion_flags["skip_hotels"]:
+                user_prefs.append("Skip hotel suggestions — traveler already has accommodation.")
+            if exclusion_flags["skip_restaurants"]:
+                user_prefs.append("Skip restaurant suggestions.")
+
+            prompt = build_live_itinerary_prompt(destination, arrival_time, arrival_date, search_results, user_prefs, top_k)
+        else:
+            prompt = build_fallback_prompt(destination, arrival_time, arrival_date, user_prefs, top_k)
+
+    return {
+        "prompt": prompt,
+        "city": destination,
+        "origin": structured_data.get("origin"),
+        "airport": airport,
+        "arrival_time": arrival_time,
+        "origin_code": structured_data.get("origin_code"),
+        "airport_code": structured_data.get("airport_code"),
+        "timings": {name: t["duration_ms"] for name, t in timings.items()}
+    }
+
+
+def _store_itinerary(itinerary, context: dict) -> str:
+    """
+    Persists a generated itinerary with its trip fields and returns its ID.
+    """
+    text = itinerary.get("output", "") if isinstance(itinerary, dict) else itinerary
+    return save_itinerary({"itinerary": text, **{k: v for k, v in context.items() if k != "prompt"}})
 
-chat_history = []
 
 @app.post("/display-itinerary")
 async def display_itinerary(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     preferences: str = Form(""),
     top_k: int = Form(3)
@@ -52,7 +330,7 @@ async def display_itinerary(
     Generates a personalized travel itinerary based on the uploaded ticket and user preferences.
 
     Process Flow:
-    - Performs OCR on the uploaded image to extract text.
+    - Decodes the boarding-pass barcode (BCBP) locally if present; otherwise performs OCR on the uploaded image to extract text.
     - Uses an LLM to extract structured travel information (e.g., destination, airport, arrival time/date).
     - Applies preference-based filters (e.g., skip hotels, rentals, food).
     - Performs live web searches for relevant POIs using extracted keywords and destination.
@@ -70,141 +348,211 @@ async def display_itinerary(
             - `origin` (str): Departure city.
             - `airport` (str): Destination airport name or code.
             - `arrival_time` (str): Parsed arrival time (if available).
+            - `timings` (dict): Duration of each pipeline stage in milliseconds.
+            - `itinerary_id` (str): ID for `/itinerary/{id}` and its PDF and map.
     """
+    session_id, created = _session_id(request)
+    _attach_session(response, session_id, created)
+    session = SESSION_STORE.load(session_id)
     try:
-        user_prefs = [p.strip() for p in preferences.split(",") if p.strip()]
-
-        exclusion_flags = {
-            "skip_rentals": False,
-            "skip_hotels": False,
-            "skip_restaurants": False
-        }
-
-        for pref in user_prefs:
-            lowered = pref.lower()
-            # Rentals - Detect if user has a car or doesn't need rental
-            if any(x in lowered for x in [
-                "have a car","has a car", "own car", "my car", "rented a car", "already have car", 
-                "don't need rental", "rental not needed", "rental sorted", "car sorted", 
-                "bringing my own car", "using personal car", "self-driving", "car arranged"
-            ]):
-                exclusion_flags["skip_rentals"] = True
-
-            # Hotels - Detect if user has accommodation
-            if any(x in lowered for x in [
-                "have accommodation", "hotel is booked", "already booked hotel", 
-                "no hotel", "don't need hotel", "staying at", "staying with", 
-                "place to stay", "friend's place", "airbnb", "lodging sorted", 
-                "arranged stay", "accommodation sorted", "sleeping at relative's", 
-                "guesthouse booked", "residence arranged", "living with someone"
-            ]):
-                exclusion_flags["skip_hotels"] = True
-
-            # Restaurants - Detect if user doesn't want food suggestions
-            if any(x in lowered for x in [
-                "no food", "skip meals", "don't want restaurants", "bring my own food", 
-                "meals are sorted", "eating at hotel", "already have food", "eating with family", 
-                "self-catering", "meal plan included", "staying with someone who'll feed me", 
-                "homemade meals", "not interested in dining out", "food taken care of", 
-                "will cook", "will order in", "on a diet", "not eating out"
-            ]):
-                exclusion_flags["skip_restaurants"] = True
-
-
-        # Step 1: OCR
-        text = await extract_text_via_ocr(file)
-        if not text:
-            raise HTTPException(status_code=500, detail="OCR failed to extract text")
+        context = await _prepare_itinerary(file, preferences, top_k, session)
+        SESSION_STORE.save(session_id, session)
+        itinerary_start = time.perf_counter()
+        with span("itinerary"):
+            gemma_output = await call_gemma_async(context.pop("prompt"))
+        context["timings"]["itinerary"] = round((time.perf_counter() - itinerary_start) * 1000, 1)
+        itinerary_id = _store_itinerary(gemma_output, context)
+        return {"itinerary": gemma_output, **context, "itinerary_id": itinerary_id}
 
-        # Step 2: NLP Extraction
-        structured_data = extract_location_info(text)
-        destination = structured_data.get("destination")
-        airport = structured_data.get("airport_name") or structured_data.get("airport_code")
-        arrival_time = structured_data.get("arrival_time", "TBD")
-        arrival_date = structured_data.get("arrival_date", "TBD")
-
-
-        if destination:
-            last_context["city"] = destination
-        if airport:
-            last_context["airport"] = airport
-        if arrival_time:
-            last_context["arrival_time"] = arrival_time
-        if arrival_date:
-            last_context["arrival_date"] = arrival_date
-
-        if not destination:
-            raise HTTPException(status_code=400, detail="Destination not found in extracted data")
-
-        # Step 3: Web search
-        search_results = []
-        multiplier = 2.5
-        search_k = int(top_k * multiplier)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if not exclusion_flags["skip_restaurants"]:
-            search_results += search_searx(f"best restaurants in {destination}", tag="restaurant", max_results=search_k)
-            search_results += search_searx(f"cheap restaurants in {destination}", tag="restaurant", max_results=search_k)
 
-        if not exclusion_flags["skip_hotels"]:
-            search_results += search_searx(f"best hotels in {destination}", tag="hotel", max_results=search_k)
-            search_results += search_searx(f"budget hotels in {destination}", tag="hotel", max_results=search_k)
 
-        if not exclusion_flags["skip_rentals"]:
-            search_results += search_searx(f"car rentals in {destination}", tag="rental", max_results=search_k)
+@app.post("/display-itinerary/stream")
+async def display_itinerary_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    preferences: str = Form(""),
+    top_k: int = Form(3)
+):
+    """
+    Streaming variant of `/display-itinerary` using Server-Sent Events.
 
-        # Additional dynamic searches from LLM-extracted preferences
-        dynamic_keywords = extract_keywords_from_preferences(user_prefs)
-        for keyword in dynamic_keywords:
-            query = f"{keyword} in {destination}"
-            search_results += search_searx(query, max_results=search_k)
-            for r in search_results[-search_k:]:
-                r["category"] = "general"
+    Runs the same pipeline, reporting each step as it starts, then streams the
+    itinerary markdown from Gemma's streamGenerateContent API as it is generated.
 
+    Events:
+        - `progress`: {"stage": str, "message": str} when a pipeline step starts.
+        - `meta`: {"city", "origin", "airport", "arrival_time", ...} once the trip is known.
+        - `token`: {"text": str} for each chunk of itinerary markdown.
+        - `done`: {"itinerary_id": str} when the itinerary is complete and stored.
+        - `error`: {"status": int, "detail": str} if the pipeline fails.
 
-        # Add simple category tagging for cheap results
-        for item in search_results:
-            title = item.get("title", "").lower()
-            if "cheap" in title or "budget" in title or "affordable" in title:
-                item["category_hint"] = "cheap"
+    Args:
+        file (UploadFile): Image file of the boarding pass or travel ticket.
+        preferences (str): Comma-separated freeform preferences (e.g., "hiking, no food, own car").
+        top_k (int): Number of suggestions to include per category (used for prompt generation).
 
-        has_results = len(search_results) > 0
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+    """
+    # The upload is closed once this handler returns, so keep its bytes for the stream.
+    upload = UploadFile(file=BytesIO(await file.read()), filename=file.filename)
+    session_id, created = _session_id(request)
+    session = SESSION_STORE.load(session_id)
+
+    async def events():
+        queue = asyncio.Queue()
+        task = asyncio.create_task(_prepare_itinerary(
+            upload, preferences, top_k, session,
+            progress=lambda stage, message: queue.put_nowait({"stage": stage, "message": message})
+        ))
+
+        try:
+            while not task.done() or not queue.empty():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield _sse("progress", getter.result())
+                else:
+                    getter.cancel()
+
+            context = task.result()
+            SESSION_STORE.save(session_id, session)
+            yield _sse("meta", {k: v for k, v in context.items() if k != "prompt"})
+            yield _sse("progress", {"stage": "itinerary", "message": "Writing your itinerary..."})
+
+            chunks = []
+            with span("itinerary"):
+                async for chunk in stream_gemma(context["prompt"]):
+                    chunks.append(chunk)
+                    yield _sse("token", {"text": chunk})
+            yield _sse("done", {"itinerary_id": _store_itinerary("".join(chunks), context)})
+
+        except HTTPException as e:
+            yield _sse("error", {"status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error("Streaming itinerary failed: %s", repr(e))
+            yield _sse("error", {"status": 500, "detail": str(e)})
+        finally:
+            if not task.done():
+                task.cancel()
+
+    response = StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    _attach_session(response, session_id, created)
+    return response
 
-        if has_results:
-            if exclusion_flags["skip_rentals"]:
-                user_prefs.append("Skip car rental suggestions — traveler already has a vehicle.")
-            if exclusion_flags["skip_hotels"]:
-                user_prefs.append("Skip hotel suggestions — traveler already has accommodation.")
-            if exclusion_flags["skip_restaurants"]:
-                user_prefs.append("Skip restaurant suggestions.")
 
-            prompt = build_live_itinerary_prompt(destination, arrival_time, arrival_date, search_results, user_prefs, top_k)
-        else:
-            prompt = build_fallback_prompt(destination, arrival_time, arrival_date, user_prefs, top_k)
+def _sse(event: str, data: dict) -> str:
+    """
+    Formats a single Server-Sent Event.
+
+    Args:
+        event (str): The event name.
+        data (dict): JSON-serializable event payload.
+
+    Returns:
+        str: The encoded event, terminated by a blank line.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+
+def _stored_itinerary(itinerary_id: str) -> dict:
+    record = get_itinerary(itinerary_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Itinerary not found or expired")
+    return record
+
+
+@app.get("/itinerary/{itinerary_id}")
+async def itinerary_endpoint(itinerary_id: str):
+    """
+    Returns a stored itinerary and its trip fields.
+
+    Args:
+        itinerary_id (str): ID returned by `/display-itinerary` or the stream's `done` event.
+
+    Returns:
+        dict: `itinerary` (markdown), `city`, `origin`, `airport`, `arrival_time`, ...
+    """
+    return _stored_itinerary(itinerary_id)
 
-        gemma_output = call_gemma(prompt)
-        return {
-            "itinerary": gemma_output,
-            "city": destination,
-            "origin": structured_data.get("origin"),
-            "airport": airport,
-            "arrival_time": arrival_time
-        }
 
+async def _artifact_response(request: Request, itinerary_id: str, kind: str, media_type: str,
+                             filename: str = None) -> Response:
+    """
+    Serves a rendered artifact of a stored itinerary, honouring `If-None-Match`.
+
+    The ETag is the artifact's content address, so a client that already has
+    the current version gets a 304 without anything being rendered or read.
+    """
+    inputs = artifact_inputs(kind, _stored_itinerary(itinerary_id))
+    etag = f'"{artifact_key(kind, inputs)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
 
+    try:
+        path, _ = await get_artifact(kind, inputs)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Rendering %s for itinerary %s failed: %s", kind, itinerary_id, repr(e))
+        raise HTTPException(status_code=500, detail=f"Could not render {kind}: {e}")
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
 
 
+@app.get("/itinerary/{itinerary_id}/pdf")
+async def itinerary_pdf_endpoint(itinerary_id: str, request: Request):
+    """
+    Returns the itinerary as a branded PDF, rendered once and then served from the artifact cache.
+
+    Args:
+        itinerary_id (str): A stored itinerary ID.
+
+    Returns:
+        FileResponse: `application/pdf`, with an ETag (304 if `If-None-Match` matches).
+    """
+    record = _stored_itinerary(itinerary_id)
+    destination = (record.get("city") or "").strip()
+    safe_destination = re.sub(r'[^\w\- ]+', '', destination).replace(" ", "_").lower()
+    filename = f"travel_itinerary_{safe_destination or 'destination'}.pdf"
+    return await _artifact_response(request, itinerary_id, "pdf", "application/pdf", filename)
+
+
+@app.get("/itinerary/{itinerary_id}/map")
+async def itinerary_map_endpoint(itinerary_id: str, request: Request):
+    """
+    Returns the origin → destination route map as a standalone Folium HTML page.
+
+    Args:
+        itinerary_id (str): A stored itinerary ID.
+
+    Returns:
+        FileResponse: `text/html`, with an ETag (304 if `If-None-Match` matches).
+    """
+    return await _artifact_response(request, itinerary_id, "map", "text/html")
+
 
 @app.post("/ask")
-def ask_endpoint(req: AskRequest):
+async def ask_endpoint(req: AskRequest, request: Request, response: Response, background_tasks: BackgroundTasks):
     """
     Handles user Q&A based on previous travel context and live web search results.
 
     - Uses previous itinerary context (destination, arrival time, airport) to enhance the user's query.
     - Performs a live search using SearxNG.
     - Sends the query, search results, and chat history to Gemma for reasoning and response.
-    - Stores chat history and summarizes old messages if more than 5 interactions.
+    - Keeps the last few turns verbatim; older turns are folded into a compact
+      summary by a background LLM call after the response is sent, and the prompt
+      includes summary plus recent turns within a fixed token budget.
+
+    The itinerary context and chat history belong to the caller's session
+    (`X-Session-ID` header or `session_id` cookie), so concurrent users and
+    multiple workers do not share state.
 
     Args:
         req (AskRequest): A JSON body with a single field: `user_query` (str).
@@ -213,8 +561,14 @@ def ask_endpoint(req: AskRequest):
         dict: A response containing:
             - `answer` (str): Generated answer from Gemma.
             - `history` (list): The last 5 Q&A interactions.
-            - `summary` (str): Summary of earlier interactions (if any).
+            - `summary` (str): Rolling summary of earlier interactions (if any).
     """
+    session_id, created = _session_id(request)
+    _attach_session(response, session_id, created)
+    session = SESSION_STORE.load(session_id)
+    summary = load_chat_summary(session_id, session)
+    last_context = session["context"]
+
     user_query = req.user_query
     city = last_context.get("city")
     airport = last_context.get("airport")
@@ -227,20 +581,26 @@ def ask_endpoint(req: AskRequest):
     if airport and airport.lower() not in user_query.lower():
         enhanced_query += f" near {airport}"
 
-    search_results = search_searx(enhanced_query, max_results=6)
+    with span("search"):
+        search_results = await search_searx(enhanced_query, max_results=6)
 
     # Use existing chat history if present
-    prompt = build_user_query_prompt(
-        user_query,
-        search_results,
-        city=city,
-        airport=airport,
-        arrival_time=arrival_time,
-        arrival_date=arrival_date,
-        chat_history=chat_history
-    )
-
-    answer = call_gemma(prompt)
+    with span("prompt"):
+        prompt = build_user_query_prompt(
+            user_query,
+            search_results,
+            city=city,
+            airport=airport,
+            arrival_time=arrival_time,
+            arrival_date=arrival_date,
+            chat_history=memory_turns(session),
+            summary=summary,
+            history_token_budget=HISTORY_TOKEN_BUDGET,
+            answer_max_tokens=ANSWER_MAX_TOKENS
+        )
+
+    with span("answer"):
+        answer = await call_gemma_async(prompt)
 
     # Extract answer text
     if isinstance(answer, dict):
@@ -248,21 +608,79 @@ def ask_endpoint(req: AskRequest):
     else:
         answer_text = answer
 
-    # Store chat in memory
-    chat_history.append({"question": user_query, "answer": answer_text})
-
-    # Keep only the latest 5, summarize old ones
-    summary_blob = ""
-    if len(chat_history) > 5:
-        older = chat_history[:-5]
-        chat_history[:] = chat_history[-5:]
-
-        summary_blob = "SUMMARY OF EARLIER CONVERSATION:\n"
-        for i, chat in enumerate(older, 1):
-            summary_blob += f"{i}. Q: {chat['question']}\n   A: {chat['answer']}\n"
+    # Store chat in memory; evicted turns are summarized off the request path
+    if remember_turn(session, user_query, answer_text):
+        background_tasks.add_task(fold_chat_memory, session_id)
+    SESSION_STORE.save(session_id, session)
 
     return {
         "answer": answer_text,
-        "history": chat_history,
-        "summary": summary_blob
+        "history": session["chat_history"],
+        "summary": summary
     }
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Exposes request, pipeline-stage and upstream metrics in the Prometheus text format.
+
+    Includes latency histograms per endpoint and stage, upstream call latency,
+    status codes and payload sizes, and response-cache hit/miss counters.
+    """
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _check_profiler(request: Request) -> None:
+    """
+    Rejects profiler requests unless profiling is enabled and the token (if configured) matches.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler_authorized(request.headers.get(PROFILE_TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+
+
+@app.post("/debug/profile")
+def start_profile(request: Request, seconds: float = 30, interval_ms: float = 5):
+    """
+    Samples the whole backend process for a time window, e.g. while a load test runs.
+
+    Args:
+        seconds (float): Window length (capped by `PROFILER.max_window_seconds`).
+        interval_ms (float): Sampling interval in milliseconds.
+
+    Returns:
+        dict: The `profile_id`, downloadable from `/debug/profiles/{profile_id}` once the window ends,
+              and the window length in `seconds` after the cap.
+    """
+    _check_profiler(request)
+    window = start_window(seconds, max(interval_ms, 1) / 1000)
+    if window is None:
+        raise HTTPException(status_code=429, detail="Too many profiles running")
+    profile_id, seconds = window
+    return {"profile_id": profile_id, "seconds": seconds}
+
+
+@app.get("/debug/profiles")
+def profiles(request: Request):
+    """
+    Lists the stored profiles (per-request and window), newest first.
+    """
+    _check_profiler(request)
+    return {"profiles": list_profiles()}
+
+
+@app.get("/debug/profiles/{profile_id}")
+def download_profile(profile_id: str, request: Request):
+    """
+    Downloads a profile: collapsed stacks (`.folded`, for flamegraph.pl / speedscope)
+    for sampling profiles, or a pstats file (`.prof`) for cProfile ones.
+    """
+    _check_profiler(request)
+    found = get_profile(profile_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Profile not found or still running")
+    path, meta = found
+    media_type = "application/octet-stream" if meta["mode"] == "cprofile" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
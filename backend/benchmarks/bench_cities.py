@@ -0,0 +1,124 @@
+"""
+Compares city-name lookup latency and memory between the legacy pandas/RapidFuzz
+implementation and the memory-mapped city index.
+
+Each implementation runs in its own subprocess so load time and RSS are measured
+from a clean interpreter.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cities [--repeat 5] [--json results.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+QUERIES = [
+    "London", "Dubai", "New York", "Islamabad", "Paris", "Tokyo",
+    "londin", "dubia", "islamabd", "pariss", "new yrok", "karachee",
+    "Sao Paulo", "los angeles", "frankfurt am main", "Unknownville",
+]
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_legacy(repeat: int) -> dict:
+    from rapidfuzz import process
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    try:
+        import pandas as pd
+        city_list = pd.read_csv(os.path.join("data", "worldcities.csv"))["city"].dropna().unique().tolist()
+    except ImportError:
+        import csv
+        with open(os.path.join("data", "worldcities.csv"), newline="", encoding="utf-8") as f:
+            city_list = list(dict.fromkeys(row["city"] for row in csv.DictReader(f) if row["city"]))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    def lookup(name):
+        name = name.strip().title()
+        match = process.extractOne(name, city_list, score_cutoff=85.0)
+        return match[0] if match else name
+
+    return _measure(lookup, load_ms, baseline, repeat)
+
+
+def _run_index(repeat: int) -> dict:
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    from src import cities
+    load_ms = (time.perf_counter() - start) * 1000
+    # Measure the index itself, not the memo in front of it
+    lookup = cities.correct_city_name_dynamic
+
+    def uncached(name):
+        cities.match_city.cache_clear()
+        return lookup(name)
+
+    return _measure(uncached, load_ms, baseline, repeat)
+
+
+def _measure(lookup, load_ms: float, baseline_rss: float, repeat: int) -> dict:
+    samples = []
+    results = {}
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            results[query] = lookup(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "load_ms": round(load_ms, 2),
+        "lookup_mean_ms": round(sum(samples) / len(samples), 4),
+        "lookup_p50_ms": round(samples[len(samples) // 2], 4),
+        "lookup_p95_ms": round(samples[int(len(samples) * 0.95) - 1], 4),
+        "rss_delta_mb": round(_rss_mb() - baseline_rss, 1),
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--impl", choices=["legacy", "index"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.impl:
+        runner = _run_legacy if args.impl == "legacy" else _run_index
+        print(json.dumps(runner(args.repeat)))
+        return
+
+    report = {}
+    for impl in ("legacy", "index"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cities", "--impl", impl, "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        report[impl] = json.loads(output.strip().splitlines()[-1])
+
+    mismatches = {
+        query: (report["legacy"]["results"][query], report["index"]["results"][query])
+        for query in QUERIES
+        if report["legacy"]["results"][query] != report["index"]["results"][query]
+    }
+    print(f"{'':8} {'load ms':>10} {'mean ms':>10} {'p95 ms':>10} {'RSS MB':>8}")
+    for impl, row in report.items():
+        print(f"{impl:8} {row['load_ms']:>10} {row['lookup_mean_ms']:>10} {row['lookup_p95_ms']:>10} {row['rss_delta_mb']:>8}")
+    if mismatches:
+        print("Different answers:", mismatches)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "cities", **report, "mismatches": mismatches}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
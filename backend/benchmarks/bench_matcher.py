@@ -0,0 +1,136 @@
+"""
+Compares the compiled PhraseMatcher against the chained `in` checks it replaced,
+for price-tier cues (`guess_price_range`) and preference exclusion flags.
+
+Both implementations must agree on every input; any difference is reported.
+The "scaled" rows add 200 extra phrases per table to show how each approach
+grows with the phrase list.
+
+Usage (from backend/):
+    python -m benchmarks.bench_matcher [--repeat 2000] [--json results.json]
+"""
+import argparse
+import json
+import random
+import time
+
+from app import EXCLUSION_PHRASES
+from config.prompts import PRICE_CUES, guess_price_range
+from src.matcher import PhraseMatcher
+
+SNIPPET_WORDS = (
+    "cozy family run spot near the marina serving grilled seafood and fresh salads with views of the "
+    "old town open daily from 9am reviews mention friendly staff generous portions and quick service"
+).split()
+CUE_WORDS = ["michelin", "budget", "Bistro", "$$", "street food", "suite", "value for money", "Modern"]
+PREFERENCES = [
+    "hiking", "vegetarian", "I have a car", "staying with my aunt", "museums", "no food please",
+    "kids friendly", "Airbnb booked", "will cook", "nightlife", "self-driving trip", "spa",
+]
+
+
+def _legacy_price_range(text):
+    text = text.lower()
+    if any(cue in text for cue in PRICE_CUES["$$$"]):
+        return "$$$"
+    if any(cue in text for cue in PRICE_CUES["$$"]):
+        return "$$"
+    if any(cue in text for cue in PRICE_CUES["$"]):
+        return "$"
+    return None
+
+
+def _legacy_flags(preferences, table=EXCLUSION_PHRASES):
+    flags = {flag: False for flag in table}
+    for pref in preferences:
+        lowered = pref.lower()
+        for flag, phrases in table.items():
+            if any(x in lowered for x in phrases):
+                flags[flag] = True
+    return flags
+
+
+def _matcher_flags(matcher, table):
+    def flags(preferences):
+        matched = matcher.labels("\n".join(preferences))
+        return {flag: flag in matched for flag in table}
+    return flags
+
+
+def _scaled(table: dict, extra: int) -> dict:
+    rng = random.Random(7)
+    return {
+        label: list(phrases) + [f"{rng.choice(SNIPPET_WORDS)}zz {label}{i}" for i in range(extra)]
+        for label, phrases in table.items()
+    }
+
+
+def _snippets(count: int) -> list[str]:
+    rng = random.Random(42)
+    snippets = []
+    for _ in range(count):
+        words = rng.sample(SNIPPET_WORDS, 20)
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(len(words)), rng.choice(CUE_WORDS))
+        snippets.append(" ".join(words))
+    return snippets
+
+
+def _time(func, inputs, repeat: int) -> tuple[float, list]:
+    outputs = [func(item) for item in inputs]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6, outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    snippets = _snippets(50)
+    preference_sets = [random.Random(i).sample(PREFERENCES, 4) for i in range(20)]
+    scaled_cues = _scaled(PRICE_CUES, 200)
+    scaled_flags = _scaled(EXCLUSION_PHRASES, 200)
+    scaled_price_matcher = PhraseMatcher(scaled_cues)
+
+    def scaled_legacy_price(text):
+        text = text.lower()
+        return next((tier for tier in ("$$$", "$$", "$") if any(cue in text for cue in scaled_cues[tier])), None)
+
+    cases = {
+        "price": (snippets, _legacy_price_range, guess_price_range),
+        "price_scaled": (snippets, scaled_legacy_price, lambda t: scaled_price_matcher.first(t, ("$$$", "$$", "$"))),
+        "flags": (preference_sets, _legacy_flags, _matcher_flags(PhraseMatcher(EXCLUSION_PHRASES), EXCLUSION_PHRASES)),
+        "flags_scaled": (
+            preference_sets,
+            lambda prefs: _legacy_flags(prefs, scaled_flags),
+            _matcher_flags(PhraseMatcher(scaled_flags), scaled_flags),
+        ),
+    }
+
+    report = {}
+    print(f"{'':14} {'legacy us':>10} {'matcher us':>11} {'speedup':>8} {'mismatches':>11}")
+    for name, (inputs, legacy, matcher) in cases.items():
+        legacy_us, legacy_out = _time(legacy, inputs, args.repeat)
+        matcher_us, matcher_out = _time(matcher, inputs, args.repeat)
+        mismatches = sum(a != b for a, b in zip(legacy_out, matcher_out))
+        report[name] = {
+            "legacy_us": round(legacy_us, 3),
+            "matcher_us": round(matcher_us, 3),
+            "speedup": round(legacy_us / matcher_us, 2),
+            "mismatches": mismatches,
+        }
+        row = report[name]
+        print(f"{name:14} {row['legacy_us']:>10} {row['matcher_us']:>11} {row['speedup']:>7}x {mismatches:>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "matcher", **report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
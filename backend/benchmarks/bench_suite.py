@@ -0,0 +1,289 @@
+"""
+Offline benchmark suite for the backend: CPU-side hot paths plus end-to-end
+`/display-itinerary` and `/ask` latency against local stand-in upstreams.
+
+The end-to-end part runs the FastAPI app in process (ASGI transport) with every
+upstream client redirected to the stand-ins in `benchmarks.standins`, so it
+needs no network access or API keys. Response caches are disabled unless
+`--warm` is given, so each request exercises the full upstream path.
+
+With `--replay ARCHIVE` the upstreams are served from a recorded traffic
+archive (see `src.replay`) instead of the stand-ins, at the recorded latencies
+times `--latency-scale`.
+
+Results are written as JSON; pass a previous result file to `--compare` to see
+the change per metric.
+
+Usage (from backend/):
+    python -m benchmarks.bench_suite [--iterations 20] [--latency "gemma=0.8,searx=0.25"]
+                                     [--json results.json] [--compare baseline.json]
+                                     [--only micro|e2e] [--warm]
+                                     [--replay archive.jsonl.gz [--latency-scale 1.0]]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.standins import start_standins, redirect_env, parse_latency
+
+SNIPPETS = [
+    "Cozy family-run bistro near the marina, mains from AED 85. Open daily 12pm-11pm.",
+    "Michelin-starred fine dining with a seven-course tasting menu and sommelier pairing.",
+    "Budget hostel with free breakfast, dorm beds from $18 per night, close to the metro.",
+    "Popular street food market with dozens of stalls; great value for money.",
+    "Five-star beachfront resort with private pool suites and a world-class spa.",
+    "Modern business hotel in the financial district, rooms from €140.",
+]
+AZURE_TEXT = "BOARDING PASS\n\nFROM LONDIB HEATHROW\nTO DUBAN INTL\n\n\nFLIGHT EK 002  SEAT 14C\nDATE 12NOV  BOARDING 08:45"
+CITY_QUERIES = ["London", "Dubai", "New York", "londin", "dubia", "islamabd", "pariss", "Unknownville"]
+PREFERENCES = ["hiking", "vegetarian", "I have a car", "staying with my aunt", "museums", "no food", "will cook"]
+
+
+def _results(count: int, categories=("restaurant", "hotel", "rental", "general")) -> list[dict]:
+    rng = random.Random(count)
+    return [
+        {
+            "title": f"Place {i} - {rng.choice(['Cheap Eats', 'Grand Hotel', 'City Bistro', 'Car Hire'])}",
+            "content": rng.choice(SNIPPETS) * rng.randint(1, 3),
+            "url": f"https://www.example-{i % 17}.com/place/{i}?utm_source=x",
+            "category": categories[i % len(categories)],
+        }
+        for i in range(count)
+    ]
+
+
+def _stats(samples_ms: list[float]) -> dict:
+    samples = sorted(samples_ms)
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[math.ceil(len(samples) * 0.95) - 1], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def _time_calls(func, inputs: list, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            samples.append((time.perf_counter() - start) * 1000)
+    return _stats(samples)
+
+
+def run_micro(repeat: int) -> dict:
+    """
+    Times the CPU-side hot paths with fixed inputs.
+    """
+    from app import EXCLUSION_MATCHER
+    from config import prompts
+    from src import cities
+    from src.enrich import enrich_results
+    from src.ocr import clean_azure_ocr
+
+    def correct_city(name):
+        # Measure the lookup itself, not its memo
+        cities.match_city.cache_clear()
+        return cities.correct_city_name_dynamic(name)
+
+    small, large = _results(20), _results(120)
+    history = [{"question": f"Question {i}?", "answer": "Some long answer. " * 60} for i in range(8)]
+    cases = {
+        "correct_city_name_dynamic": (correct_city, CITY_QUERIES),
+        "clean_azure_ocr": (clean_azure_ocr, [AZURE_TEXT]),
+        "extract_price": (prompts.extract_price, SNIPPETS),
+        "guess_price_range": (prompts.guess_price_range, SNIPPETS),
+        "categorize_by_price": (prompts.categorize_by_price, [small, large]),
+        "exclusion_flags": (lambda prefs: EXCLUSION_MATCHER.labels("\n".join(prefs)), [PREFERENCES, PREFERENCES[:2]]),
+        "enrich_results": (enrich_results, [small, large]),
+        "build_live_itinerary_prompt": (
+            lambda results: prompts.build_live_itinerary_prompt("Dubai", "19:45", "12/11/2026", results, PREFERENCES[:2], 3),
+            [enrich_results(small), enrich_results(large)],
+        ),
+        "build_fallback_prompt": (
+            lambda prefs: prompts.build_fallback_prompt("Dubai", "19:45", "12/11/2026", prefs, 3), [PREFERENCES]
+        ),
+        "build_user_query_prompt": (
+            lambda results: prompts.build_user_query_prompt(
+                "Where can I get a SIM card?", results, city="Dubai", airport="DXB",
+                arrival_time="19:45", arrival_date="12/11/2026", chat_history=history, summary="Earlier: food and hotels."
+            ),
+            [small[:6]],
+        ),
+    }
+    report = {}
+    for name, (func, inputs) in cases.items():
+        report[name] = _time_calls(func, inputs, repeat)
+        print(f"  {name:30} mean {report[name]['mean_ms']:>9.4f} ms   p95 {report[name]['p95_ms']:>9.4f} ms")
+    return report
+
+
+def _ticket_image(index: int) -> bytes:
+    # Unique bytes per request, so the OCR cache (if enabled) cannot short-circuit it
+    return b"\x89PNG\r\n\x1a\n" + f"benchmark-ticket-{index}-{time.time_ns()}".encode()
+
+
+async def _run_e2e(iterations: int, warm: bool) -> dict:
+    import httpx
+    import app as backend
+    from src import gemma, ocr, searx
+
+    if not warm:
+        gemma.GEMMA_CACHE = searx.SEARX_CACHE = ocr.OCR_CACHE = None
+
+    transport = httpx.ASGITransport(app=backend.app)
+    async with backend.app.router.lifespan_context(backend.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=120) as client:
+            samples = {"display_itinerary": [], "display_itinerary_stream": [], "ask": []}
+            stage_timings: dict[str, list[float]] = {}
+            errors = 0
+            for i in range(iterations):
+                headers = {"X-Session-ID": f"bench{i:08d}"}
+                files = {"file": ("ticket.png", _ticket_image(i), "image/png")}
+                data = {"preferences": "hiking, museums, have a car", "top_k": "3"}
+
+                start = time.perf_counter()
+                response = await client.post("/display-itinerary", files=files, data=data, headers=headers)
+                samples["display_itinerary"].append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                for stage, ms in (response.json().get("timings") or {}).items():
+                    stage_timings.setdefault(stage, []).append(ms)
+
+                # The ASGI transport buffers the whole response, so this is the
+                # complete stream, not time to first token
+                start = time.perf_counter()
+                files = {"file": ("ticket.png", _ticket_image(i), "image/png")}
+                response = await client.post("/display-itinerary/stream", files=files, data=data, headers=headers)
+                samples["display_itinerary_stream"].append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200 or "event: error" in response.text
+
+                start = time.perf_counter()
+                response = await client.post("/ask", json={"user_query": f"Where can I eat near my hotel? ({i})"}, headers=headers)
+                samples["ask"].append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200
+
+    report = {name: _stats(values) for name, values in samples.items() if values}
+    report["stages_mean_ms"] = {stage: round(statistics.fmean(values), 2) for stage, values in stage_timings.items()}
+    report["errors"] = errors
+    return report
+
+
+def run_e2e(iterations: int, latency: dict, warm: bool, replaying: bool = False) -> dict:
+    """
+    Measures endpoint latency against stand-in upstreams with the given injected latency,
+    or against the replay archive when `replaying`.
+    """
+    if replaying:
+        from src.replay import replay_stats
+        report = asyncio.run(_run_e2e(iterations, warm))
+        report["replay"] = replay_stats()
+    else:
+        standins = start_standins(latency)
+        os.environ.update(redirect_env(standins))
+        try:
+            report = asyncio.run(_run_e2e(iterations, warm))
+        finally:
+            for standin in standins.values():
+                standin.stop()
+        report["upstream_requests"] = {name: standin.requests for name, standin in standins.items()}
+        report["injected_latency_s"] = {name: standin.server.latency for name, standin in standins.items()}
+    for name in ("display_itinerary", "display_itinerary_stream", "ask"):
+        if name in report:
+            print(f"  {name:26} p50 {report[name]['p50_ms']:>9.1f} ms   p95 {report[name]['p95_ms']:>9.1f} ms")
+    return report
+
+
+def _flatten(report: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and key.endswith("_ms"):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """
+    Prints the relative change of every timing metric against a previous result file.
+    """
+    with open(baseline_path) as f:
+        baseline = _flatten(json.load(f))
+    print(f"\nChange vs {baseline_path} (+ slower / - faster):")
+    for key, value in _flatten(current).items():
+        if key.endswith(("mean_ms", "p95_ms")) and baseline.get(key):
+            change = (value - baseline[key]) / baseline[key] * 100
+            print(f"  {key:60} {baseline[key]:>10} -> {value:>10}  {change:+6.1f}%")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="End-to-end requests per endpoint")
+    parser.add_argument("--repeat", type=int, default=200, help="Repetitions per micro-benchmark input")
+    parser.add_argument("--latency", default="", help='Injected upstream latency, e.g. "gemma=0.8,searx=0.25" or "0"')
+    parser.add_argument("--only", choices=["micro", "e2e"])
+    parser.add_argument("--warm", action="store_true", help="Keep the response caches enabled")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--replay", help="Serve the upstreams from this recorded traffic archive")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Replay latency multiplier (0 = instant)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the backend's INFO logs")
+    args = parser.parse_args()
+
+    if args.replay:
+        # Read by src.replay at import time, so set before the backend is imported
+        os.environ.update({
+            "HTTP_REPLAY_MODE": "replay",
+            "HTTP_REPLAY_ARCHIVE": args.replay,
+            "HTTP_REPLAY_LATENCY_SCALE": str(args.latency_scale),
+        })
+
+    # The backend reads its keys at import time; the stand-ins accept any value
+    for key in ("GEMMA_API_KEY", "OCR_SPACE_API_KEY", "AZURE_CV_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    report = {
+        "benchmark": "suite",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+    }
+    if args.only != "e2e":
+        print("Micro-benchmarks:")
+        report["micro"] = run_micro(args.repeat)
+    if args.only != "micro":
+        print("End-to-end:")
+        report["e2e"] = run_e2e(args.iterations, parse_latency(args.latency), args.warm, bool(args.replay))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Load test for `/display-itinerary` and `/ask`.
+
+Each simulated trip uploads a synthetic boarding pass (`benchmarks.tickets`)
+with a random preference mix, then asks `--asks` follow-up questions in the
+same session. Trips arrive either in a closed loop (`--concurrency` trips in
+flight, each starting as soon as the previous one ends) or open loop at a
+Poisson rate (`--rate` trips per second).
+
+By default the app runs in process against the upstream stand-ins
+(`benchmarks.standins`), like one uvicorn worker, and the report includes
+event-loop lag: anything in a request path that blocks the loop shows up
+there before it shows up as latency. With `--url` an already running backend
+is targeted instead (start it with the `HTTP_REDIRECT_*` exports printed by
+`python -m benchmarks.standins`), e.g. to compare `--workers` settings.
+
+The report gives p50/p95/p99 latency, throughput and error rate per endpoint
+and per pipeline stage. A comma-separated `--concurrency` list sweeps the
+levels and marks where throughput stops growing or errors appear.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --concurrency 1,2,4,8,16,32 --duration 20
+    python -m benchmarks.loadtest --rate 2 --duration 60 --latency "gemma=1.5"
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Optional
+
+from benchmarks.standins import start_standins, redirect_env, parse_latency
+from benchmarks.tickets import TicketGenerator, load_cities
+
+QUESTIONS = [
+    "Where can I get a local SIM card near the airport?",
+    "What is the cheapest way to get to the city center?",
+    "Any good places for breakfast near my hotel?",
+    "Is it safe to walk around at night?",
+    "What should I see if I only have half a day?",
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[max(0, math.ceil(len(values) * q) - 1)] if values else 0.0
+
+
+def _summary(samples: list[float], errors: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    total = len(samples) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(_percentile(samples, 0.50), 1),
+        "p95_ms": round(_percentile(samples, 0.95), 1),
+        "p99_ms": round(_percentile(samples, 0.99), 1),
+        "max_ms": round(samples[-1], 1) if samples else 0.0,
+    }
+
+
+class LoadStats:
+    """
+    Latency samples and errors per endpoint and per pipeline stage for one load level.
+    """
+
+    def __init__(self):
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.stages: dict[str, list[float]] = defaultdict(list)
+        self.branches: dict[str, int] = defaultdict(int)
+        self.loop_lag: list[float] = []
+        self.trips = 0
+
+    def ok(self, endpoint: str, ms: float) -> None:
+        self.latency[endpoint].append(ms)
+
+    def error(self, endpoint: str, kind: str) -> None:
+        self.errors[endpoint][kind] += 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(set(self.latency) | set(self.errors)):
+            errors = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {**_summary(self.latency[endpoint], errors, elapsed),
+                                   "error_kinds": dict(self.errors[endpoint])}
+        report = {
+            "elapsed_s": round(elapsed, 2),
+            "trips": self.trips,
+            "endpoints": endpoints,
+            "stages": {stage: _summary(values, 0, elapsed) for stage, values in sorted(self.stages.items())},
+            "branches": dict(self.branches),
+        }
+        if self.loop_lag:
+            lag = sorted(self.loop_lag)
+            report["loop_lag_ms"] = {"p50": round(_percentile(lag, 0.5), 1), "p99": round(_percentile(lag, 0.99), 1),
+                                     "max": round(lag[-1], 1)}
+        return report
+
+
+async def _timed(stats: LoadStats, endpoint: str, call) -> Optional[dict]:
+    start = time.perf_counter()
+    try:
+        response = await call()
+    except Exception as e:
+        stats.error(endpoint, type(e).__name__)
+        return None
+    ms = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        stats.error(endpoint, str(response.status_code))
+        return None
+    stats.ok(endpoint, ms)
+    return response.json()
+
+
+async def run_trip(client, generator: TicketGenerator, stats: LoadStats, asks: int, trip_id: int) -> None:
+    """
+    One traveler: uploads a boarding pass, then asks follow-up questions in the same session.
+    """
+    image, ticket = generator.ticket()
+    preferences, branches = generator.preferences()
+    for branch in branches or ["none"]:
+        stats.branches[branch] += 1
+    stats.branches["messy_ticket"] += ticket["messy"]
+    headers = {"X-Session-ID": f"load{os.getpid()}x{trip_id:08d}"}
+
+    body = await _timed(stats, "/display-itinerary", lambda: client.post(
+        "/display-itinerary",
+        files={"file": ("boarding-pass.png", image, "image/png")},
+        data={"preferences": preferences, "top_k": "3"},
+        headers=headers,
+    ))
+    if body is None:
+        return
+    for stage, ms in (body.get("timings") or {}).items():
+        stats.stages[stage].append(ms)
+
+    for i in range(asks):
+        question = random.choice(QUESTIONS)
+        await _timed(stats, "/ask", lambda: client.post("/ask", json={"user_query": question}, headers=headers))
+    stats.trips += 1
+
+
+async def _closed_loop(client, generator, stats, concurrency: int, duration: float, asks: int) -> None:
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10 ** 9))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await run_trip(client, generator, stats, asks, next(counter))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _open_loop(client, generator, stats, rate: float, duration: float, asks: int, max_inflight: int) -> None:
+    deadline = time.perf_counter() + duration
+    inflight: set[asyncio.Task] = set()
+    trip_id = 0
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(random.expovariate(rate))
+        if len(inflight) >= max_inflight:
+            stats.error("/display-itinerary", "client_backlog")
+            continue
+        trip_id += 1
+        task = asyncio.create_task(run_trip(client, generator, stats, asks, trip_id))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.wait(inflight)
+
+
+async def _watch_loop_lag(stats: LoadStats, stop: asyncio.Event, interval: float = 0.05) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, (time.perf_counter() - start - interval) * 1000))
+
+
+async def run_level(client, generator, args, concurrency: Optional[int], in_process: bool) -> dict:
+    """
+    Runs one load level and returns its report.
+    """
+    stats = LoadStats()
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(_watch_loop_lag(stats, stop)) if in_process else None
+    start = time.perf_counter()
+    if args.rate:
+        await _open_loop(client, generator, stats, args.rate, args.duration, args.asks, args.max_inflight)
+    else:
+        await _closed_loop(client, generator, stats, concurrency, args.duration, args.asks)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if watcher:
+        await watcher
+    return stats.report(elapsed)
+
+
+def _print_level(label: str, report: dict) -> None:
+    print(f"\n== {label}: {report['trips']} trips in {report['elapsed_s']} s")
+    print(f"  {'':22} {'req':>6} {'err%':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in list(report["endpoints"].items()) + [(f"stage {k}", v) for k, v in report["stages"].items()]:
+        print(f"  {name:22} {row['requests']:>6} {row['error_rate'] * 100:>5.1f}% {row['throughput_rps']:>7.2f} "
+              f"{row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} {row['p99_ms']:>8.0f}")
+    for endpoint, row in report["endpoints"].items():
+        if row["error_kinds"]:
+            print(f"  errors {endpoint}: {row['error_kinds']}")
+    if "loop_lag_ms" in report:
+        lag = report["loop_lag_ms"]
+        print(f"  event-loop lag ms: p50 {lag['p50']}  p99 {lag['p99']}  max {lag['max']}")
+
+
+def find_saturation(levels: list[dict], max_error_rate: float = 0.01) -> Optional[int]:
+    """
+    Returns the first concurrency level where the backend stops scaling: errors
+    exceed `max_error_rate`, or throughput grows by less than 10% while
+    `/display-itinerary` p95 grows by more than 50%.
+    """
+    previous = None
+    for level in levels:
+        row = level["endpoints"].get("/display-itinerary")
+        if not row:
+            continue
+        if row["error_rate"] > max_error_rate:
+            return level["concurrency"]
+        if previous and row["throughput_rps"] < previous["throughput_rps"] * 1.1 and row["p95_ms"] > previous["p95_ms"] * 1.5:
+            return level["concurrency"]
+        previous = row
+    return None
+
+
+async def _run(args, levels: list[Optional[int]]) -> list[dict]:
+    import httpx
+    generator = TicketGenerator(load_cities(), messy=args.messy, seed=args.seed)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+            return [{"concurrency": c, **await run_level(client, generator, args, c, False)} for c in levels]
+
+    import app as backend
+    from src import gemma, ocr, searx
+    if not args.warm:
+        gemma.GEMMA_CACHE = searx.SEARX_CACHE = ocr.OCR_CACHE = None
+    transport = httpx.ASGITransport(app=backend.app)
+    async with backend.app.router.lifespan_context(backend.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=args.timeout) as client:
+            return [{"concurrency": c, **await run_level(client, generator, args, c, True)} for c in levels]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="4", help='Trips in flight, or a sweep such as "1,2,4,8,16"')
+    parser.add_argument("--rate", type=float, help="Open loop: Poisson arrivals, trips per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per load level")
+    parser.add_argument("--asks", type=int, default=2, help="Follow-up /ask calls per trip")
+    parser.add_argument("--messy", type=float, default=0.1, help="Share of tickets needing the LLM extraction fallback")
+    parser.add_argument("--latency", default="", help='Stand-in latency, e.g. "gemma=1.5,searx=0.4"')
+    parser.add_argument("--url", help="Target a running backend instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Open loop: cap on trips in flight")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--warm", action="store_true", help="Keep the response caches enabled")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the backend's INFO logs")
+    args = parser.parse_args()
+
+    for key in ("GEMMA_API_KEY", "OCR_SPACE_API_KEY", "AZURE_CV_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    random.seed(args.seed)
+    levels = [None] if args.rate else [int(c) for c in args.concurrency.split(",")]
+
+    standins = {}
+    if not args.url:
+        standins = start_standins(parse_latency(args.latency))
+        os.environ.update(redirect_env(standins))
+    try:
+        results = asyncio.run(_run(args, levels))
+    finally:
+        for standin in standins.values():
+            standin.stop()
+
+    for level in results:
+        _print_level(f"rate {args.rate}/s" if args.rate else f"concurrency {level['concurrency']}", level)
+    report = {"mode": "open" if args.rate else "closed", "rate": args.rate, "levels": results}
+    if standins:
+        report["upstream_requests"] = {name: standin.requests for name, standin in standins.items()}
+    if len(results) > 1:
+        report["saturation_concurrency"] = find_saturation(results)
+        print(f"\nSaturation: {report['saturation_concurrency'] or 'not reached'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Local stand-in servers for the upstream APIs (Gemma, SearxNG, OCR.Space, Azure OCR).
+
+Each stand-in is a small threaded HTTP server that answers with realistic payloads
+after a configurable delay, so the backend can be exercised end to end without
+network access or API keys. Point the backend at them with the
+`HTTP_REDIRECT_<NAME>` environment variables (see `src.clients`).
+
+OCR stand-ins return the text stored in a PNG `tEXt` chunk named "ticket" when
+the upload has one, and a default ticket otherwise.
+"""
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_TICKET = (
+    "BOARDING PASS\n"
+    "FROM: LONDON HEATHROW (LHR)\n"
+    "TO: DUBAI (DXB)\n"
+    "FLIGHT: EK002\n"
+    "DATE: 12 NOV 2026\n"
+    "BOARDING TIME 08:45  ARRIVAL 19:45"
+)
+
+ITINERARY_SECTIONS = ["Restaurants", "Hotels", "Rental Cars", "Additional Suggestions", "Weather Forecast"]
+
+# Default injected latency per upstream, in seconds
+DEFAULT_LATENCY = {"gemma": 0.8, "searx": 0.25, "ocr_space": 0.6, "azure_ocr": 0.5}
+
+
+def png_text_chunks(data: bytes) -> dict[str, str]:
+    """
+    Returns the `tEXt` chunks of a PNG file as a dict (empty for other formats).
+    """
+    chunks = {}
+    if not data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return chunks
+    position = 8
+    while position + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        if kind == b"tEXt" and b"\0" in body:
+            key, value = body.split(b"\0", 1)
+            chunks[key.decode("latin-1")] = value.decode("latin-1")
+        elif kind == b"IEND":
+            break
+        position += 12 + length
+    return chunks
+
+
+def _multipart_file(body: bytes, content_type: str) -> bytes:
+    boundary = content_type.split("boundary=", 1)[-1].strip('"').encode()
+    for part in body.split(b"--" + boundary):
+        if b'name="file"' in part and b"\r\n\r\n" in part:
+            return part.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n", 1)[0]
+    return b""
+
+
+def _ticket_text(image: bytes) -> str:
+    return png_text_chunks(image).get("ticket", DEFAULT_TICKET)
+
+
+def _itinerary_markdown(seed: str) -> str:
+    rng = random.Random(seed)
+    lines = ["# Your Arrival Day Itinerary", ""]
+    for section in ITINERARY_SECTIONS:
+        lines += [section, ""]
+        for tier in ("Cheap", "Mid-Range", "Luxury"):
+            lines.append(f"#### {tier}")
+            for i in range(3):
+                lines.append(
+                    f"- **Place {rng.randint(1, 999)}**: A well-reviewed spot with local character "
+                    f"(~{rng.randint(1, 3)} hours). [Website Link](https://example.com/{section[:4].lower()}/{i})"
+                )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _gemma_reply(prompt: str) -> str:
+    if "extract structured information" in prompt:
+        return json.dumps({
+            "origin": "London", "destination": "Dubai", "airport_name": "Dubai International Airport",
+            "flight_number": "EK002", "boarding time": "08:45", "arrival_time": "19:45", "arrival_date": "12/11/2026",
+        })
+    if "extract keywords or category topics" in prompt:
+        return "hiking trails, museums, street food"
+    if "running memory of a conversation" in prompt:
+        return json.dumps({"summary": "Traveler is visiting Dubai and asked about food, transport and sights."})
+    if "User Question:" in prompt:
+        return "Here are a few options near your hotel, with opening hours and prices. " * 8
+    return _itinerary_markdown(prompt[:200])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StandIn/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _json(self, payload, status: int = 200) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self) -> None:
+        self.server.requests += 1
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        self._delay()
+        url = urlsplit(self.path)
+        if self.server.name == "searx" and url.path.endswith("/search"):
+            query = parse_qs(url.query).get("q", [""])[0]
+            rng = random.Random(query)
+            results = [
+                {
+                    "title": f"{query.title()} #{i + 1} - Reviews & Prices",
+                    "content": (
+                        f"{query.capitalize()}: {rng.choice(['cozy', 'popular', 'budget', 'luxury', 'modern'])} option "
+                        f"rated {rng.randint(35, 50) / 10}/5 by travelers, open daily, from AED {rng.randint(40, 900)}."
+                    ),
+                    "url": f"https://www.example-{rng.randint(1, 40)}.com/{query.replace(' ', '-')}/{i}?utm_source=searx",
+                }
+                for i in range(12)
+            ]
+            return self._json({"query": query, "results": results})
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = self._body()
+        self._delay()
+        path = urlsplit(self.path).path
+        name = self.server.name
+
+        if name == "gemma":
+            request = json.loads(body or b"{}")
+            prompt = request.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+            text = _gemma_reply(prompt)
+            if ":streamGenerateContent" in path:
+                return self._stream(text)
+            return self._json({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+        if name == "ocr_space":
+            image = _multipart_file(body, self.headers.get("Content-Type", ""))
+            return self._json({"ParsedResults": [{"ParsedText": _ticket_text(image)}], "IsErroredOnProcessing": False})
+
+        if name == "azure_ocr" and path.endswith("/ocr"):
+            lines = [{"words": [{"text": word} for word in line.split()]} for line in _ticket_text(body).splitlines()]
+            return self._json({"language": "en", "regions": [{"lines": lines}]})
+
+        self._json({"error": "not found"}, 404)
+
+    def _stream(self, text: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        for start in range(0, len(words), 12):
+            chunk = " ".join(words[start:start + 12]) + " "
+            event = json.dumps({"candidates": [{"content": {"parts": [{"text": chunk}]}}]})
+            data = f"data: {event}\r\n\r\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.server.stream_interval)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StandIn:
+    """
+    One stand-in server running in a background thread.
+    """
+
+    def __init__(self, name: str, latency: float = 0.0, stream_interval: float = 0.01, port: int = 0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.server.daemon_threads = True
+        self.server.name = name
+        self.server.latency = latency
+        self.server.stream_interval = stream_interval
+        self.server.requests = 0
+        self.name = name
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"standin-{name}", daemon=True)
+
+    @property
+    def requests(self) -> int:
+        return self.server.requests
+
+    def start(self) -> "StandIn":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_standins(latency: dict[str, float] = None) -> dict[str, StandIn]:
+    """
+    Starts one stand-in per upstream.
+
+    Args:
+        latency (dict[str, float], optional): Injected delay per upstream in seconds
+                                              (defaults to `DEFAULT_LATENCY`).
+
+    Returns:
+        dict[str, StandIn]: Running stand-ins keyed by upstream name.
+    """
+    latency = {**DEFAULT_LATENCY, **(latency or {})}
+    return {name: StandIn(name, latency[name]).start() for name in DEFAULT_LATENCY}
+
+
+def redirect_env(standins: dict[str, StandIn]) -> dict[str, str]:
+    """
+    Returns the environment variables that point the backend's upstream clients at the stand-ins.
+    """
+    return {f"HTTP_REDIRECT_{name.upper()}": standin.url for name, standin in standins.items()}
+
+
+def parse_latency(spec: str) -> dict[str, float]:
+    """
+    Parses a latency spec such as "gemma=0.8,searx=0.2" (a bare number applies to every upstream).
+    """
+    if not spec:
+        return {}
+    if "=" not in spec:
+        return {name: float(spec) for name in DEFAULT_LATENCY}
+    return {name.strip(): float(value) for name, value in (item.split("=", 1) for item in spec.split(","))}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the upstream stand-in servers until interrupted.")
+    parser.add_argument("--latency", default="", help='e.g. "gemma=0.8,searx=0.2" or "0"')
+    args = parser.parse_args()
+    servers = start_standins(parse_latency(args.latency))
+    for key, value in redirect_env(servers).items():
+        print(f"export {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for standin in servers.values():
+            standin.stop()
@@ -0,0 +1,186 @@
+"""
+Synthetic boarding passes for load tests.
+
+Each ticket is a PNG whose `tEXt` chunk "ticket" holds the printed text, which
+the OCR stand-ins return as the recognized text (see `benchmarks.standins`).
+When Pillow is installed the text is also drawn on the image, so the files
+can be fed to a real OCR engine; otherwise the image is a plain barcode-like
+pattern.
+
+Cities are drawn from `data/worldcities.csv`, weighted towards the largest.
+
+Usage (from backend/):
+    python -m benchmarks.tickets --count 20 --out /tmp/tickets
+"""
+import csv
+import os
+import random
+import struct
+import zlib
+from datetime import date, timedelta
+
+CITIES_CSV = "data/worldcities.csv"
+MAX_CITIES = 2000
+
+AIRLINES = ["EK", "BA", "QR", "LH", "AF", "TK", "SQ", "PK", "EY", "KL", "UA", "DL"]
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+# Preference snippets, grouped by the exclusion branch they trigger in `app.py`
+PREFERENCE_MIX = {
+    "none": ["hiking", "museums", "street food", "nightlife", "kid friendly", "vegetarian", "beaches", "shopping"],
+    "skip_rentals": ["I have a car", "rental sorted", "bringing my own car"],
+    "skip_hotels": ["staying with my aunt", "hotel is booked", "airbnb"],
+    "skip_restaurants": ["no food", "will cook", "meal plan included"],
+}
+
+
+def load_cities(path: str = CITIES_CSV, limit: int = MAX_CITIES) -> list[str]:
+    """
+    Returns the ASCII names of the `limit` most populous cities in the CSV.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = [row for row in csv.DictReader(f) if row.get("city_ascii")]
+    rows.sort(key=lambda row: float(row.get("population") or 0), reverse=True)
+    return [row["city_ascii"] for row in rows[:limit]]
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+
+def _pattern_png(width: int, height: int, seed: int) -> tuple[bytes, bytes]:
+    rng = random.Random(seed)
+    stripes = bytes(rng.choice((0, 0, 255)) for _ in range(width))
+    blank = bytes([255]) * width
+    rows = b"".join(b"\0" + (stripes if height // 3 < y < 2 * height // 3 else blank) for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)  # 8-bit grayscale
+    return header, zlib.compress(rows, 6)
+
+
+def _drawn_png(text: str) -> bytes:
+    from PIL import Image, ImageDraw  # optional, only used to make OCR-able images
+    import io
+    lines = text.splitlines()
+    image = Image.new("L", (520, 28 + 22 * len(lines)), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((16, 14 + 22 * i), line, fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def ticket_png(text: str, seed: int = 0) -> bytes:
+    """
+    Encodes a boarding pass as a PNG carrying `text` in a "ticket" tEXt chunk.
+
+    Args:
+        text (str): The printed ticket text.
+        seed (int): Varies the image pixels, so every ticket has distinct bytes.
+
+    Returns:
+        bytes: The PNG file.
+    """
+    text_chunk = _chunk(b"tEXt", b"ticket\0" + text.encode("latin-1", "replace"))
+    try:
+        png = _drawn_png(text)
+        # Insert the text chunk right after IHDR (8-byte signature + 25-byte IHDR chunk)
+        return png[:33] + text_chunk + _chunk(b"tEXt", f"seed\0{seed}".encode()) + png[33:]
+    except ImportError:
+        header, data = _pattern_png(320, 96, seed)
+        return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header) + text_chunk + _chunk(b"IDAT", data) + _chunk(b"IEND", b"")
+
+
+class TicketGenerator:
+    """
+    Produces random boarding passes and preference strings.
+
+    Args:
+        cities (list[str]): City names to draw origins and destinations from.
+        messy (float): Share of tickets printed without field labels, which the
+                       fast-path parser cannot read and which go to the LLM fallback.
+        seed (int): Seed for reproducible runs.
+    """
+
+    def __init__(self, cities: list[str], messy: float = 0.1, seed: int = 1):
+        self.cities = cities
+        self.messy = messy
+        self.rng = random.Random(seed)
+        self.count = 0
+        # Bigger cities come up more often, like real traffic
+        self._weights = [1 / (rank + 10) for rank in range(len(cities))]
+
+    def _city(self) -> str:
+        return self.rng.choices(self.cities, weights=self._weights)[0]
+
+    def ticket_text(self) -> dict:
+        """
+        Returns a random ticket as {"text", "origin", "destination", "flight", "messy"}.
+        """
+        rng = self.rng
+        origin = self._city()
+        destination = self._city()
+        while destination == origin:
+            destination = self._city()
+        flight = f"{rng.choice(AIRLINES)}{rng.randint(1, 9999):03d}"
+        day = date.today() + timedelta(days=rng.randint(1, 90))
+        boarding = f"{rng.randint(0, 23):02d}:{rng.choice(range(0, 60, 5)):02d}"
+        arrival = f"{rng.randint(0, 23):02d}:{rng.choice(range(0, 60, 5)):02d}"
+        seat = f"{rng.randint(1, 45)}{rng.choice('ABCDEF')}"
+        messy = rng.random() < self.messy
+
+        if messy:
+            text = (
+                f"{origin.upper()} {destination.upper()}\n{flight[:2]} {flight[2:]}  {seat}\n"
+                f"{day.day:02d}{MONTHS[day.month - 1]}  GATE {rng.randint(1, 60)}  {boarding} {arrival}"
+            )
+        elif rng.random() < 0.5:
+            text = (
+                f"BOARDING PASS\nFROM: {origin.upper()}\nTO: {destination.upper()}\nFLIGHT: {flight}\n"
+                f"DATE: {day.day:02d} {MONTHS[day.month - 1]} {day.year}\n"
+                f"BOARDING TIME {boarding}  ARRIVAL {arrival}\nSEAT {seat}"
+            )
+        else:
+            text = (
+                f"PASSENGER: TEST/LOAD\nFROM {origin.upper()} TO {destination.upper()}\n"
+                f"FLIGHT {flight[:2]} {flight[2:]}  SEAT {seat}\n"
+                f"DATE {day.day:02d}/{day.month:02d}/{day.year}  ETA {arrival}"
+            )
+        return {"text": text, "origin": origin, "destination": destination, "flight": flight, "messy": messy}
+
+    def ticket(self) -> tuple[bytes, dict]:
+        """
+        Returns a unique boarding-pass PNG and the ticket it encodes.
+        """
+        self.count += 1
+        ticket = self.ticket_text()
+        return ticket_png(ticket["text"], seed=self.count), ticket
+
+    def preferences(self) -> tuple[str, list[str]]:
+        """
+        Returns a preference string and the exclusion branches it should trigger.
+
+        Roughly half of the trips skip at least one section.
+        """
+        rng = self.rng
+        picked = rng.sample(PREFERENCE_MIX["none"], rng.randint(0, 3))
+        branches = [branch for branch in ("skip_rentals", "skip_hotels", "skip_restaurants") if rng.random() < 0.25]
+        picked += [rng.choice(PREFERENCE_MIX[branch]) for branch in branches]
+        rng.shuffle(picked)
+        return ", ".join(picked), branches
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Write synthetic boarding-pass images.")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--out", default="tickets")
+    parser.add_argument("--messy", type=float, default=0.1)
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    generator = TicketGenerator(load_cities(), messy=args.messy)
+    for i in range(args.count):
+        image, ticket = generator.ticket()
+        with open(os.path.join(args.out, f"ticket-{i:04d}.png"), "wb") as f:
+            f.write(image)
+        print(f"ticket-{i:04d}.png  {ticket['origin']} -> {ticket['destination']}  {ticket['flight']}")
@@ -1,6 +1,144 @@
 import re
+import yaml
 from collections import defaultdict
-# Placeholder for Gemma prompt templates
+from src.logger import get_logger
+from src.matcher import PhraseMatcher
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+# Token budgets per prompt section; results sections are shared by their items
+PROMPT_BUDGETS = {
+    "preferences": 200,
+    "restaurant": 1200,
+    "hotel": 1200,
+    "rental": 300,
+    "general": 800,
+    "query_context": 150,
+    "query_results": 1000,
+    "snippet_min": 25,
+    "snippet_max": 120,
+    **config.get("PROMPT_BUDGETS", {}),
+}
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate (~4 characters per token for English text).
+
+    Args:
+        text (str): Any prompt fragment.
+
+    Returns:
+        int: Approximate number of Gemma tokens.
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shortens `text` to roughly `max_tokens`, cutting at a word boundary.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + " …"
+
+
+def compact_text(text: str) -> str:
+    """
+    Normalizes a search snippet: collapses whitespace, drops a leading date and trailing ellipses.
+    """
+    text = " ".join((text or "").split())
+    text = re.sub(r"^(?:[A-Z][a-z]{2,8}\.? \d{1,2}, \d{4}|\d{1,2} [A-Z][a-z]{2,8} \d{4})\s*[—–-]+\s*", "", text)
+    return re.sub(r"\s*(?:\.\.\.|…)+$", "", text)
+
+
+def trim_snippet(text: str, max_tokens: int) -> str:
+    """
+    Compacts a snippet and cuts it to `max_tokens`, preferring a sentence boundary.
+    """
+    text = compact_text(text)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end > len(cut) // 2:
+        return cut[:sentence_end + 1]
+    return truncate_to_tokens(text, max_tokens)
+
+
+def snippet_budget(section_budget: int, count: int, overhead: int = 0) -> int:
+    """
+    Splits a section's token budget between `count` items, within the configured snippet bounds.
+    """
+    if count <= 0:
+        return PROMPT_BUDGETS["snippet_max"]
+    per_item = (section_budget - overhead) // count
+    return max(PROMPT_BUDGETS["snippet_min"], min(PROMPT_BUDGETS["snippet_max"], per_item))
+
+
+def render_result(result: dict, max_tokens: int, price: str = None, separator: str = ": ") -> str:
+    """
+    Serializes one search result as a compact Markdown bullet (title, trimmed snippet, price, link).
+    """
+    line = f"- **{compact_text(result.get('title', ''))}**"
+    snippet = trim_snippet(result.get("content", ""), max_tokens)
+    if snippet:
+        line += f"{separator}{snippet}"
+    if price is not None:
+        line += f" **Estimated Price:** {price or 'Not listed'}"
+    if result.get("url"):
+        line += f" [Website Link]({result['url']})"
+    return line + "\n"
+
+
+def fit_lines(lines: list[str], budget: int) -> str:
+    """
+    Joins rendered lines until the token budget is spent (always keeps the first one).
+    """
+    block, used = "", 0
+    for line in lines:
+        cost = estimate_tokens(line)
+        if block and used + cost > budget:
+            break
+        block += line
+        used += cost
+    return block
+
+
+def assemble_prompt(kind: str, sections: dict[str, str]) -> str:
+    """
+    Joins prompt sections in order and logs the per-section and total token estimates.
+
+    Args:
+        kind (str): Prompt name used in the log line.
+        sections (dict[str, str]): Ordered section name -> text.
+
+    Returns:
+        str: The full prompt.
+    """
+    sizes = {name: estimate_tokens(text) for name, text in sections.items() if text}
+    logger.info(
+        "%s prompt: ~%d tokens (%s)", kind, sum(sizes.values()),
+        ", ".join(f"{name}={size}" for name, size in sizes.items())
+    )
+    return "".join(sections.values())
+
+
+def preferences_block(preferences: list[str]) -> str:
+    """
+    Renders the traveler preferences within the preferences budget.
+    """
+    if not preferences:
+        return ""
+    per_item = snippet_budget(PROMPT_BUDGETS["preferences"], len(preferences))
+    lines = [f"- {truncate_to_tokens(' '.join(p.split()), per_item)}\n" for p in preferences]
+    return "**Traveler Preferences:**\n" + fit_lines(lines, PROMPT_BUDGETS["preferences"]) + "\n"
+
 
 TRAVEL_EXTRACTION_PROMPT = """
 SYSTEM:
@@ -73,41 +211,47 @@ def extract_price(text):
 
 
 
+# Price-tier cues, checked from the most to the least expensive tier
+PRICE_CUES = {
+    "$$$": [
+        "$$$", "fine dining", "michelin", "luxury", "five-star", "expensive",
+        "suite", "penthouse", "exclusive", "high-end", "gourmet",
+    ],
+    "$$": [
+        "$$", "mid-range", "bistro", "popular", "moderate", "brasserie",
+        "boutique", "modern", "4-star", "casual dining", "stylish", "quality food",
+    ],
+    "$": [
+        "$", "affordable", "cheap", "budget", "fast food", "pizza",
+        "diner", "grab-and-go", "street food", "food court", "local eatery", "value for money",
+    ],
+}
+PRICE_MATCHER = PhraseMatcher(PRICE_CUES)
+
+
 def guess_price_range(text):
-    text = text.lower()
-    # Luxury indicators
-    if (
-        "$$$" in text or "fine dining" in text or "michelin" in text or
-        "luxury" in text or "five-star" in text or "expensive" in text or
-        "suite" in text or "penthouse" in text or "exclusive" in text or
-        "high-end" in text or "gourmet" in text
-    ):
-        return "$$$"
-    
-    # Mid-range indicators
-    if (
-        "$$" in text or "mid-range" in text or "bistro" in text or
-        "popular" in text or "moderate" in text or "brasserie" in text or
-        "boutique" in text or "modern" in text or "4-star" in text or
-        "casual dining" in text or "stylish" in text or "quality food" in text
-    ):
-        return "$$"
-    
-    # Cheap indicators
-    if (
-        "$" in text or "affordable" in text or "cheap" in text or
-        "budget" in text or "fast food" in text or "pizza" in text or
-        "diner" in text or "grab-and-go" in text or "street food" in text or
-        "food court" in text or "local eatery" in text or "value for money" in text
-    ):
-        return "$"
-    
-    return None
+    # One scan for all tiers; luxury cues win over mid-range, mid-range over cheap
+    return PRICE_MATCHER.first(text, ("$$$", "$$", "$"))
 
 #     return grouped
+def result_price(result):
+    """
+    Returns the price (or price-tier cue) of a result, using the fields set by `src.enrich` when present.
+    """
+    if "tier" in result:
+        return result.get("price") or result.get("price_range")
+    content = result.get('content', '')
+    return extract_price(content) or guess_price_range(content) or guess_price_range(result.get('title', ''))
+
+
 def categorize_by_price(results, is_restaurant=True):
     grouped = defaultdict(list)
     for res in results:
+        if res.get("tier"):
+            # Already assigned by the enrichment stage
+            grouped[res["tier"]].append(res)
+            continue
+
         title = res.get('title', '')
         content = res.get('content', '')
 
@@ -129,11 +273,48 @@ def categorize_by_price(results, is_restaurant=True):
 
     return grouped
 
+def _tiered_results_block(results, top_k, budget, destination, kind, empty_note, fallback):
+    """
+    Renders restaurant or hotel results grouped into price tiers within `budget` tokens.
+    """
+    block = ""
+    if not results:
+        for tier in ["Cheap", "Mid-Range", "Luxury"]:
+            block += f"\n#### {tier}\n"
+            for name in fallback[tier]:
+                google_link = f"https://www.google.com/search?q={destination.replace(' ', '+')}+{kind}"
+                block += f"- **{name}** _(No price info available)_ [Website Link]({google_link})\n"
+        return block
+
+    categorized = categorize_by_price(results, is_restaurant=(kind == "restaurant"))
+    shown = {tier: categorized[tier][:top_k] for tier in ["Cheap", "Mid-Range", "Luxury"]}
+    tier_budget = budget // 3
+    for tier, items in shown.items():
+        block += f"\n#### {tier}\n"
+        if not items:
+            block += empty_note
+            continue
+        per_item = snippet_budget(tier_budget, len(items), overhead=len(items) * 30)
+        lines = []
+        for result in items:
+            price_info = result_price(result)
+            lines.append(render_result(result, per_item, price=price_info or "", separator=" — "))
+        block += fit_lines(lines, tier_budget)
+    return block
+
+
 def build_live_itinerary_prompt(destination: str, arrival_time: str, arrival_date: str, search_results: list, preferences: list[str], top_k: int) -> str:
+    """
+    Builds the itinerary prompt from live search results.
+
+    Each section (preferences, restaurants, hotels, rentals, additional
+    suggestions) has its own token budget (`PROMPT_BUDGETS`); results are
+    serialized one per line and their snippets trimmed to share the budget,
+    so the prompt size stays predictable for any `top_k`. The final token
+    estimate is logged.
+    """
     # Inject user preferences at the top
-    pref_block = ""
-    if preferences:
-        pref_block = "**Traveler Preferences:**\n" + "\n".join(f"- {p}" for p in preferences) + "\n\n"
+    pref_block = preferences_block(preferences)
 
     prompt = f"""
 You are a travel assistant AI helping a traveler plan their arrival-day experience.
@@ -212,118 +393,55 @@ Always return {top_k}, even if some are LLM-estimated
     skip_hotels = any("skip hotel" in p.lower() for p in preferences)
     skip_rentals = any("skip rental" in p.lower() or "have a car" in p.lower() for p in preferences)
 
+    sections = {"instructions": prompt}
+
     # Restaurants - by tier
     if not skip_restaurants:
-        prompt += "\n### 🍽️ Restaurants\n"
-        if grouped['restaurant']:
-            categorized = categorize_by_price(grouped['restaurant'], is_restaurant=True)
-            for tier in ["Cheap", "Mid-Range", "Luxury"]:
-                prompt += f"\n#### {tier}\n"
-                items = categorized[tier]
-                if items:
-                    for result in items[:top_k]:
-                        price_info = extract_price(result.get('content', '')) or guess_price_range(result.get('content', '')) or guess_price_range(result.get('title', ''))
-                        prompt += (
-                            f"- **{result.get('title', '')}**\n"
-                            f"  {result.get('content', '')}\n"
-                            f"  **Estimated Price:** {price_info if price_info else 'Not listed'}\n"
-                        )
-                        if result.get("url"):
-                            prompt += f"  [Website Link]({result.get('url')})\n"
-                else:
-                    prompt += "_No options found in this tier._ (You may suggest known or plausible venues in this price tier using internal knowledge.)\n"
-        else:
-            fallback = {
+        sections["restaurant"] = "\n### 🍽️ Restaurants\n" + _tiered_results_block(
+            grouped["restaurant"], top_k, PROMPT_BUDGETS["restaurant"], destination, "restaurant",
+            empty_note="_No options found in this tier._ (You may suggest known or plausible venues in this price tier using internal knowledge.)\n",
+            fallback={
                 "Cheap": ["Joe's Pizza", "Superiority Burger", "Mamoun's Falafel"],
                 "Mid-Range": ["Shake Shack", "The Smith", "ABC Kitchen"],
                 "Luxury": ["Le Bernardin", "Per Se", "Guy Savoy"]
             }
-            for tier in ["Cheap", "Mid-Range", "Luxury"]:
-                prompt += f"\n#### {tier}\n"
-                for name in fallback[tier]:
-                    google_link = f"https://www.google.com/search?q={destination.replace(' ', '+')}+restaurant"
-                    prompt += (
-                        f"- **{name}**\n"
-                        f"  _(No price info available)_\n"
-                        f"  [Website Link]({google_link})\n"
-                    )
+        )
 
     # Hotels - by tier
     if not skip_hotels:
-        prompt += "\n### 🏨 Hotels\n"
-        if grouped['hotel']:
-            categorized = categorize_by_price(grouped['hotel'], is_restaurant=False)
-            for tier in ["Cheap", "Mid-Range", "Luxury"]:
-                prompt += f"\n#### {tier}\n"
-                items = categorized[tier]
-                if items:
-                    for result in items[:top_k]:
-                        price_info = extract_price(result.get('content', '')) or guess_price_range(result.get('content', '')) or guess_price_range(result.get('title', ''))
-                        prompt += (
-                            f"- **{result.get('title', '')}**\n"
-                            f"  {result.get('content', '')}\n"
-                            f"  **Estimated Price:** {price_info if price_info else 'Not listed'}\n"
-                        )
-                        if result.get("url"):
-                            prompt += f"  [Website Link]({result.get('url')})\n"
-                else:
-                    prompt += "_No options found in this tier._\n"
-        else:
-            fallback = {
+        sections["hotel"] = "\n### 🏨 Hotels\n" + _tiered_results_block(
+            grouped["hotel"], top_k, PROMPT_BUDGETS["hotel"], destination, "hotel",
+            empty_note="_No options found in this tier._\n",
+            fallback={
                 "Cheap": ["The Jane Hotel", "Pod 39", "The Local NYC"],
                 "Mid-Range": ["Arlo Hotels", "The Library Hotel", "The Hoxton"],
                 "Luxury": ["Four Seasons Hotel", "The Peninsula Paris", "Hotel Plaza Athénée"]
             }
-            for tier in ["Cheap", "Mid-Range", "Luxury"]:
-                prompt += f"\n#### {tier}\n"
-                for name in fallback[tier]:
-                    google_link = f"https://www.google.com/search?q={destination.replace(' ', '+')}+hotel"
-                    prompt += (
-                        f"- **{name}**\n"
-                        f"  _(No price info available)_\n"
-                        f"  [Website Link]({google_link})\n"
-                    )
+        )
 
     # Rental Cars
     if not skip_rentals:
-        prompt += "\n### 🚗 Rental Cars\n"
+        block = "\n### 🚗 Rental Cars\n"
         if grouped['rental']:
-            for result in grouped['rental'][:top_k]:
-                prompt += (
-                    f"- **{result.get('title', '')}**\n"
-                    f"  {result.get('content', '')}\n"
-                )
-                if result.get("url"):
-                    prompt += f"  [Website Link]({result.get('url')})\n"
+            items = grouped['rental'][:top_k]
+            per_item = snippet_budget(PROMPT_BUDGETS["rental"], len(items))
+            block += fit_lines([render_result(r, per_item) for r in items], PROMPT_BUDGETS["rental"])
         else:
             fallback_rentals = ["Hertz", "Avis", "Enterprise"]
             for name in fallback_rentals:
                 google_link = f"https://www.google.com/search?q={destination.replace(' ', '+')}+car+rental"
-                prompt += (
-                    f"- **{name}**\n"
-                    f"  [Website Link]({google_link})\n"
-                )
-    
-    weather_link = "https://weather.com/"
-    for r in search_results:
-        if "weather" in r.get("title", "").lower() or "forecast" in r.get("content", "").lower():
-            if r.get("url"):
-                weather_link = r["url"]
-                break
-    
+                block += f"- **{name}** [Website Link]({google_link})\n"
+        sections["rental"] = block
 
     # Only show 'Additional Suggestions' if user gave preferences and relevant results exist
     if preferences and grouped["general"]:
-        prompt += "\n### 🔎 Additional Suggestions\n"
-        for result in grouped["general"][:top_k]:
-            prompt += f"- **{result.get('title', '')}**: {result.get('content', '')}\n"
-            if result.get("url"):
-                prompt += f"  [Website Link]({result['url']})\n"
-
-
-
+        items = grouped["general"][:top_k]
+        per_item = snippet_budget(PROMPT_BUDGETS["general"], len(items))
+        sections["general"] = "\n### 🔎 Additional Suggestions\n" + fit_lines(
+            [render_result(r, per_item) for r in items], PROMPT_BUDGETS["general"]
+        )
 
-    prompt += f"""
+    sections["closing"] = f"""
 
 ---
 
@@ -351,14 +469,12 @@ Examples:
 
 Be concise (1-2 lines max).
 """
-    return prompt
+    return assemble_prompt("Live itinerary", sections)
 
 
 
 def build_fallback_prompt(destination: str, arrival_time: str, arrival_date: str, preferences: list[str], top_k: int) -> str:
-    pref_block = ""
-    if preferences:
-        pref_block = "**Traveler Preferences:**\n" + "\n".join(f"- {p}" for p in preferences) + "\n\n"
+    pref_block = preferences_block(preferences)
 
     # Skip flags
     skip_restaurants = any("skip restaurant" in p.lower() for p in preferences)
@@ -455,18 +571,100 @@ Example:
 - Do NOT fabricate direct website URLs; always use a Google Search link for further info.
 """
 
-    return prompt
+    return assemble_prompt("Fallback itinerary", {"prompt": prompt})
 
 
-def build_user_query_prompt(user_query, search_results, city=None, airport=None, arrival_time=None, arrival_date=None, chat_history=None):
-    # Show context at the top if available
+CHAT_SUMMARY_PROMPT = """
+SYSTEM:
+
+You maintain the running memory of a conversation between a traveler and a travel assistant.
+
+Merge the existing summary and the new exchanges below into ONE updated summary that:
+- Keeps facts the traveler stated (plans, preferences, constraints, companions)
+- Keeps the key recommendations already given (names, places, prices), without descriptions
+- Drops greetings, repetition and anything superseded by a later exchange
+- Is at most {{max_words}} words
+
+Return only JSON in this exact format:
+{"summary": "..."}
+
+---
 
-    history_note = ""
-    if chat_history:
+EXISTING SUMMARY:
+<<<
+{{summary}}
+>>>
+
+NEW EXCHANGES:
+<<<
+{{turns}}
+>>>
+"""
+
+
+def build_chat_summary_prompt(summary: str, turns: list[dict], max_tokens: int, answer_max_tokens: int = 400) -> str:
+    """
+    Builds the prompt that folds evicted chat turns into the rolling summary.
+
+    Args:
+        summary (str): The current summary ("" if none yet).
+        turns (list[dict]): Evicted turns, each with 'question' and 'answer'.
+        max_tokens (int): Target size of the new summary.
+        answer_max_tokens (int, optional): Each answer is trimmed to this before summarizing.
+
+    Returns:
+        str: The summarization prompt.
+    """
+    lines = [
+        f"Q: {turn['question']}\nA: {truncate_to_tokens(turn['answer'], answer_max_tokens)}"
+        for turn in turns
+    ]
+    return (
+        CHAT_SUMMARY_PROMPT
+        .replace("{{max_words}}", str(max(20, int(max_tokens * 0.75))))
+        .replace("{{summary}}", summary.strip() or "(none)")
+        .replace("{{turns}}", "\n\n".join(lines))
+    )
+
+
+def _history_block(summary, turns, token_budget, answer_max_tokens):
+    """
+    Renders the conversation memory (summary plus the newest turns) within `token_budget`.
+
+    Turns are added newest first until the budget is spent, and each answer is
+    trimmed to `answer_max_tokens`, so the block stays flat as the chat grows.
+    """
+    budget = token_budget
+    summary_note = ""
+    if summary:
+        summary_note = f"Summary of Earlier Conversation:\n{truncate_to_tokens(summary, budget // 2)}\n\n"
+        budget -= estimate_tokens(summary_note)
+
+    entries = []
+    for chat in reversed(turns):
+        entry = f"Q: {chat['question']}\n   A: {truncate_to_tokens(chat['answer'], answer_max_tokens)}\n"
+        cost = estimate_tokens(entry)
+        if cost > budget:
+            break
+        entries.append(entry)
+        budget -= cost
+
+    if not summary_note and not entries:
+        return ""
+    history_note = summary_note
+    if entries:
         history_note += "Earlier Conversation:\n"
-        for i, chat in enumerate(chat_history[-5:], 1):
-            history_note += f"{i}. Q: {chat['question']}\n   A: {chat['answer']}\n"
-        history_note += "\nIf the user asks to 'elaborate' or 'what about that', use the relevant Q&A above.\n"
+        for i, entry in enumerate(reversed(entries), 1):
+            history_note += f"{i}. {entry}"
+    history_note += "\nIf the user asks to 'elaborate' or 'what about that', use the relevant Q&A above.\n"
+    return history_note
+
+
+def build_user_query_prompt(user_query, search_results, city=None, airport=None, arrival_time=None, arrival_date=None,
+                            chat_history=None, summary="", history_token_budget=1200, answer_max_tokens=300):
+    # Show context at the top if available
+
+    history_note = _history_block(summary, chat_history or [], history_token_budget, answer_max_tokens)
     context_note = ""
     if city or airport or arrival_time or arrival_date:
         context_note = "Traveler Context:\n"
@@ -480,17 +678,16 @@ def build_user_query_prompt(user_query, search_results, city=None, airport=None,
             context_note += f"- Arrival date: {arrival_date}\n"
         context_note += "\n(Use the above details as already known. Do NOT ask again.)\n"
 
-    web_snippets = ""
-    for r in search_results:
-        link = f"[Website Link]({r.get('url','')})" if r.get('url') else ""
-        web_snippets += f"\n- **{r.get('title', '')}**\n  {r.get('content', '')}\n  {link}\n"
-
-    prompt = (
-        f"You are a travel assistant AI. Use the context below and the web search results to answer the user as if you're a smart travel planner.\n"
-        f"{context_note}"
-        f"{history_note}"
-        f"User Question:\n{user_query}\n\n"
-        f"Recent Web Search Results:\n{web_snippets}\n"
-        "Your response must be clear and relevant. Do not repeat what is already in the context."
-    )
-    return prompt
+    context_note = truncate_to_tokens(context_note, PROMPT_BUDGETS["query_context"])
+
+    per_item = snippet_budget(PROMPT_BUDGETS["query_results"], len(search_results))
+    web_snippets = fit_lines([render_result(r, per_item) for r in search_results], PROMPT_BUDGETS["query_results"])
+
+    return assemble_prompt("User query", {
+        "instructions": "You are a travel assistant AI. Use the context below and the web search results to answer the user as if you're a smart travel planner.\n",
+        "context": context_note,
+        "history": history_note,
+        "question": f"User Question:\n{user_query}\n\n",
+        "results": f"Recent Web Search Results:\n{web_snippets}\n",
+        "closing": "Your response must be clear and relevant. Do not repeat what is already in the context."
+    })
@@ -0,0 +1,147 @@
+import os
+import csv
+import time
+from typing import Optional
+from src.cities import match_city
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AIRPORT_FILE_PATH = os.path.join(BASE_DIR, "data", "airports.dat")
+
+# Column order of the OpenFlights airports.dat file
+AIRPORT_COLUMNS = [
+    "id", "name", "city", "country", "iata", "icao", "lat", "lng",
+    "altitude", "utc_offset", "dst", "timezone", "type", "source",
+]
+
+
+def _clean(value: str) -> Optional[str]:
+    value = value.strip()
+    return None if value in ("", "\\N", "-") else value
+
+
+def _load_airports(path: str) -> tuple[dict, dict]:
+    """
+    Loads the airport dataset into IATA and ICAO lookup tables.
+
+    Args:
+        path (str): Path to an OpenFlights-format airports.dat file.
+
+    Returns:
+        tuple[dict, dict]: Airports keyed by IATA code and by ICAO code.
+    """
+    by_iata, by_icao = {}, {}
+    if not os.path.exists(path):
+        logger.warning("Airport dataset not found at %s; airport lookups are disabled", path)
+        return by_iata, by_icao
+
+    start = time.perf_counter()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < len(AIRPORT_COLUMNS) - 2:
+                continue
+            fields = dict(zip(AIRPORT_COLUMNS, row))
+            iata, icao = _clean(fields["iata"]), _clean(fields["icao"])
+            if not iata and not icao:
+                continue
+            try:
+                lat, lng = float(fields["lat"]), float(fields["lng"])
+            except ValueError:
+                lat = lng = None
+            airport = {
+                "iata": iata,
+                "icao": icao,
+                "name": _clean(fields["name"]),
+                "city": _clean(fields["city"]),
+                "country": _clean(fields["country"]),
+                "lat": lat,
+                "lng": lng,
+                "timezone": _clean(fields.get("timezone", "")),
+            }
+            if iata:
+                by_iata.setdefault(iata.upper(), airport)
+            if icao:
+                by_icao.setdefault(icao.upper(), airport)
+
+    logger.info("Loaded %d airports in %.1f ms", len(by_iata), (time.perf_counter() - start) * 1000)
+    return by_iata, by_icao
+
+
+AIRPORTS_BY_IATA, AIRPORTS_BY_ICAO = _load_airports(AIRPORT_FILE_PATH)
+
+
+def lookup_airport(code: str) -> Optional[dict]:
+    """
+    Looks up an airport by IATA (3-letter) or ICAO (4-letter) code.
+
+    Args:
+        code (str): The airport code, in any case.
+
+    Returns:
+        Optional[dict]: 'iata', 'icao', 'name', 'city', 'country', 'lat', 'lng'
+                        and 'timezone' of the airport, or None if unknown.
+    """
+    if not isinstance(code, str):
+        return None
+    code = code.strip().upper()
+    if len(code) == 3:
+        return AIRPORTS_BY_IATA.get(code)
+    if len(code) == 4:
+        return AIRPORTS_BY_ICAO.get(code)
+    return None
+
+
+def airport_city(code: str) -> Optional[str]:
+    """
+    Resolves an airport code to the name of the city it serves.
+
+    The city is normalized against the known-city list when possible, so it
+    matches the names produced by `correct_city_name_dynamic`.
+
+    Args:
+        code (str): IATA or ICAO airport code.
+
+    Returns:
+        Optional[str]: The city name, or None if the code is unknown.
+    """
+    airport = lookup_airport(code)
+    if not airport or not airport["city"]:
+        return None
+    return match_city(airport["city"], fuzzy=False) or airport["city"]
+
+
+def enrich_with_airports(result: dict) -> dict:
+    """
+    Validates and fills in extracted ticket fields from the airport index.
+
+    - Fills `destination` / `origin` from `airport_code` / `origin_code` when
+      they are missing or not recognizable city names.
+    - Fills `airport_name` and adds `arrival_timezone` for the destination airport.
+
+    Args:
+        result (dict): Extracted ticket fields (modified in place).
+
+    Returns:
+        dict: The same dict, for convenience.
+    """
+    for code_key, city_key in (("airport_code", "destination"), ("origin_code", "origin")):
+        airport = lookup_airport(result.get(code_key))
+        if not airport:
+            continue
+        city = airport_city(airport["iata"] or airport["icao"])
+        current = result.get(city_key)
+        if city and (not isinstance(current, str) or not match_city(current, fuzzy=False)):
+            result[city_key] = city
+        elif city and current != city:
+            logger.info("%s '%s' differs from airport %s city '%s'", city_key, current, result[code_key], city)
+
+        if code_key == "airport_code":
+            if not result.get("airport_name"):
+                result["airport_name"] = airport["name"]
+            if airport["timezone"]:
+                result.setdefault("arrival_timezone", airport["timezone"])
+
+    return result
@@ -0,0 +1,121 @@
+import os
+import json
+import asyncio
+import hashlib
+import yaml
+from typing import Callable
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+ARTIFACT_DIR = os.path.join(
+    config.get("CACHE_DIR", "cache"),
+    config.get("ARTIFACTS", {}).get("directory", "artifacts")
+)
+
+# Bump when a renderer's output changes, so stale artifacts are not served
+RENDERER_VERSIONS = {"pdf": 1, "map": 1}
+
+# One lock per artifact, so concurrent requests render it only once
+_render_locks: dict[str, asyncio.Lock] = {}
+
+
+def artifact_key(kind: str, inputs: dict) -> str:
+    """
+    Builds the content address of an artifact from its kind, renderer version and inputs.
+
+    The key doubles as the artifact's ETag, so it can be compared before anything is rendered.
+
+    Args:
+        kind (str): The artifact kind ("pdf" or "map").
+        inputs (dict): JSON-serializable renderer arguments.
+
+    Returns:
+        str: A sha256 hex digest.
+    """
+    material = json.dumps(
+        {"kind": kind, "version": RENDERER_VERSIONS[kind], "inputs": inputs},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _render_pdf(itinerary: str, destination: str) -> bytes:
+    from src.pdf import generate_pdf
+    return generate_pdf(itinerary, destination)
+
+
+def _render_map(origin, destination, origin_code, airport_code) -> bytes:
+    from src.route_map import render_route_map
+    return render_route_map(origin, destination, origin_code, airport_code).encode("utf-8")
+
+
+ARTIFACT_RENDERERS: dict[str, tuple[Callable[..., bytes], str]] = {
+    "pdf": (_render_pdf, "pdf"),
+    "map": (_render_map, "html"),
+}
+
+
+def artifact_inputs(kind: str, record: dict) -> dict:
+    """
+    Selects the fields of a stored itinerary that an artifact depends on.
+
+    Args:
+        kind (str): The artifact kind ("pdf" or "map").
+        record (dict): A stored itinerary (see `src.itineraries`).
+
+    Returns:
+        dict: Keyword arguments for the artifact's renderer.
+    """
+    if kind == "pdf":
+        return {"itinerary": record.get("itinerary") or "", "destination": (record.get("city") or "").strip()}
+    return {
+        "origin": record.get("origin"),
+        "destination": record.get("city"),
+        "origin_code": record.get("origin_code"),
+        "airport_code": record.get("airport_code"),
+    }
+
+
+async def get_artifact(kind: str, inputs: dict) -> tuple[str, str]:
+    """
+    Returns the cached artifact for the given inputs, rendering it on first use.
+
+    Artifacts are stored on disk under their content address, so identical
+    itineraries share one file across requests, workers and restarts. Rendering
+    runs in a worker thread.
+
+    Args:
+        kind (str): The artifact kind ("pdf" or "map").
+        inputs (dict): Renderer arguments (see `artifact_inputs`).
+
+    Returns:
+        tuple[str, str]: The artifact's file path and its key (ETag).
+    """
+    render, extension = ARTIFACT_RENDERERS[kind]
+    key = artifact_key(kind, inputs)
+    path = os.path.join(ARTIFACT_DIR, f"{key}.{extension}")
+    if os.path.exists(path):
+        return path, key
+
+    lock = _render_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            if not os.path.exists(path):
+                data = await asyncio.to_thread(render, **inputs)
+                os.makedirs(ARTIFACT_DIR, exist_ok=True)
+                # Write-then-rename, so other workers never serve a partial file
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                logger.info("Rendered %s artifact %s (%d bytes)", kind, key[:12], len(data))
+    finally:
+        if not lock.locked():
+            _render_locks.pop(key, None)
+    return path, key
@@ -0,0 +1,195 @@
+import io
+import asyncio
+import yaml
+from datetime import date, timedelta
+from typing import Optional
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+BARCODE_ENABLED = config.get("BARCODE", {}).get("enabled", True)
+
+# IATA BCBP (Resolution 792) mandatory items: (name, offset, length)
+FIRST_LEG_FIELDS = [
+    ("format_code", 0, 1),
+    ("number_of_legs", 1, 1),
+    ("passenger_name", 2, 20),
+    ("eticket_indicator", 22, 1),
+    ("pnr", 23, 7),
+    ("from", 30, 3),
+    ("to", 33, 3),
+    ("carrier", 36, 3),
+    ("flight_number", 39, 5),
+    ("julian_date", 44, 3),
+    ("compartment", 47, 1),
+    ("seat", 48, 4),
+    ("check_in_sequence", 52, 5),
+    ("passenger_status", 57, 1),
+    ("conditional_size", 58, 2),
+]
+FIRST_LEG_LENGTH = 60
+
+# Repeated legs start with the same items, minus the header fields
+NEXT_LEG_FIELDS = [
+    ("pnr", 0, 7),
+    ("from", 7, 3),
+    ("to", 10, 3),
+    ("carrier", 13, 3),
+    ("flight_number", 16, 5),
+    ("julian_date", 21, 3),
+    ("compartment", 24, 1),
+    ("seat", 25, 4),
+    ("check_in_sequence", 29, 5),
+    ("passenger_status", 34, 1),
+    ("conditional_size", 35, 2),
+]
+NEXT_LEG_LENGTH = 37
+
+
+def _slice_fields(data: str, start: int, fields: list) -> dict:
+    return {name: data[start + offset:start + offset + length].strip() for name, offset, length in fields}
+
+
+def _julian_to_date(day_of_year: str, today: date) -> Optional[date]:
+    """
+    Converts a BCBP day-of-year to a date, picking the year closest to `today`
+    (this year, unless that date is more than a month in the past).
+    """
+    if not day_of_year.isdigit() or not 1 <= int(day_of_year) <= 366:
+        return None
+    day = int(day_of_year)
+    candidate = date(today.year, 1, 1) + timedelta(days=day - 1)
+    if (today - candidate).days > 31:
+        candidate = date(today.year + 1, 1, 1) + timedelta(days=day - 1)
+    return candidate
+
+
+def _format_flight_number(carrier: str, number: str) -> Optional[str]:
+    digits = number.strip()
+    if not carrier or not digits:
+        return None
+    suffix = digits[-1] if digits[-1].isalpha() else ""
+    digits = digits.rstrip(suffix).lstrip("0") or "0"
+    return f"{carrier}{digits.zfill(3)}{suffix}"
+
+
+def parse_bcbp(data: str, today: Optional[date] = None) -> Optional[dict]:
+    """
+    Parses the mandatory items of an IATA Bar Coded Boarding Pass (BCBP) string.
+
+    Multi-leg passes are supported: the origin comes from the first leg and the
+    destination, flight and date from the last one.
+
+    Args:
+        data (str): The decoded barcode payload (starts with "M").
+        today (date, optional): Reference date used to resolve the Julian flight date.
+
+    Returns:
+        Optional[dict]: Extracted fields ('origin_code', 'airport_code', 'flight_number',
+                        'flight_date', 'carrier', 'seat', 'pnr', 'legs'), or None if the
+                        payload is not a valid BCBP string.
+    """
+    today = today or date.today()
+    if len(data) < FIRST_LEG_LENGTH or data[0] != "M" or not data[1].isdigit():
+        return None
+
+    legs = [_slice_fields(data, 0, FIRST_LEG_FIELDS)]
+    try:
+        position = FIRST_LEG_LENGTH + int(legs[0]["conditional_size"], 16)
+        for _ in range(int(data[1]) - 1):
+            if len(data) < position + NEXT_LEG_LENGTH:
+                break
+            leg = _slice_fields(data, position, NEXT_LEG_FIELDS)
+            legs.append(leg)
+            position += NEXT_LEG_LENGTH + int(leg["conditional_size"], 16)
+    except ValueError:
+        pass
+
+    first, last = legs[0], legs[-1]
+    if not (first["from"].isalpha() and last["to"].isalpha()):
+        return None
+
+    flight_date = _julian_to_date(last["julian_date"], today)
+    return {
+        "origin_code": first["from"],
+        "airport_code": last["to"],
+        "carrier": last["carrier"],
+        "flight_number": _format_flight_number(last["carrier"], last["flight_number"]),
+        "flight_date": flight_date.strftime("%d/%m/%Y") if flight_date else None,
+        "seat": last["seat"].lstrip("0") or None,
+        "pnr": first["pnr"] or None,
+        "legs": len(legs),
+    }
+
+
+def _decode_barcodes(image_data: bytes) -> list[str]:
+    """
+    Decodes every barcode in an image with zxing-cpp (PDF417, Aztec, QR, ...).
+
+    Runs in a worker thread. Returns an empty list if the optional decoder
+    dependencies (zxing-cpp, Pillow) are not installed.
+    """
+    try:
+        import zxingcpp
+        from PIL import Image, ImageOps
+    except ImportError:
+        return []
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_data))).convert("L")
+    return [result.text for result in zxingcpp.read_barcodes(image) if result.text]
+
+
+def bcbp_to_text(fields: dict) -> str:
+    """
+    Renders decoded barcode fields as ticket-like text for the extraction step.
+
+    The flight date is left out: it is the departure date, and the extraction
+    step reads any date in the text as the arrival date. It is passed on as the
+    structured `flight_date` field instead.
+
+    Args:
+        fields (dict): Output of `parse_bcbp`.
+
+    Returns:
+        str: A short labelled text block (FROM/TO/FLIGHT).
+    """
+    lines = [
+        f"FROM: {fields['origin_code']}",
+        f"TO: {fields['airport_code']}",
+    ]
+    if fields.get("flight_number"):
+        lines.append(f"FLIGHT: {fields['flight_number']}")
+    return "\n".join(lines)
+
+
+async def read_boarding_pass_barcode(image_data: bytes) -> Optional[dict]:
+    """
+    Tries to decode a BCBP barcode from a boarding pass image, entirely locally.
+
+    Args:
+        image_data (bytes): The raw image bytes.
+
+    Returns:
+        Optional[dict]: Parsed BCBP fields (see `parse_bcbp`), or None if no
+                        valid boarding-pass barcode was found.
+    """
+    if not BARCODE_ENABLED:
+        return None
+
+    try:
+        payloads = await asyncio.to_thread(_decode_barcodes, image_data)
+    except Exception as e:
+        logger.warning("Barcode decoding failed: %s", repr(e))
+        return None
+
+    for payload in payloads:
+        fields = parse_bcbp(payload)
+        if fields:
+            logger.info("BCBP barcode decoded: %s -> %s (%s)", fields["origin_code"], fields["airport_code"], fields["flight_number"])
+            return fields
+    return None
@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from src.logger import get_logger
+from src.metrics import CACHE_LOOKUPS
+
+# Initialize logger
+logger = get_logger(__name__)
+
+
+class MemoryCache:
+    """
+    In-process LRU cache with a per-entry time-to-live.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[Any, float]]:
+        """
+        Returns `(value, expires_at)` for a live entry, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value, expires_at
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Persistent JSON cache stored in a SQLite file.
+
+    The file survives restarts and can be shared by several uvicorn workers
+    (WAL mode lets readers and a writer work side by side).
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_entries: Optional[int] = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created ON {table} (created_at)")
+
+    def get(self, key: str) -> Optional[tuple[Any, float]]:
+        """
+        Returns `(value, expires_at)` for a live entry, or None if missing or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, expires_at)
+            )
+            self._writes += 1
+
+        # Size-based eviction is amortized over writes to keep `set` cheap
+        if self.max_entries is not None and self._writes % 64 == 0:
+            self.purge_expired()
+            self.trim(self.max_entries)
+
+    def purge_expired(self) -> int:
+        """
+        Deletes every expired entry and returns how many were removed.
+        """
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def trim(self, max_entries: int) -> int:
+        """
+        Deletes the oldest entries beyond `max_entries` and returns how many were removed.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (max_entries,)
+            )
+        return cursor.rowcount
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache: an in-process LRU in front of an optional SQLite store.
+
+    Reads check memory first, then disk; disk hits are promoted into memory
+    with their remaining TTL. Writes go to both tiers. Values must be
+    JSON-serializable, and callers must not mutate what `get` returns.
+    """
+
+    def __init__(self, name: str, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.counters["memory_hits"] += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result="memory_hit")
+            return entry[0]
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk read failed: %s", self.name, e)
+                entry = None
+            if entry is not None:
+                self.counters["disk_hits"] += 1
+                CACHE_LOOKUPS.inc(cache=self.name, result="disk_hit")
+                self.memory.set(key, entry[0], entry[1])
+                return entry[0]
+
+        self.counters["misses"] += 1
+        CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+        return None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk write failed: %s", self.name, e)
+        self.counters["sets"] += 1
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters plus the overall hit ratio.
+        """
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "memory_entries": len(self.memory),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,18 +1,85 @@
 from rapidfuzz import process
-import pandas as pd
+from functools import lru_cache
+from typing import Optional
+from src.city_index import CityIndex, build_city_index
+from src.logger import get_logger
 import os
 
+# Initialize logger
+logger = get_logger(__name__)
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CITY_FILE_PATH = os.path.join(BASE_DIR, "data", "worldcities.csv")
+CITY_INDEX_PATH = os.path.join(BASE_DIR, "data", "worldcities.idx")
+
+
+def _load_city_index() -> CityIndex:
+    """
+    Opens the memory-mapped city index, (re)building it from worldcities.csv if it is
+    missing or older than the CSV. Build it ahead of time with `python -m src.city_index`.
+    """
+    stale = not os.path.exists(CITY_INDEX_PATH) or (
+        os.path.exists(CITY_FILE_PATH)
+        and os.path.getmtime(CITY_FILE_PATH) > os.path.getmtime(CITY_INDEX_PATH)
+    )
+    if stale:
+        count = build_city_index(CITY_FILE_PATH, CITY_INDEX_PATH)
+        logger.info("Built city index with %d cities at %s", count, CITY_INDEX_PATH)
+    return CityIndex(CITY_INDEX_PATH)
+
+
+CITY_INDEX = _load_city_index()
+
+
+@lru_cache(maxsize=4096)
+def match_city(name: str, score_threshold: float = 85.0, fuzzy: bool = True) -> Optional[str]:
+    """
+    Looks up a city name, first exactly (case-insensitive), then fuzzily.
+
+    The exact lookup is a hash probe into the city index. The fuzzy lookup only
+    scores the few hundred cities that share the most trigrams with the input,
+    rather than every known city. Results are memoized.
+
+    Args:
+        name (str): The city name to look up.
+        score_threshold (float, optional): Minimum RapidFuzz score for a fuzzy match.
+        fuzzy (bool, optional): Set to False to only accept exact matches.
+
+    Returns:
+        Optional[str]: The canonical city name, or None if there is no match.
+    """
+    name = name.strip().title()
+    if not name:
+        return None
+    name_id = CITY_INDEX.lookup(name)
+    if name_id is not None:
+        return CITY_INDEX.name(name_id)
+    if not fuzzy:
+        return None
+    candidates = [CITY_INDEX.name(candidate) for candidate in CITY_INDEX.candidates(name)]
+    match = process.extractOne(name, candidates, score_cutoff=score_threshold)
+    return match[0] if match else None
+
+
+def city_coordinates(name: str) -> Optional[tuple[float, float]]:
+    """
+    Returns the (latitude, longitude) of a known city, matched case-insensitively.
+
+    Args:
+        name (str): The city name.
+
+    Returns:
+        Optional[tuple[float, float]]: The coordinates, or None if the city is unknown.
+    """
+    name_id = CITY_INDEX.lookup(name.strip())
+    return CITY_INDEX.coordinates(name_id) if name_id is not None else None
 
-city_df = pd.read_csv(CITY_FILE_PATH)
-CITY_LIST = city_df['city'].dropna().unique().tolist()
 
 def correct_city_name_dynamic(name: str, score_threshold: float = 85.0) -> str:
     """
     Attempts to correct a potentially misspelled city name using fuzzy string matching.
 
-    This function compares the input city name to a list of known world cities
+    This function compares the input city name to the known world cities
     (from worldcities.csv) using RapidFuzz. If a sufficiently close match is found,
     it returns the corrected city name; otherwise, it returns the original.
 
@@ -25,6 +92,4 @@ def correct_city_name_dynamic(name: str, score_threshold: float = 85.0) -> str:
     Returns:
         str: The corrected city name if a close match is found, otherwise the original name.
     """
-    name = name.strip().title()
-    match = process.extractOne(name, CITY_LIST, score_cutoff=score_threshold)
-    return match[0] if match else name
+    return match_city(name, score_threshold) or name.strip().title()
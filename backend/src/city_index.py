@@ -0,0 +1,205 @@
+import os
+import csv
+import sys
+import mmap
+import array
+import struct
+import zlib
+from bisect import bisect_left
+from collections import Counter
+from typing import Optional
+
+# File layout (all integers little-endian uint32, every section 4-byte aligned):
+#   header        MAGIC, n_names, n_slots, n_grams, n_postings, blob_len
+#   offsets       n_names + 1   byte offsets of each name in the blob
+#   blob          blob_len      UTF-8 names, padded to a multiple of 4
+#   lat, lng      n_names each  float32 coordinates
+#   slots         n_slots       open-addressing table: casefold(name) -> name id + 1 (0 = empty)
+#   gram_keys     n_grams       sorted CRC32 of each trigram
+#   gram_starts   n_grams + 1   start of each trigram's posting list
+#   postings      n_postings    name ids, grouped by trigram
+MAGIC = b"CITYIDX1"
+HEADER = struct.Struct("<8sIIIII")
+
+
+def _hash(key: str) -> int:
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def trigrams(name: str) -> set[str]:
+    """
+    Returns the padded, casefolded character trigrams of a name.
+    """
+    padded = f"  {name.casefold()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _aligned(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def build_city_index(csv_path: str, index_path: str) -> int:
+    """
+    Builds the compact city index file from worldcities.csv (run offline or at first start).
+
+    Keeps the first row of every distinct city name, which in worldcities.csv is the
+    most populous one, matching the previous `unique()` behaviour.
+
+    Args:
+        csv_path (str): Path to worldcities.csv (needs `city`, `lat` and `lng` columns).
+        index_path (str): Where to write the index.
+
+    Returns:
+        int: Number of cities in the index.
+    """
+    names, lats, lngs, seen = [], array.array("f"), array.array("f"), set()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("city") or "").strip()
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            names.append(name)
+            try:
+                lats.append(float(row.get("lat") or "nan"))
+                lngs.append(float(row.get("lng") or "nan"))
+            except ValueError:
+                lats.append(float("nan"))
+                lngs.append(float("nan"))
+
+    offsets, blob = array.array("I", [0]), bytearray()
+    for name in names:
+        blob += name.encode("utf-8")
+        offsets.append(len(blob))
+
+    n_slots = 1
+    while n_slots < len(names) * 2:
+        n_slots *= 2
+    slots = array.array("I", [0]) * n_slots
+    for name_id, name in enumerate(names):
+        key = name.casefold()
+        slot = _hash(key) & (n_slots - 1)
+        while slots[slot]:
+            if names[slots[slot] - 1].casefold() == key:
+                break
+            slot = (slot + 1) & (n_slots - 1)
+        else:
+            slots[slot] = name_id + 1
+
+    grams: dict[int, list[int]] = {}
+    for name_id, name in enumerate(names):
+        for gram in trigrams(name):
+            grams.setdefault(_hash(gram), []).append(name_id)
+    gram_keys = array.array("I", sorted(grams))
+    gram_starts, postings = array.array("I", [0]), array.array("I")
+    for key in gram_keys:
+        postings.extend(grams[key])
+        gram_starts.append(len(postings))
+
+    sections = [offsets, _aligned(bytes(blob)), lats, lngs, slots, gram_keys, gram_starts, postings]
+    if sys.byteorder != "little":
+        for section in sections:
+            if isinstance(section, array.array):
+                section.byteswap()
+
+    # Per-process temp file: every worker rebuilds a stale index at import time
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(names), n_slots, len(gram_keys), len(postings), len(blob)))
+        for section in sections:
+            f.write(section if isinstance(section, bytes) else section.tobytes())
+    os.replace(tmp_path, index_path)
+    return len(names)
+
+
+class CityIndex:
+    """
+    Read-only, memory-mapped view of a city index built by `build_city_index`.
+
+    Opening the index maps the file without parsing it, so it loads in
+    milliseconds and its pages are shared between worker processes.
+    """
+
+    def __init__(self, index_path: str):
+        if sys.byteorder != "little":
+            raise RuntimeError("CityIndex requires a little-endian platform")
+        with open(index_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n_names, n_slots, n_grams, n_postings, blob_len = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path} is not a city index")
+
+        view = self._view = memoryview(self._mmap)
+        position = HEADER.size
+
+        def take(count: int, fmt: str) -> memoryview:
+            nonlocal position
+            section = view[position:position + count * 4].cast(fmt)
+            position += count * 4
+            return section
+
+        self.size = n_names
+        self._offsets = take(n_names + 1, "I")
+        self._blob = view[position:position + blob_len]
+        position += blob_len + (-blob_len % 4)
+        self._lat = take(n_names, "f")
+        self._lng = take(n_names, "f")
+        self._slots = take(n_slots, "I")
+        self._gram_keys = take(n_grams, "I")
+        self._gram_starts = take(n_grams + 1, "I")
+        self._postings = take(n_postings, "I")
+
+    def name(self, name_id: int) -> str:
+        return bytes(self._blob[self._offsets[name_id]:self._offsets[name_id + 1]]).decode("utf-8")
+
+    def coordinates(self, name_id: int) -> Optional[tuple[float, float]]:
+        lat, lng = self._lat[name_id], self._lng[name_id]
+        if lat != lat or lng != lng:  # NaN
+            return None
+        return float(lat), float(lng)
+
+    def lookup(self, name: str) -> Optional[int]:
+        """
+        Returns the id of the city whose name equals `name` case-insensitively, or None.
+        """
+        key = name.casefold()
+        mask = len(self._slots) - 1
+        slot = _hash(key) & mask
+        while True:
+            entry = self._slots[slot]
+            if not entry:
+                return None
+            if self.name(entry - 1).casefold() == key:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def candidates(self, name: str, limit: int = 256) -> list[int]:
+        """
+        Returns the ids of the cities sharing the most trigrams with `name`.
+
+        Used as a prefilter so fuzzy scoring only looks at a few hundred names
+        instead of the whole list.
+        """
+        counts = Counter()
+        for gram in trigrams(name):
+            key = _hash(gram)
+            position = bisect_left(self._gram_keys, key)
+            if position < len(self._gram_keys) and self._gram_keys[position] == key:
+                counts.update(self._postings[self._gram_starts[position]:self._gram_starts[position + 1]])
+        return [name_id for name_id, _ in counts.most_common(limit)]
+
+    def close(self) -> None:
+        for section in (self._offsets, self._blob, self._lat, self._lng,
+                        self._slots, self._gram_keys, self._gram_starts, self._postings, self._view):
+            section.release()
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    # Usage (from backend/): python -m src.city_index [worldcities.csv] [worldcities.idx]
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_dir, "data", "worldcities.csv")
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + ".idx"
+    count = build_city_index(source, target)
+    print(f"Indexed {count} cities into {target}")
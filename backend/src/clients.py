@@ -0,0 +1,171 @@
+import os
+import httpx
+import yaml
+from typing import Optional
+from src.logger import get_logger
+from src import replay
+from src import metrics
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+HTTP_CLIENTS = config.get("HTTP_CLIENTS", {})
+
+_async_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class AsyncRedirectTransport(httpx.AsyncBaseTransport):
+    """
+    Sends every request to another origin (scheme, host, port), keeping path and query.
+
+    Used to point an upstream at a local stand-in server, e.g. for benchmarks.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, target: str):
+        self.inner = inner
+        url = httpx.URL(target)
+        self.scheme, self.host, self.port = url.scheme, url.host, url.port
+        self.netloc = f"{url.host}:{url.port}" if url.port else url.host
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme=self.scheme, host=self.host, port=self.port)
+        request.headers["Host"] = self.netloc
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _redirect_target(name: str) -> Optional[str]:
+    """
+    Returns the origin an upstream is redirected to, if any.
+
+    Set with the `HTTP_REDIRECT_<NAME>` environment variable (e.g.
+    `HTTP_REDIRECT_GEMMA=http://127.0.0.1:9101`) or `HTTP_CLIENTS.<name>.redirect`.
+    """
+    return os.getenv(f"HTTP_REDIRECT_{name.upper()}") or (HTTP_CLIENTS.get(name) or {}).get("redirect")
+
+
+def _client_options(name: str) -> dict:
+    """
+    Builds the httpx client options for a named upstream from `HTTP_CLIENTS`.
+
+    Settings under `HTTP_CLIENTS.default` apply to every upstream and can be
+    overridden per upstream (e.g. `HTTP_CLIENTS.gemma.timeout`).
+
+    Args:
+        name (str): Upstream name (e.g. "gemma", "searx", "ocr_space", "azure_ocr").
+
+    Returns:
+        dict: Keyword arguments for `httpx.AsyncClient`.
+    """
+    settings = {
+        "timeout": 30,
+        "connect_timeout": 10,
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 30,
+        "http2": False,
+    }
+    settings.update(HTTP_CLIENTS.get("default") or {})
+    settings.update(HTTP_CLIENTS.get(name) or {})
+
+    http2 = bool(settings["http2"])
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested for '%s' but the h2 package is not installed; using HTTP/1.1", name)
+        http2 = False
+
+    return {
+        "timeout": httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+        "limits": httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive_connections"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        ),
+        "http2": http2,
+    }
+
+
+def _async_transport(name: str, options: dict) -> Optional[httpx.AsyncBaseTransport]:
+    """
+    Builds the transport stack for an upstream, or None for the httpx default.
+
+    Replay answers from the archive without any network transport; otherwise
+    the redirect and the recorder wrap the pooled HTTP transport. Metrics wrap
+    the whole stack, so replayed calls are measured like live ones.
+    """
+    mode = replay.replay_mode(name)
+    target = _redirect_target(name)
+    if mode == "replay":
+        logger.info("Upstream '%s' replayed from %s", name, replay.REPLAY_ARCHIVE)
+        transport = replay.AsyncReplayTransport(
+            replay.get_archive(), replay.REPLAY_LATENCY_SCALE, options["limits"].max_connections
+        )
+    elif target or mode == "record" or metrics.METRICS_ENABLED:
+        transport = httpx.AsyncHTTPTransport(limits=options["limits"], http2=options["http2"])
+        if target:
+            transport = AsyncRedirectTransport(transport, target)
+            logger.info("Upstream '%s' redirected to %s", name, target)
+        if mode == "record":
+            transport = replay.AsyncRecordingTransport(transport, name, replay.get_recorder())
+    else:
+        return None
+    return metrics.AsyncInstrumentedTransport(transport, name) if metrics.METRICS_ENABLED else transport
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    Returns the shared, pooled async HTTP client for an upstream.
+
+    Clients are created lazily on first use and reused for every later call,
+    so requests to the same upstream share keep-alive connections instead of
+    paying for TCP/TLS setup each time.
+
+    Args:
+        name (str): Upstream name (e.g. "gemma", "searx", "ocr_space", "azure_ocr").
+
+    Returns:
+        httpx.AsyncClient: The pooled client for that upstream.
+    """
+    client = _async_clients.get(name)
+    if client is None or client.is_closed:
+        options = _client_options(name)
+        transport = _async_transport(name, options)
+        if transport is not None:
+            options["transport"] = transport
+        client = httpx.AsyncClient(**options)
+        _async_clients[name] = client
+    return client
+
+
+def open_clients(names: list[str]) -> None:
+    """
+    Eagerly creates the async clients for the given upstreams (called at app startup).
+
+    Args:
+        names (list[str]): Upstream names to initialize.
+    """
+    for name in names:
+        get_client(name)
+    logger.info("HTTP clients ready: %s", ", ".join(names))
+
+
+async def close_clients() -> None:
+    """
+    Closes every pooled client (called at app shutdown).
+    """
+    for client in _async_clients.values():
+        await client.aclose()
+    _async_clients.clear()
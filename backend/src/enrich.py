@@ -0,0 +1,181 @@
+import re
+import hashlib
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from config.prompts import extract_price, guess_price_range
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = re.compile(r"^(?:utm_\w+|gclid|fbclid|msclkid|mc_\w+|ref|ref_src|_ga|yclid|igshid|srsltid)$", re.IGNORECASE)
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# Snippets whose 64-bit SimHashes differ in at most this many bits are near-duplicates
+SIMHASH_MAX_DISTANCE = 3
+SIMHASH_MIN_TOKENS = 8
+
+PRICE_TIERS = {"$$$": "Luxury", "$$": "Mid-Range", "$": "Cheap"}
+CHEAP_HINTS = ("cheap", "budget", "affordable")
+TOKEN = re.compile(r"\w+")
+# BIT_TABLES[bit][value] is bit `bit` of the byte `value`, for counting set bits with bytes.translate
+BIT_TABLES = [bytes(value >> bit & 1 for value in range(256)) for bit in range(8)]
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes a URL for display: lowercases scheme and host, and drops default
+    ports, fragments and tracking parameters.
+
+    Args:
+        url (str): The URL as returned by the search engine.
+
+    Returns:
+        str: The canonical URL (unchanged if it cannot be parsed).
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    netloc = f"{host}:{port}" if port and str(port) != DEFAULT_PORTS.get(scheme) else host
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)]
+    return urlunsplit((scheme, netloc, parts.path, urlencode(query), ""))
+
+
+def url_key(url: str) -> str:
+    """
+    Returns the de-duplication key of a canonical URL: the same page over http or
+    https, with or without "www.", a trailing slash or reordered parameters, maps to one key.
+    """
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{host}{parts.path.rstrip('/')}?{query}" if host else url
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    Computes a 64-bit SimHash of a snippet from its word bigrams.
+
+    Returns None for snippets too short to compare meaningfully.
+    """
+    tokens = TOKEN.findall(text.lower())
+    if len(tokens) < SIMHASH_MIN_TOKENS:
+        return None
+    digests = b"".join(
+        hashlib.blake2b(f"{first} {second}".encode("utf-8"), digest_size=8).digest()
+        for first, second in zip(tokens, tokens[1:])
+    )
+    # A fingerprint bit is set when it is set in more than half of the bigram digests.
+    # Count each digest bit column at once: byte `byte` of every digest, then each bit of it.
+    shingles = len(tokens) - 1
+    fingerprint = 0
+    for byte in range(8):
+        column = digests[byte::8]
+        for bit, table in enumerate(BIT_TABLES):
+            if 2 * column.translate(table).count(1) > shingles:
+                fingerprint |= 1 << (8 * (7 - byte) + bit)
+    return fingerprint
+
+
+class ResultEnricher:
+    """
+    Single-pass de-duplication and annotation of search results.
+
+    Results are fed one at a time with `add`, so the stage can consume them as
+    the searches complete. For each result it:
+
+    - canonicalizes the URL and drops repeats of a page already seen in the same
+      category (e.g. from the "best" and "cheap" restaurant queries)
+    - drops results whose normalized title and snippet repeat an earlier one in the
+      category, then snippets that are near-duplicates (SimHash) of an earlier one
+    - extracts the price and the price-tier cue, and assigns `tier`
+      ("Cheap" / "Mid-Range" / "Luxury") and `category_hint`
+    """
+
+    def __init__(self):
+        self._urls: set[tuple[str, str]] = set()
+        self._texts: set[tuple[str, str, str]] = set()
+        self._hashes: dict[str, list[int]] = {}
+        self.counters = {"kept": 0, "duplicate_url": 0, "duplicate_text": 0, "near_duplicate": 0, "error": 0}
+
+    def add(self, result: dict) -> Optional[dict]:
+        """
+        Returns the enriched result, or None if it is an error stub or a duplicate.
+        """
+        if result.get("error"):
+            self.counters["error"] += 1
+            return None
+
+        category = result.get("category", "general")
+        url = canonical_url(result.get("url", ""))
+        if url:
+            key = (category, url_key(url))
+            if key in self._urls:
+                self.counters["duplicate_url"] += 1
+                return None
+            self._urls.add(key)
+
+        title = result.get("title", "")
+        content = result.get("content", "")
+        # Exact repeats (mirrors, syndicated listings) are cheap to catch before hashing
+        snippet = " ".join(TOKEN.findall(content.lower()))
+        if snippet:
+            text_key = (category, " ".join(TOKEN.findall(title.lower())), snippet)
+            if text_key in self._texts:
+                self.counters["duplicate_text"] += 1
+                return None
+            self._texts.add(text_key)
+
+        fingerprint = simhash(content)
+        if fingerprint is not None:
+            seen_hashes = self._hashes.setdefault(category, [])
+            if any(bin(fingerprint ^ seen).count("1") <= SIMHASH_MAX_DISTANCE for seen in seen_hashes):
+                self.counters["near_duplicate"] += 1
+                return None
+            seen_hashes.append(fingerprint)
+
+        price = extract_price(content)
+        price_range = guess_price_range(content) or guess_price_range(title)
+        # Same precedence as before: an explicit price places the result in the mid-range tier
+        tier = PRICE_TIERS.get(price_range) if not price else None
+
+        enriched = {
+            **result,
+            "url": url,
+            "price": price,
+            "price_range": price_range,
+            "tier": tier or "Mid-Range",
+        }
+        if any(hint in title.lower() for hint in CHEAP_HINTS):
+            enriched["category_hint"] = "cheap"
+        self.counters["kept"] += 1
+        return enriched
+
+
+def enrich_results(results: Iterable[dict]) -> list[dict]:
+    """
+    De-duplicates and annotates the combined search results (see `ResultEnricher`).
+
+    Args:
+        results (Iterable[dict]): Results from `search_searx` / `search_searx_many`, in priority order.
+
+    Returns:
+        list[dict]: The kept results with `url` canonicalized and `price`,
+                    `price_range`, `tier` and `category_hint` set.
+    """
+    enricher = ResultEnricher()
+    enriched = [item for item in map(enricher.add, results) if item is not None]
+    logger.info("Enriched search results: %s", enricher.counters)
+    return enriched
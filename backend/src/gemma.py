@@ -1,10 +1,15 @@
 import os
+import copy
+import hashlib
 import httpx
 import json
 import re
 import yaml
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
 from src.logger import get_logger
+from src.clients import get_client
+from src.cache import MemoryCache, SQLiteCache, TieredCache
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -17,21 +22,33 @@ with open("config/settings.yaml", "r") as f:
 
 GEMMA_API_KEY = os.getenv("GEMMA_API_KEY")
 GEMMA_API_URL = config["GEMMA_API_URL"]
-
-def call_gemma(prompt: str) -> dict:
+GEMMA_STREAM_API_URL = config.get(
+    "GEMMA_STREAM_API_URL",
+    GEMMA_API_URL.replace(":generateContent", ":streamGenerateContent")
+)
+
+CACHE_SETTINGS = config.get("GEMMA_CACHE", {})
+GEMMA_CACHE_TTL = CACHE_SETTINGS.get("max_age_seconds", 86400)
+GEMMA_CACHE = None
+if CACHE_SETTINGS.get("enabled", False):
+    GEMMA_CACHE = TieredCache(
+        "gemma",
+        MemoryCache(CACHE_SETTINGS.get("memory_max_entries", 256)),
+        SQLiteCache(
+            os.path.join(config.get("CACHE_DIR", "cache"), "gemma.sqlite3"),
+            max_entries=CACHE_SETTINGS.get("disk_max_entries", 5000)
+        ) if CACHE_SETTINGS.get("persistent", True) else None
+    )
+
+def _build_gemma_request(prompt: str) -> tuple[dict, dict]:
     """
-    Sends a prompt to the Gemma 3 27B LLM API and returns the model's response.
-
-    This function sends a structured request to the Gemma API using a user prompt.
-    If the response is JSON-like, it attempts to parse and return it. Otherwise,
-    it returns the raw text inside an 'output' key.
+    Builds the headers and JSON payload for a Gemma generateContent request.
 
     Args:
         prompt (str): The prompt string to send to the Gemma model.
 
     Returns:
-        dict: A dictionary containing either parsed JSON or the raw text output.
-              If an error occurs, returns {'error': <message>}.
+        tuple[dict, dict]: The request headers and the JSON payload.
     """
     headers = {
         "Content-Type": "application/json",
@@ -46,32 +63,146 @@ def call_gemma(prompt: str) -> dict:
             "maxOutputTokens": 4000,
         }
     }
+    return headers, payload
+
+
+def _parse_gemma_response(response: httpx.Response) -> dict:
+    """
+    Parses a Gemma HTTP response into the dict shape returned by `call_gemma_async`.
+
+    Args:
+        response (httpx.Response): The raw HTTP response from the Gemma API.
+
+    Returns:
+        dict: Parsed JSON output, or the raw text inside an 'output' key.
+    """
+    response.raise_for_status()
+    content = response.json()["candidates"][0]["content"]["parts"][0]["text"].strip()
+    logger.info("GEMMA RAW OUTPUT:\n%s", content)
+
+    if not content:
+        return {"error": "Empty response from Gemma"}
+
+    match = re.search(r'\{[\s\S]+\}', content)
+    if match:
+        content = match.group(0)
 
     try:
-        response = httpx.post(GEMMA_API_URL, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        content = response.json()["candidates"][0]["content"]["parts"][0]["text"].strip()
-        logger.info("GEMMA RAW OUTPUT:\n%s", content)
+        return json.loads(content)
+    except json.JSONDecodeError:
+        logger.warning("Gemma response was not valid JSON. Returning raw content.")
+        return {"output": content}
+
+
+def _gemma_cache_key(url: str, payload: dict) -> str:
+    """
+    Builds a content-addressed cache key from the request URL, prompt and generation config.
+
+    Args:
+        url (str): The Gemma endpoint the payload is sent to (identifies the model).
+        payload (dict): The request payload (prompt contents plus generationConfig).
+
+    Returns:
+        str: A SHA-256 hex digest identifying the request.
+    """
+    canonical = json.dumps({"url": url, "payload": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cached_response(key: Optional[str]):
+    if GEMMA_CACHE is None or key is None:
+        return None
+    cached = GEMMA_CACHE.get(key)
+    if cached is not None:
+        logger.info("Gemma cache hit (%s)", key[:12])
+        # Callers mutate the returned dict (e.g. city correction), so never hand out the cached object
+        return copy.deepcopy(cached)
+    return None
+
 
-        if not content:
-            return {"error": "Empty response from Gemma"}
+def _store_response(key: Optional[str], result) -> None:
+    if GEMMA_CACHE is None or key is None:
+        return
+    if isinstance(result, dict) and "error" in result:
+        return
+    GEMMA_CACHE.set(key, copy.deepcopy(result), GEMMA_CACHE_TTL)
 
-        match = re.search(r'\{[\s\S]+\}', content)
-        if match:
-            content = match.group(0)
 
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            logger.warning("Gemma response was not valid JSON. Returning raw content.")
-            return {"output": content}
+async def call_gemma_async(prompt: str, use_cache: bool = False) -> dict:
+    """
+    Sends a prompt to the Gemma 3 27B LLM API and returns the model's response.
+
+    The request goes through the shared pooled HTTP client. If the response is
+    JSON-like, it is parsed and returned; otherwise the raw text is returned
+    inside an 'output' key.
+
+    With `use_cache` (and the Gemma cache enabled), identical prompts with the
+    same generation config are answered from the cache. Only deterministic
+    prompts (ticket parsing, keyword extraction) should opt in; itineraries and
+    answers must be generated fresh. Error responses are never cached.
+
+    Args:
+        prompt (str): The prompt string to send to the Gemma model.
+        use_cache (bool, optional): Set to True to serve repeated prompts from the cache.
+
+    Returns:
+        dict: A dictionary containing either parsed JSON or the raw text output.
+              If an error occurs, returns {'error': <message>}.
+    """
+    headers, payload = _build_gemma_request(prompt)
+    key = _gemma_cache_key(GEMMA_API_URL, payload) if use_cache else None
+    cached = _cached_response(key)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await get_client("gemma").post(GEMMA_API_URL, headers=headers, json=payload)
+        result = _parse_gemma_response(response)
+        _store_response(key, result)
+        return result
 
     except Exception as e:
         logger.error("Gemma call failed: %s", str(e))
         return {"error": f"Gemma call failed: {str(e)}"}
 
 
-def extract_keywords_from_preferences(preferences: list[str]) -> list[str]:
+async def stream_gemma(prompt: str) -> AsyncIterator[str]:
+    """
+    Streams the Gemma response for a prompt chunk by chunk via streamGenerateContent.
+
+    Uses the same generation config as `call_gemma_async`, but returns the raw text as
+    it is produced instead of waiting for the full response. Nothing is parsed
+    as JSON, so this is meant for free-form markdown output such as itineraries,
+    and nothing is cached.
+
+    Args:
+        prompt (str): The prompt string to send to the Gemma model.
+
+    Yields:
+        str: Successive chunks of generated text.
+
+    Raises:
+        httpx.HTTPError: If the request fails or Gemma returns an error status.
+    """
+    headers, payload = _build_gemma_request(prompt)
+    client = get_client("gemma")
+
+    async with client.stream("POST", GEMMA_STREAM_API_URL, params={"alt": "sse"}, headers=headers, json=payload) as response:
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[len("data:"):])
+            for candidate in event.get("candidates", []):
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+
+
+async def extract_keywords_from_preferences(preferences: list[str]) -> list[str]:
     """
     Extracts concise, search-worthy keywords from a list of user preferences
     using the Gemma LLM.
@@ -97,6 +228,6 @@ Only output a comma-separated list. Do NOT include explanations.
 Traveler said:
 \"\"\"{combined}\"\"\"
 """
-    response = call_gemma(prompt)
+    response = await call_gemma_async(prompt, use_cache=True)
     raw_text = response.get("output", str(response)) if isinstance(response, dict) else str(response)
     return [x.strip() for x in raw_text.split(",") if x.strip()]
@@ -0,0 +1,55 @@
+import os
+import time
+import uuid
+import yaml
+from typing import Optional
+from src.cache import SQLiteCache
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+STORE_SETTINGS = config.get("ITINERARY_STORE", {})
+ITINERARY_TTL = STORE_SETTINGS.get("ttl_seconds", 604800)
+
+# Shared SQLite file, so every uvicorn worker can serve any itinerary ID
+ITINERARY_STORE = SQLiteCache(
+    os.path.join(config.get("CACHE_DIR", "cache"), "itineraries.sqlite3"),
+    table="itineraries",
+    max_entries=STORE_SETTINGS.get("max_entries", 10000)
+)
+
+
+def save_itinerary(record: dict) -> str:
+    """
+    Persists a generated itinerary and returns its ID.
+
+    Args:
+        record (dict): The itinerary markdown (`itinerary`) plus the trip fields
+                       returned to the client (`city`, `origin`, `airport`, ...).
+
+    Returns:
+        str: A new opaque itinerary ID.
+    """
+    itinerary_id = uuid.uuid4().hex
+    ITINERARY_STORE.set(itinerary_id, record, time.time() + ITINERARY_TTL)
+    logger.info("Stored itinerary %s for %s", itinerary_id, record.get("city"))
+    return itinerary_id
+
+
+def get_itinerary(itinerary_id: str) -> Optional[dict]:
+    """
+    Loads a stored itinerary.
+
+    Args:
+        itinerary_id (str): ID returned by `save_itinerary`.
+
+    Returns:
+        Optional[dict]: The stored record, or None if unknown or expired.
+    """
+    entry = ITINERARY_STORE.get(itinerary_id)
+    return entry[0] if entry else None
@@ -0,0 +1,112 @@
+import re
+from typing import Iterable, Optional
+
+# Up to this many phrases, C-level `phrase in text` checks beat a regex scan of a
+# snippet-sized text (see benchmarks/bench_matcher.py); larger tables use the regex.
+SUBSTRING_MAX_PHRASES = 64
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """
+    Builds a regex matching any of `phrases`, factored by common prefix.
+
+    "have a car" and "have accommodation" become "have\\ a(?:\\ car|ccommodation)", so at
+    each text position the engine follows a single branch instead of trying every
+    phrase. Optional groups are greedy, so the longest phrase at a position wins.
+    """
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class PhraseMatcher:
+    """
+    Finds which labels of a phrase table occur in a text.
+
+    Built once from a declarative `{label: [phrases]}` table. Matching is
+    case-insensitive plain substring matching, exactly like `phrase in text.lower()`
+    over every phrase. Small tables are checked phrase by phrase, stopping at the
+    first hit per label; larger ones are compiled into a single regex scan so adding
+    phrases does not add per-call passes over the text.
+
+    Example:
+        matcher = PhraseMatcher({"skip_hotels": ["no hotel", "airbnb"]})
+        matcher.labels("Staying at an Airbnb")  # {"skip_hotels"}
+    """
+
+    def __init__(self, table: dict[str, Iterable[str]]):
+        phrase_labels: dict[str, set[str]] = {}
+        for label, phrases in table.items():
+            for phrase in phrases:
+                phrase_labels.setdefault(phrase.lower(), set()).add(label)
+
+        # A match also implies every phrase it contains (e.g. "$$$" implies "$$" and "$"),
+        # which the regex cannot report because it returns one alternative per position.
+        self._labels_of = {
+            phrase: frozenset().union(*(labels for other, labels in phrase_labels.items() if other in phrase))
+            for phrase in phrase_labels
+        }
+        self.all_labels = frozenset(table)
+        self._phrases = {
+            label: tuple(dict.fromkeys(phrase.lower() for phrase in phrases)) for label, phrases in table.items()
+        }
+        self._pattern = None
+        if len(phrase_labels) > SUBSTRING_MAX_PHRASES:
+            self._pattern = re.compile(_trie_pattern(phrase_labels))
+
+    def labels(self, text: str) -> set[str]:
+        """
+        Returns every label with at least one phrase occurring in `text`.
+
+        Args:
+            text (str): The text to scan (any case).
+
+        Returns:
+            set[str]: The matched labels.
+        """
+        found: set[str] = set()
+        if not text:
+            return found
+        text = text.lower()
+        if self._pattern is None:
+            for label, phrases in self._phrases.items():
+                for phrase in phrases:
+                    if phrase in text:
+                        found.add(label)
+                        break
+            return found
+        search = self._pattern.search
+        match = search(text)
+        while match:
+            found |= self._labels_of[match.group(0)]
+            if found == self.all_labels:
+                break
+            # Restart one character later so overlapping phrases are not missed
+            match = search(text, match.start() + 1)
+        return found
+
+    def first(self, text: str, priority: Iterable[str]) -> Optional[str]:
+        """
+        Returns the first label in `priority` that occurs in `text`, or None.
+        """
+        if self._pattern is None:
+            text = text.lower()
+            for label in priority:
+                for phrase in self._phrases.get(label, ()):
+                    if phrase in text:
+                        return label
+            return None
+        found = self.labels(text)
+        return next((label for label in priority if label in found), None)
@@ -0,0 +1,107 @@
+import yaml
+from config.prompts import build_chat_summary_prompt, estimate_tokens
+from src.gemma import call_gemma_async
+from src.sessions import SESSION_STORE
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+MEMORY_SETTINGS = config.get("CHAT_MEMORY", {})
+RECENT_TURNS = MEMORY_SETTINGS.get("recent_turns", 5)
+HISTORY_TOKEN_BUDGET = MEMORY_SETTINGS.get("history_token_budget", 1200)
+ANSWER_MAX_TOKENS = MEMORY_SETTINGS.get("answer_max_tokens", 300)
+SUMMARY_MAX_TOKENS = MEMORY_SETTINGS.get("summary_max_tokens", 250)
+
+# Sessions with a summary update in flight in this worker
+_folding: set[str] = set()
+
+
+def remember_turn(session: dict, question: str, answer: str) -> bool:
+    """
+    Appends a numbered Q&A turn to the session and evicts the oldest turns beyond `RECENT_TURNS`.
+
+    Evicted turns are queued in `pending_turns` until `fold_chat_memory` merges
+    them into the rolling summary.
+
+    Args:
+        session (dict): The session state (modified in place).
+        question (str): The user's question.
+        answer (str): The assistant's answer.
+
+    Returns:
+        bool: True if turns are waiting to be summarized.
+    """
+    session["turn_count"] = session.get("turn_count", 0) + 1
+    history = session["chat_history"]
+    history.append({"n": session["turn_count"], "question": question, "answer": answer})
+    if len(history) > RECENT_TURNS:
+        session.setdefault("pending_turns", []).extend(history[:-RECENT_TURNS])
+        history[:] = history[-RECENT_TURNS:]
+    return bool(session.get("pending_turns"))
+
+
+def load_chat_summary(session_id: str, session: dict) -> str:
+    """
+    Returns the session's chat summary and drops the pending turns it already covers.
+
+    Args:
+        session_id (str): The session ID.
+        session (dict): The session state (modified in place).
+
+    Returns:
+        str: The summary text ("" if none yet).
+    """
+    summary = SESSION_STORE.load_summary(session_id)
+    session["pending_turns"] = [
+        turn for turn in session.get("pending_turns", []) if turn["n"] > summary["folded"]
+    ]
+    return summary["text"]
+
+
+def memory_turns(session: dict) -> list[dict]:
+    """
+    Returns the turns the prompt may quote verbatim: not-yet-summarized ones, then recent ones.
+    """
+    return session.get("pending_turns", []) + session["chat_history"]
+
+
+async def fold_chat_memory(session_id: str) -> None:
+    """
+    Merges a session's pending turns into its summary with one LLM call.
+
+    Meant to run as a background task after the response is sent. Only the
+    summary record is written (see `SessionStore.save_summary`), never the
+    session itself, so turns saved by requests in the meantime are kept; they
+    drop the folded turns the next time they load the summary. On failure the
+    turns stay pending and are retried after the next question.
+
+    Args:
+        session_id (str): The session to update.
+    """
+    if session_id in _folding:
+        return
+    _folding.add(session_id)
+    try:
+        session = SESSION_STORE.load(session_id)
+        summary = SESSION_STORE.load_summary(session_id)
+        turns = [turn for turn in session.get("pending_turns", []) if turn["n"] > summary["folded"]]
+        if not turns:
+            return
+
+        prompt = build_chat_summary_prompt(summary["text"], turns, SUMMARY_MAX_TOKENS, ANSWER_MAX_TOKENS)
+        result = await call_gemma_async(prompt)
+        text = (result.get("summary") or result.get("output")) if isinstance(result, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            logger.warning("Chat summary update failed for session %s: %s", session_id[:8], result)
+            return
+
+        SESSION_STORE.save_summary(session_id, {"text": text.strip(), "folded": turns[-1]["n"]})
+        logger.info("Folded %d chat turns into summary (~%d tokens) for session %s",
+                    len(turns), estimate_tokens(text), session_id[:8])
+    finally:
+        _folding.discard(session_id)
@@ -0,0 +1,360 @@
+"""
+Latency and upstream metrics: Prometheus histograms/counters and Server-Timing.
+
+Spans are recorded per request in a context variable set by
+`ServerTimingMiddleware`, so code anywhere below an endpoint (pipeline stages,
+upstream clients, caches) can time itself without the request being passed
+around. Each span is observed in a histogram for `/metrics` and listed in the
+response's `Server-Timing` header.
+
+Metrics are kept in process; with several uvicorn workers each worker exposes
+its own values, as usual for Prometheus scraping.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+import httpx
+import yaml
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+METRICS_SETTINGS = config.get("METRICS", {})
+METRICS_ENABLED = METRICS_SETTINGS.get("enabled", True)
+SERVER_TIMING_ENABLED = METRICS_SETTINGS.get("server_timing", True)
+
+# Seconds; reaches 60 s because a slow itinerary can take 40 s end to end
+DEFAULT_BUCKETS = tuple(METRICS_SETTINGS.get("buckets") or (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60
+))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    A monotonically increasing value per label combination.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of observed values per label combination.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: [count per bucket (+Inf last)], sum
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _label_text(self.labels, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total[0]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list = []
+
+HTTP_SECONDS = Histogram(
+    "travel_http_request_duration_seconds", "Time to serve a backend request, by route.",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "travel_stage_duration_seconds", "Duration of a pipeline stage or span, by endpoint.",
+    ("endpoint", "stage"),
+)
+UPSTREAM_SECONDS = Histogram(
+    "travel_upstream_request_duration_seconds", "Upstream HTTP call duration, including reading the body.",
+    ("upstream",),
+)
+UPSTREAM_RESPONSES = Counter(
+    "travel_upstream_responses_total", "Upstream HTTP responses by status code (or exception name).",
+    ("upstream", "status"),
+)
+UPSTREAM_BYTES = Counter(
+    "travel_upstream_bytes_total", "Upstream HTTP payload bytes, sent and received.",
+    ("upstream", "direction"),
+)
+CACHE_LOOKUPS = Counter(
+    "travel_cache_lookups_total", "Response cache lookups by result (memory_hit, disk_hit, miss).",
+    ("cache", "result"),
+)
+OCR_ENGINE_RESULTS = Counter(
+    "travel_ocr_engine_results_total", "OCR engine runs by outcome (won, empty, discarded, cancelled).",
+    ("engine", "result"),
+)
+OCR_ENGINE_SECONDS = Histogram(
+    "travel_ocr_engine_duration_seconds", "OCR engine run time by outcome; cancelled hedge losers count until cancelled.",
+    ("engine", "result"),
+)
+OCR_CACHE_SAVED_CALLS = Counter(
+    "travel_ocr_cache_saved_calls_total", "OCR engine calls avoided by an OCR cache hit.",
+)
+OCR_CACHE_SAVED_BYTES = Counter(
+    "travel_ocr_cache_saved_bytes_total", "Image bytes not uploaded to an OCR engine thanks to the OCR cache.",
+)
+
+
+def render_metrics() -> str:
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class RequestTimings:
+    """
+    Spans recorded while serving one request, rendered as a Server-Timing header.
+    """
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.spans: dict[str, list[float]] = {}
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans.setdefault(name, []).append(seconds)
+
+    def header(self) -> str:
+        """
+        Formats the spans as `name;dur=<ms>`. Repeated spans (e.g. several searches
+        running side by side) report the longest call and the call count.
+        """
+        entries = []
+        for name, durations in self.spans.items():
+            entry = f"{name};dur={max(durations) * 1000:.1f}"
+            if len(durations) > 1:
+                entry += f';desc="{len(durations)} calls, {sum(durations) * 1000:.0f} ms total"'
+            entries.append(entry)
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_route_paths: dict = {}
+
+
+def route_label(scope: dict) -> str:
+    """
+    Returns the route template (e.g. "/itinerary/{itinerary_id}") of a request,
+    so per-ID paths do not create one metric series each.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if endpoint not in _route_paths:
+        app = scope.get("app")
+        _route_paths[endpoint] = next(
+            (r.path for r in getattr(app, "routes", ()) if getattr(r, "endpoint", None) is endpoint), "unmatched"
+        )
+    return _route_paths[endpoint]
+
+
+def record_span(name: str, seconds: float) -> None:
+    """
+    Records a finished span: observed in the stage histogram and added to the
+    current request's Server-Timing entries (if any).
+    """
+    if not METRICS_ENABLED:
+        return
+    timings = _request_timings.get()
+    STAGE_SECONDS.observe(seconds, endpoint=timings.route if timings else "none", stage=name)
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Times the enclosed block as a span named `name` (see `record_span`).
+
+    Example:
+        with span("prompt"):
+            prompt = build_user_query_prompt(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def _record_upstream(upstream: str, status: str, seconds: float, sent: int, received: int) -> None:
+    UPSTREAM_SECONDS.observe(seconds, upstream=upstream)
+    UPSTREAM_RESPONSES.inc(upstream=upstream, status=status)
+    UPSTREAM_BYTES.inc(sent, upstream=upstream, direction="sent")
+    UPSTREAM_BYTES.inc(received, upstream=upstream, direction="received")
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(f"{upstream}-http", seconds)
+
+
+class _Measured:
+    def __init__(self, upstream: str, status: int, started: float, sent: int):
+        self.upstream, self.status, self.started, self.sent = upstream, str(status), started, sent
+        self.received = 0
+        self._done = False
+
+    def finish(self) -> None:
+        if not self._done:
+            self._done = True
+            _record_upstream(self.upstream, self.status, time.perf_counter() - self.started, self.sent, self.received)
+
+
+class _AsyncMeasuredStream(httpx.AsyncByteStream):
+    def __init__(self, inner, measured: _Measured):
+        self.inner, self.measured = inner, measured
+
+    async def __aiter__(self):
+        async for data in self.inner:
+            self.measured.received += len(data)
+            yield data
+
+    async def aclose(self) -> None:
+        self.measured.finish()
+        await self.inner.aclose()
+
+
+def _request_size(request: httpx.Request) -> int:
+    length = request.headers.get("content-length")
+    return int(length) if length and length.isdigit() else 0
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Measures every upstream call: duration until the body is closed, status, and payload sizes.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, upstream: str):
+        self.inner, self.upstream = inner, upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except Exception as e:
+            _record_upstream(self.upstream, type(e).__name__, time.perf_counter() - started, _request_size(request), 0)
+            raise
+        measured = _Measured(self.upstream, response.status_code, started, _request_size(request))
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_AsyncMeasuredStream(response.stream, measured), extensions=response.extensions)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects the spans of each HTTP request, adds them as a
+    `Server-Timing` header and observes the request duration per route. The
+    duration ends with the last body chunk, so background tasks (e.g. the chat
+    memory update after `/ask`) are not counted.
+
+    Streaming responses send their headers before the stream runs, so their
+    header only lists what finished before the first byte; their spans still
+    reach `/metrics`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings(scope)
+        token = _request_timings.set(timings)
+        status = {"code": 500, "observed": False}
+
+        def observe():
+            if not status["observed"]:
+                status["observed"] = True
+                HTTP_SECONDS.observe(time.perf_counter() - timings.started,
+                                     method=scope["method"], route=timings.route, status=status["code"])
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.header().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+            # Stop the clock at the last body chunk, before background tasks run
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            observe()
+            _request_timings.reset(token)
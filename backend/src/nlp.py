@@ -1,14 +1,25 @@
-from src.gemma import call_gemma
+from src.gemma import call_gemma_async
 from config.prompts import format_travel_prompt
 from src.cities import correct_city_name_dynamic
+from src.airports import enrich_with_airports
+from src.ticket_parser import parse_ticket_text, FAST_PATH_ENABLED, FAST_PATH_MIN_CONFIDENCE
+from src.logger import get_logger
 
-def extract_location_info(text: str) -> dict:
+# Initialize logger
+logger = get_logger(__name__)
+
+
+async def extract_location_info(text: str) -> dict:
     """
     Extracts structured travel information (e.g., origin, destination, flight number)
     from unstructured OCR text using an LLM. Also corrects detected city names.
 
-    The function sends the cleaned OCR text to Gemma via a formatted prompt,
-    then post-processes the results using a city name corrector.
+    A deterministic rule-based parser runs first; if it is confident enough
+    (`TICKET_PARSER.min_confidence`), its result is returned directly and the
+    LLM round trip is skipped. Otherwise the cleaned OCR text is sent to Gemma
+    via a formatted prompt, then post-processed using a city name corrector.
+    Airport codes are checked against the offline airport index to fill in or
+    validate the destination/origin cities and the airport name.
 
     Args:
         text (str): Raw OCR-extracted text from a travel document (e.g., boarding pass).
@@ -17,13 +28,22 @@ def extract_location_info(text: str) -> dict:
         dict: A dictionary containing extracted travel fields. Example keys may include:
               'origin', 'destination', 'flight_number', etc. City names are auto-corrected.
     """
+    if FAST_PATH_ENABLED:
+        parsed = parse_ticket_text(text)
+        if parsed["confidence"] >= FAST_PATH_MIN_CONFIDENCE:
+            logger.info("Ticket parsed by fast path (confidence %.2f); skipping LLM extraction", parsed["confidence"])
+            return parsed
+        logger.info("Fast-path confidence %.2f below threshold; using LLM extraction", parsed["confidence"])
+
     prompt = format_travel_prompt(text)
-    result = call_gemma(prompt)
+    # Same ticket text, same fields: safe to serve from the Gemma cache
+    result = await call_gemma_async(prompt, use_cache=True)
 
     if isinstance(result, dict):
         if "origin" in result and isinstance(result["origin"], str):
             result["origin"] = correct_city_name_dynamic(result["origin"])
         if "destination" in result and isinstance(result["destination"], str):
             result["destination"] = correct_city_name_dynamic(result["destination"])
+        enrich_with_airports(result)
 
-    return result
\ No newline at end of file
+    return result
@@ -1,5 +1,11 @@
+import io
 import os
 import re
+import time
+import shutil
+import asyncio
+import hashlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import yaml
 import httpx
 import unicodedata
@@ -7,6 +13,9 @@ from fastapi import UploadFile
 from typing import Optional
 from dotenv import load_dotenv
 from src.logger import get_logger
+from src.clients import get_client
+from src.cache import MemoryCache, SQLiteCache, TieredCache
+from src.metrics import OCR_CACHE_SAVED_BYTES, OCR_CACHE_SAVED_CALLS, OCR_ENGINE_RESULTS, OCR_ENGINE_SECONDS, span
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -22,6 +31,35 @@ OCR_SPACE_API_URL = config["OCR_SPACE_API_URL"]
 AZURE_CV_ENDPOINT = config["AZURE_CV_ENDPOINT"]
 AZURE_CV_API_KEY = os.getenv("AZURE_CV_API_KEY")
 
+# OCR result cache, keyed by the SHA-256 of the image bytes
+CACHE_SETTINGS = config.get("OCR_CACHE", {})
+OCR_CACHE_TTL = CACHE_SETTINGS.get("ttl_seconds", 2592000)
+OCR_CACHE = None
+if CACHE_SETTINGS.get("enabled", False):
+    OCR_CACHE = TieredCache(
+        "ocr",
+        MemoryCache(CACHE_SETTINGS.get("memory_max_entries", 128)),
+        SQLiteCache(
+            os.path.join(config.get("CACHE_DIR", "cache"), "ocr.sqlite3"),
+            max_entries=CACHE_SETTINGS.get("disk_max_entries", 2000)
+        ) if CACHE_SETTINGS.get("persistent", True) else None
+    )
+
+# Engine selection; hedging starts the secondary engine if the primary is slow or returns nothing
+OCR_SETTINGS = config.get("OCR", {})
+OCR_PRIMARY_ENGINE = OCR_SETTINGS.get("primary", "ocr_space")
+OCR_SECONDARY_ENGINE = OCR_SETTINGS.get("secondary", "azure")
+OCR_HEDGE_ENABLED = OCR_SETTINGS.get("hedge", False)
+OCR_HEDGE_DELAY = OCR_SETTINGS.get("hedge_delay_seconds", 2.5)
+
+# Local (offline) Tesseract engine
+LOCAL_OCR_SETTINGS = OCR_SETTINGS.get("local", {})
+LOCAL_OCR_EXECUTOR = LOCAL_OCR_SETTINGS.get("executor", "thread")
+LOCAL_OCR_WORKERS = LOCAL_OCR_SETTINGS.get("workers", 2)
+LOCAL_OCR_LANGUAGE = LOCAL_OCR_SETTINGS.get("language", "eng")
+LOCAL_OCR_CONFIG = LOCAL_OCR_SETTINGS.get("tesseract_config", "--oem 1 --psm 6")
+_local_executor: Optional[Executor] = None
+
 
 def clean_azure_ocr(text: str) -> str:
     """
@@ -41,24 +79,23 @@ def clean_azure_ocr(text: str) -> str:
     return text.strip()
 
 
-async def extract_via_ocr_space(file: UploadFile) -> Optional[str]:
+async def extract_via_ocr_space(image_data: bytes, filename: str = "ticket.jpg") -> Optional[str]:
     """
     Extracts text from an image using the OCR.Space API.
 
     Args:
-        file (UploadFile): The uploaded image file.
+        image_data (bytes): The raw image bytes.
+        filename (str, optional): File name sent along with the upload.
 
     Returns:
         Optional[str]: The extracted text, or None if extraction fails.
     """
     try:
-        image_data = await file.read()
-        files = {"file": (file.filename, image_data, "image/jpeg")}
+        files = {"file": (filename, image_data, "image/jpeg")}
         data = {"language": "eng", "isOverlayRequired": False, "OCREngine": 2}
         headers = {"apikey": OCR_SPACE_API_KEY}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(OCR_SPACE_API_URL, data=data, files=files, headers=headers)
+        response = await get_client("ocr_space").post(OCR_SPACE_API_URL, data=data, files=files, headers=headers)
         response.raise_for_status()
 
         result = response.json()
@@ -73,12 +110,13 @@ async def extract_via_ocr_space(file: UploadFile) -> Optional[str]:
         return None
 
 
-async def extract_via_azure_ocr(file: UploadFile) -> Optional[str]:
+async def extract_via_azure_ocr(image_data: bytes, filename: str = "ticket.jpg") -> Optional[str]:
     """
     Extracts text from an image using the Azure Computer Vision OCR API.
 
     Args:
-        file (UploadFile): The uploaded image file.
+        image_data (bytes): The raw image bytes.
+        filename (str, optional): Unused; accepted for a uniform engine signature.
 
     Returns:
         Optional[str]: The cleaned extracted text, or None if extraction fails.
@@ -88,15 +126,13 @@ async def extract_via_azure_ocr(file: UploadFile) -> Optional[str]:
         return None
 
     try:
-        image_data = await file.read()
         ocr_url = AZURE_CV_ENDPOINT.rstrip("/") + "/vision/v3.2/ocr?language=unk&detectOrientation=true"
         headers = {
             "Ocp-Apim-Subscription-Key": AZURE_CV_API_KEY,
             "Content-Type": "application/octet-stream"
         }
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
-            response = await client.post(ocr_url, headers=headers, content=image_data)
+        response = await get_client("azure_ocr").post(ocr_url, headers=headers, content=image_data)
 
         response.raise_for_status()
         result = response.json()
@@ -120,20 +156,252 @@ async def extract_via_azure_ocr(file: UploadFile) -> Optional[str]:
     return None
 
 
+def _tesseract_image_to_text(image_data: bytes, language: str, tesseract_config: str) -> str:
+    """
+    Runs Tesseract on raw image bytes. Executed in a worker thread or process.
+
+    Args:
+        image_data (bytes): The raw image bytes.
+        language (str): Tesseract language code(s), e.g. "eng".
+        tesseract_config (str): Extra Tesseract CLI flags.
+
+    Returns:
+        str: The raw recognized text.
+    """
+    from PIL import Image, ImageOps
+    import pytesseract
+
+    image = Image.open(io.BytesIO(image_data))
+    image = ImageOps.exif_transpose(image).convert("L")
+    return pytesseract.image_to_string(image, lang=language, config=tesseract_config)
+
+
+def _get_local_executor() -> Executor:
+    global _local_executor
+    if _local_executor is None:
+        if LOCAL_OCR_EXECUTOR == "process":
+            _local_executor = ProcessPoolExecutor(max_workers=LOCAL_OCR_WORKERS)
+        else:
+            _local_executor = ThreadPoolExecutor(max_workers=LOCAL_OCR_WORKERS, thread_name_prefix="local-ocr")
+    return _local_executor
+
+
+def shutdown_local_ocr() -> None:
+    """
+    Shuts down the local OCR worker pool, if it was started.
+    """
+    global _local_executor
+    if _local_executor is not None:
+        _local_executor.shutdown(wait=False, cancel_futures=True)
+        _local_executor = None
+
+
+async def extract_via_tesseract(image_data: bytes, filename: str = "ticket.jpg") -> Optional[str]:
+    """
+    Extracts text from an image locally with Tesseract, without any network call.
+
+    Recognition runs in a worker pool (`OCR.local.executor`: thread or process)
+    so the event loop is never blocked. The output goes through the same
+    `clean_azure_ocr` normalization as the Azure engine.
+
+    Args:
+        image_data (bytes): The raw image bytes.
+        filename (str, optional): Unused; accepted for a uniform engine signature.
+
+    Returns:
+        Optional[str]: The cleaned extracted text, or None if extraction fails.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        raw_text = await loop.run_in_executor(
+            _get_local_executor(), _tesseract_image_to_text,
+            image_data, LOCAL_OCR_LANGUAGE, LOCAL_OCR_CONFIG
+        )
+        cleaned = clean_azure_ocr(raw_text)
+        logger.info("Tesseract OCR Output:\n%s", cleaned)
+        return cleaned if cleaned else None
+
+    except Exception as e:
+        logger.error("Local Tesseract OCR error: %s", repr(e))
+        return None
+
+
+def _tesseract_available() -> bool:
+    try:
+        import pytesseract  # noqa: F401
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return shutil.which("tesseract") is not None
+
+
+# OCR engine interface: an async callable taking (image_data: bytes, filename: str)
+# and returning the extracted text, or None on failure.
+OCR_ENGINES = {
+    "ocr_space": extract_via_ocr_space,
+    "azure": extract_via_azure_ocr,
+    "tesseract": extract_via_tesseract,
+}
+
+# Optional per-engine availability checks (missing keys, binaries, packages)
+OCR_ENGINE_CHECKS = {
+    "ocr_space": lambda: OCR_SPACE_API_KEY not in [None, "", "null", "None"],
+    "azure": lambda: bool(AZURE_CV_API_KEY and AZURE_CV_ENDPOINT),
+    "tesseract": _tesseract_available,
+}
+
+
+def register_ocr_engine(name: str, engine, is_available=None) -> None:
+    """
+    Registers an additional OCR engine so it can be selected in `config/settings.yaml`.
+
+    Args:
+        name (str): Engine name used in `OCR.primary` / `OCR.secondary`.
+        engine (callable): Async callable `(image_data: bytes, filename: str) -> Optional[str]`.
+        is_available (callable, optional): Zero-argument check run before the engine is used.
+    """
+    OCR_ENGINES[name] = engine
+    if is_available is not None:
+        OCR_ENGINE_CHECKS[name] = is_available
+
+
+def _engine_available(name: str) -> bool:
+    """
+    Checks whether an OCR engine is registered and has what it needs to run.
+
+    Args:
+        name (str): Engine name (a key of `OCR_ENGINES`).
+
+    Returns:
+        bool: True if the engine can be called.
+    """
+    if name not in OCR_ENGINES:
+        return False
+    check = OCR_ENGINE_CHECKS.get(name)
+    return check() if check else True
+
+
+def _record_engine_result(name: str, latency: float, result: str) -> None:
+    OCR_ENGINE_RESULTS.inc(engine=name, result=result)
+    OCR_ENGINE_SECONDS.observe(latency, engine=name, result=result)
+    logger.info("OCR engine %s %s after %.0f ms", name, result, latency * 1000)
+
+
+async def _timed_engine(name: str, image_data: bytes, filename: str) -> tuple[str, float, Optional[str]]:
+    start = time.perf_counter()
+    try:
+        with span(f"engine-{name}"):
+            text = await OCR_ENGINES[name](image_data, filename)
+    except asyncio.CancelledError:
+        # Hedge loser (or the request went away)
+        _record_engine_result(name, time.perf_counter() - start, "cancelled")
+        raise
+    return name, time.perf_counter() - start, text
+
+
+async def _extract_hedged(image_data: bytes, filename: str, engines: list[str], delay: float) -> Optional[str]:
+    """
+    Runs OCR engines as a hedged request: the first non-empty result wins.
+
+    The first engine starts immediately. Each following engine starts once the
+    previous ones have been running for `delay` seconds, or as soon as all
+    running engines have finished empty-handed. The losers are cancelled.
+
+    Args:
+        image_data (bytes): The raw image bytes, shared by every engine.
+        filename (str): File name sent along with the upload.
+        engines (list[str]): Engine names in priority order.
+        delay (float): Seconds to wait before starting the next engine.
+
+    Returns:
+        Optional[str]: The winning text, or None if every engine failed.
+    """
+    waiting = list(engines)
+    running: set[asyncio.Task] = set()
+
+    try:
+        while waiting or running:
+            if waiting and not running:
+                running.add(asyncio.create_task(_timed_engine(waiting.pop(0), image_data, filename)))
+
+            done, running = await asyncio.wait(
+                running,
+                timeout=delay if waiting else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                logger.info("OCR hedge: no result after %.1fs, starting %s", delay, waiting[0])
+                running.add(asyncio.create_task(_timed_engine(waiting.pop(0), image_data, filename)))
+                continue
+
+            winner = None
+            for task in done:
+                name, latency, text = task.result()
+                won = bool(text) and winner is None
+                _record_engine_result(name, latency, "won" if won else ("discarded" if text else "empty"))
+                if won:
+                    winner = text
+            if winner:
+                return winner
+        return None
+
+    finally:
+        for task in running:
+            task.cancel()
+
+
 async def extract_text_via_ocr(file: UploadFile) -> Optional[str]:
     """
-    Dynamically selects the OCR engine based on availability of the OCR.Space API key.
-    Uses OCR.Space if key is provided, otherwise falls back to Azure OCR.
+    Extracts text from an uploaded image with the configured OCR engines.
+
+    The upload is read once and hashed. If the same image was processed before,
+    the cached text is returned without calling any engine.
+
+    Otherwise `OCR.primary` and `OCR.secondary` are looked up in the engine
+    registry (`OCR_ENGINES`: OCR.Space, Azure, local Tesseract, or any engine
+    added with `register_ocr_engine`), skipping engines that are unknown or not
+    available. Without hedging, only the first remaining engine runs. With
+    `OCR.hedge`, the next engine also starts if the previous one has not
+    answered within `OCR.hedge_delay_seconds` (or answered empty); the first
+    non-empty result wins and the others are cancelled. Non-empty results are
+    cached.
 
     Args:
         file (UploadFile): The uploaded image file.
 
     Returns:
-        Optional[str]: The final extracted and cleaned text, or None if both methods fail.
+        Optional[str]: The extracted and cleaned text, or None if no engine is
+                       available or every engine failed or returned nothing.
     """
-    if OCR_SPACE_API_KEY not in [None, "", "null", "None"]:
-        logger.info("Using OCR.Space")
-        return await extract_via_ocr_space(file)
+    image_data = await file.read()
+    image_hash = hashlib.sha256(image_data).hexdigest()
+
+    if OCR_CACHE is not None:
+        cached = OCR_CACHE.get(image_hash)
+        if cached is not None:
+            OCR_CACHE_SAVED_CALLS.inc()
+            OCR_CACHE_SAVED_BYTES.inc(len(image_data))
+            logger.info("OCR cache hit for %s (%d bytes not uploaded)", image_hash[:12], len(image_data))
+            return cached
+
+    engines = [
+        name for name in dict.fromkeys([OCR_PRIMARY_ENGINE, OCR_SECONDARY_ENGINE])
+        if _engine_available(name)
+    ]
+    if not engines:
+        logger.warning("No OCR engine is configured")
+        return None
+
+    if OCR_HEDGE_ENABLED:
+        logger.info("Using hedged OCR: %s", " -> ".join(engines))
+        text = await _extract_hedged(image_data, file.filename, engines, OCR_HEDGE_DELAY)
     else:
-        logger.info("Falling back to Azure OCR")
-        return await extract_via_azure_ocr(file)
+        logger.info("Using %s OCR", engines[0])
+        _, latency, text = await _timed_engine(engines[0], image_data, file.filename)
+        _record_engine_result(engines[0], latency, "won" if text else "empty")
+
+    if OCR_CACHE is not None and text:
+        OCR_CACHE.set(image_hash, text, OCR_CACHE_TTL)
+    return text
+
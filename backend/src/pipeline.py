@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+from src.logger import get_logger
+from src.metrics import record_span
+
+# Initialize logger
+logger = get_logger(__name__)
+
+
+class StageGraph:
+    """
+    A small dependency graph of async pipeline stages.
+
+    Each stage is an async function whose keyword arguments are the results of
+    the stages it depends on. Every stage starts as soon as all of its inputs
+    are ready, so independent work (e.g. OCR and keyword extraction) overlaps.
+
+    Example:
+        graph = StageGraph()
+        graph.add("text", read_text)
+        graph.add("keywords", extract_keywords)
+        graph.add("search", search, deps=("text", "keywords"))
+        results, timings = await graph.run()
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: dict[str, tuple[Callable[..., Awaitable[Any]], tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], deps: tuple[str, ...] = ()) -> None:
+        """
+        Registers a stage. Dependencies must already be registered and names must be
+        unique, which also rules out cycles.
+
+        Args:
+            name (str): Stage name; also the keyword under which dependents receive its result.
+            func (callable): Async function called with one keyword argument per dependency.
+            deps (tuple[str, ...], optional): Names of the stages whose results it needs.
+        """
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' is already registered")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self._stages[name] = (func, tuple(deps))
+
+    async def run(self, on_start: Optional[Callable[[str], None]] = None) -> tuple[dict, dict]:
+        """
+        Runs every stage, each one as soon as its dependencies have finished.
+
+        If a stage raises, the remaining stages are cancelled and the exception
+        propagates to the caller.
+
+        Args:
+            on_start (callable, optional): Called with the stage name when a stage starts.
+
+        Returns:
+            tuple[dict, dict]: Stage results by name, and timings by name
+                               (`start_ms` since the run began and `duration_ms`).
+        """
+        started = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
+        timings: dict[str, dict] = {}
+
+        async def run_stage(name: str):
+            func, deps = self._stages[name]
+            inputs = {dep: await tasks[dep] for dep in deps}
+            if on_start:
+                on_start(name)
+            stage_start = time.perf_counter()
+            try:
+                return await func(**inputs)
+            finally:
+                duration = time.perf_counter() - stage_start
+                timings[name] = {
+                    "start_ms": round((stage_start - started) * 1000, 1),
+                    "duration_ms": round(duration * 1000, 1),
+                }
+                record_span(name, duration)
+
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(run_stage(name), name=f"{self.name}:{name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            # Let cancelled stages unwind before re-raising
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        logger.info(
+            "%s finished in %.1f ms (%s)", self.name, (time.perf_counter() - started) * 1000,
+            ", ".join(f"{name}={t['duration_ms']}ms@{t['start_ms']}" for name, t in timings.items())
+        )
+        return {name: task.result() for name, task in tasks.items()}, timings
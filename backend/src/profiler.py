@@ -0,0 +1,303 @@
+"""
+Opt-in CPU profiler for the backend process.
+
+Two ways to start a profile, both off unless `PROFILER.enabled` is set:
+
+- per request: send `X-Profile: sample` (or `cprofile`) with any request; the
+  response carries `X-Profile-ID`
+- globally: `POST /debug/profile?seconds=30` samples the whole process for a
+  window, e.g. while a load test runs
+
+Sampling profiles are taken by a background thread that reads every thread's
+stack from `sys._current_frames()` at a fixed interval, and are stored as
+collapsed stacks ("frame;frame;frame count" per line), the input format of
+flamegraph.pl, speedscope and inferno. `cprofile` runs the deterministic
+profiler on the event-loop thread and stores a pstats file (snakeviz,
+flameprof). Profiles are written under `CACHE_DIR/profiles`, so any worker can
+serve them from `GET /debug/profiles/{id}`.
+
+All requests share the event loop, so a per-request profile also contains
+whatever other requests did at the same time; profile on a quiet instance or
+use a window during a controlled load test.
+
+When the profiler is disabled no middleware is installed and nothing runs.
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+import yaml
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+PROFILER_SETTINGS = config.get("PROFILER", {})
+PROFILER_ENABLED = str(os.getenv("PROFILER_ENABLED", PROFILER_SETTINGS.get("enabled", False))).lower() in ("1", "true", "yes")
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN") or PROFILER_SETTINGS.get("token")
+PROFILE_HEADER = PROFILER_SETTINGS.get("header", "X-Profile")
+TOKEN_HEADER = "X-Profile-Token"
+SAMPLE_INTERVAL = PROFILER_SETTINGS.get("interval_ms", 5) / 1000
+MAX_WINDOW_SECONDS = PROFILER_SETTINGS.get("max_window_seconds", 300)
+MAX_CONCURRENT = PROFILER_SETTINGS.get("max_concurrent", 2)
+MAX_PROFILES = PROFILER_SETTINGS.get("max_profiles", 50)
+PROFILE_DIR = os.path.join(config.get("CACHE_DIR", "cache"), PROFILER_SETTINGS.get("directory", "profiles"))
+
+MODES = ("sample", "cprofile")
+MAX_STACK_DEPTH = 128
+
+# Innermost frames of a thread that is waiting rather than running
+IDLE_FRAMES = {
+    ("selectors.py", "select"), ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("socketserver.py", "serve_forever"), ("thread.py", "_worker"),
+    ("socket.py", "readinto"), ("socket.py", "accept"),
+}
+
+_active = 0
+# cProfile hooks the interpreter's single profiling slot: one session at a time
+_cprofile_active = False
+_active_lock = threading.Lock()
+
+
+def authorized(token: Optional[str]) -> bool:
+    """
+    Returns True if profiling is enabled and the request carries the configured token (if any).
+    """
+    return PROFILER_ENABLED and (not PROFILER_TOKEN or token == PROFILER_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class Profile:
+    """
+    One profile in progress: a sampling thread or a cProfile session.
+
+    Args:
+        kind (str): "request" or "window".
+        mode (str): "sample" or "cprofile".
+        label (str): What was profiled (route or window length), stored in the metadata.
+    """
+
+    def __init__(self, kind: str, mode: str = "sample", label: str = "", interval: float = SAMPLE_INTERVAL):
+        self.id = uuid.uuid4().hex
+        self.kind, self.mode, self.label, self.interval = kind, mode, label, interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.started = time.time()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def start(self) -> "Profile":
+        if self.mode == "cprofile":
+            # Profiles the calling thread, i.e. the event loop
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._thread = threading.Thread(target=self._sample, name=f"profiler-{self.id[:8]}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if _is_idle(frame):
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self) -> str:
+        """
+        Stops profiling, writes the profile and its metadata, and returns the profile ID.
+        """
+        duration = time.time() - self.started
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(profile_path(self.id, self.mode))
+        else:
+            self._stop.set()
+            self._thread.join()
+            tmp_path = profile_path(self.id, self.mode) + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+            os.replace(tmp_path, profile_path(self.id, self.mode))
+
+        meta = {
+            "id": self.id, "kind": self.kind, "mode": self.mode, "label": self.label,
+            "started": round(self.started, 3), "duration_s": round(duration, 3),
+            "interval_ms": round(self.interval * 1000, 2), "samples": self.samples, "idle_samples": self.idle_samples,
+        }
+        with open(os.path.join(PROFILE_DIR, f"{self.id}.json"), "w") as f:
+            json.dump(meta, f)
+        _prune()
+        logger.info("Profile %s (%s, %s) saved: %.2f s, %d samples", self.id, self.kind, self.label, duration, self.samples)
+        return self.id
+
+
+def _claim(mode: str = "sample") -> bool:
+    global _active, _cprofile_active
+    with _active_lock:
+        if _active >= MAX_CONCURRENT or (mode == "cprofile" and _cprofile_active):
+            return False
+        _active += 1
+        if mode == "cprofile":
+            _cprofile_active = True
+        return True
+
+
+def _release(mode: str = "sample") -> None:
+    global _active, _cprofile_active
+    with _active_lock:
+        _active -= 1
+        if mode == "cprofile":
+            _cprofile_active = False
+
+
+def profile_path(profile_id: str, mode: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{'prof' if mode == 'cprofile' else 'folded'}")
+
+
+def _prune() -> None:
+    metas = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in metas[:max(0, len(metas) - MAX_PROFILES)]:
+        profile_id = entry.name[:-5]
+        for suffix in (".json", ".folded", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def start_window(seconds: float, interval: float = SAMPLE_INTERVAL) -> Optional[tuple[str, float]]:
+    """
+    Samples the whole process for `seconds` (at most MAX_WINDOW_SECONDS) in the background.
+
+    Returns:
+        Optional[tuple[str, float]]: The profile ID and the window actually sampled in seconds,
+                                     or None if too many profiles are already running.
+    """
+    if not _claim():
+        return None
+    seconds = min(max(seconds, 0.1), MAX_WINDOW_SECONDS)
+    profile = Profile("window", "sample", f"{seconds:g}s", interval)
+    try:
+        profile.start()
+    except BaseException:
+        _release()
+        raise
+
+    def finish():
+        try:
+            profile.stop()
+        finally:
+            _release()
+
+    threading.Timer(seconds, finish).start()
+    return profile.id, seconds
+
+
+def list_profiles() -> list[dict]:
+    """
+    Returns the metadata of the stored profiles, newest first.
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    metas = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(".json"):
+            with open(entry.path) as f:
+                metas.append(json.load(f))
+    return sorted(metas, key=lambda meta: meta["started"], reverse=True)
+
+
+def get_profile(profile_id: str) -> Optional[tuple[str, dict]]:
+    """
+    Returns `(path, metadata)` of a finished profile, or None if it is unknown or still running.
+    """
+    if not profile_id.isalnum():
+        return None
+    meta_path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return profile_path(profile_id, meta["mode"]), meta
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware that profiles requests sent with the `X-Profile` header.
+
+    The profile covers the whole response, including streamed bodies, and its ID
+    is returned in the `X-Profile-ID` header (omitted if the concurrency limit
+    was reached). Only one `cprofile` request runs at a time, since cProfile
+    sessions on the event-loop thread would replace or reject each other.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = PROFILE_HEADER.lower().encode("latin-1")
+        self.token_header = TOKEN_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        mode = headers.get(self.header, b"").decode("latin-1").strip().lower()
+        if not mode:
+            return await self.app(scope, receive, send)
+        token = headers.get(self.token_header, b"").decode("latin-1") or None
+        if mode in ("1", "true"):
+            mode = "sample"
+        if mode not in MODES or not authorized(token) or not _claim(mode):
+            return await self.app(scope, receive, send)
+
+        profile = Profile("request", mode, f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        try:
+            profile.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profile.stop()
+        finally:
+            _release(mode)
@@ -0,0 +1,431 @@
+"""
+Record-and-replay of upstream HTTP traffic (Gemma, SearxNG, OCR).
+
+In `record` mode every upstream response is captured, together with its
+time to first byte and the arrival time of each body chunk, into a compact
+gzip JSON-lines archive. In `replay` mode the same archive is served back
+without touching the network, at the recorded latencies scaled by
+`latency_scale`, so a new build can be run against yesterday's traffic and
+only the backend's own overhead differs.
+
+Secrets never reach the archive: request headers are not stored, API-key
+query parameters are dropped from URLs, and request bodies are kept only as
+a digest used to match requests on replay.
+
+Usage (from backend/):
+    HTTP_REPLAY_MODE=record uvicorn app:app        # capture
+    HTTP_REPLAY_MODE=replay HTTP_REPLAY_LATENCY_SCALE=1 uvicorn app:app
+    python -m src.replay summary cache/upstream-replay.jsonl.gz
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+import httpx
+import yaml
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+REPLAY_SETTINGS = config.get("HTTP_REPLAY", {})
+REPLAY_MODE = (os.getenv("HTTP_REPLAY_MODE") or REPLAY_SETTINGS.get("mode") or "off").lower()
+REPLAY_ARCHIVE = os.getenv("HTTP_REPLAY_ARCHIVE") or REPLAY_SETTINGS.get("archive", "cache/upstream-replay.jsonl.gz")
+REPLAY_LATENCY_SCALE = float(os.getenv("HTTP_REPLAY_LATENCY_SCALE") or REPLAY_SETTINGS.get("latency_scale", 1.0))
+REPLAY_UPSTREAMS = REPLAY_SETTINGS.get("upstreams") or ["gemma", "searx", "ocr_space", "azure_ocr"]
+REPLAY_FLUSH_EVERY = REPLAY_SETTINGS.get("flush_every", 50)
+
+ARCHIVE_FORMAT = "upstream-replay/1"
+
+# Query parameters that carry credentials and are never written to the archive
+SECRET_PARAMS = {"key", "apikey", "api_key", "access_token", "token", "subscription-key", "sig", "signature"}
+# Response headers worth keeping; everything else (cookies, tracing ids, ...) is dropped
+KEPT_HEADERS = ("content-type", "content-encoding")
+# Body chunks arriving closer together than this are merged into one
+CHUNK_MERGE_SECONDS = 0.005
+
+
+def replay_mode(name: str) -> str:
+    """
+    Returns "record", "replay" or "off" for an upstream.
+    """
+    if REPLAY_MODE in ("record", "replay") and name in REPLAY_UPSTREAMS:
+        return REPLAY_MODE
+    return "off"
+
+
+def _public_url(url: httpx.URL) -> str:
+    query = [(k, v) for k, v in parse_qsl(url.query.decode(), keep_blank_values=True) if k.lower() not in SECRET_PARAMS]
+    return str(url.copy_with(query=urlencode(query).encode() if query else None))
+
+
+def request_key(request: httpx.Request, body: bytes) -> str:
+    """
+    Returns the replay key of a request: method, URL without credentials, and a digest of the body.
+
+    Multipart boundaries are random per request, so they are blanked before hashing.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "boundary=" in content_type:
+        boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+        body = body.replace(boundary, b"BOUNDARY")
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return f"{request.method} {_public_url(request.url)} {digest}"
+
+
+def _route(request: httpx.Request) -> str:
+    return f"{request.method} {request.url.host}{request.url.path}"
+
+
+def _encode(data: bytes) -> list:
+    try:
+        return ["t", data.decode("utf-8")]
+    except UnicodeDecodeError:
+        return ["b", base64.b64encode(data).decode("ascii")]
+
+
+def _decode(chunk: list) -> bytes:
+    kind, data = chunk
+    return data.encode("utf-8") if kind == "t" else base64.b64decode(data)
+
+
+class Recorder:
+    """
+    Collects recorded exchanges and appends them to the archive in batches.
+
+    Each batch is written as its own gzip member, which `gzip.open` reads back as
+    one stream. Record with a single worker process: batches from several
+    processes would interleave but concurrent appends are not locked.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self._pending: list[dict] = []
+        self._lock = threading.Lock()
+        self.recorded = 0
+        if not os.path.exists(path):
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write(json.dumps({"format": ARCHIVE_FORMAT, "created": time.time()}) + "\n")
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            self._pending.append(record)
+            self.recorded += 1
+            if len(self._pending) >= self.flush_every:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, separators=(",", ":")) + "\n" for record in self._pending)
+        self._pending.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+
+class _Capture:
+    """
+    Accumulates a response body with per-chunk arrival offsets, then hands the exchange to the recorder.
+    """
+
+    def __init__(self, recorder: Recorder, upstream: str, request: httpx.Request, body: bytes):
+        # Taken before the request is sent: a redirect below rewrites the URL in place
+        self.recorder = recorder
+        self.record = {
+            "at": round(time.time(), 3),
+            "upstream": upstream,
+            "key": request_key(request, body),
+            "route": _route(request),
+            "url": _public_url(request.url),
+            "request_bytes": len(body),
+        }
+        self.started = time.perf_counter()
+        self._buffer = b""
+        self._buffer_at = None
+        self._done = False
+
+    def respond(self, response: httpx.Response) -> None:
+        self.record.update({
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "ttfb": round(time.perf_counter() - self.started, 4),
+            "chunks": [],
+        })
+
+    def chunk(self, data: bytes) -> None:
+        offset = time.perf_counter() - self.started
+        if self._buffer_at is not None and offset - self._buffer_at > CHUNK_MERGE_SECONDS:
+            self._emit()
+        if self._buffer_at is None:
+            self._buffer_at = offset
+        self._buffer += data
+
+    def _emit(self) -> None:
+        self.record["chunks"].append([round(self._buffer_at, 4), *_encode(self._buffer)])
+        self._buffer, self._buffer_at = b"", None
+
+    def finish(self, complete: bool) -> None:
+        if self._done:
+            return
+        self._done = True
+        if self._buffer_at is not None:
+            self._emit()
+        self.record["duration"] = round(time.perf_counter() - self.started, 4)
+        self.record["complete"] = complete
+        self.recorder.add(self.record)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, inner, capture: _Capture):
+        self.inner, self.capture = inner, capture
+
+    async def __aiter__(self):
+        async for data in self.inner:
+            self.capture.chunk(data)
+            yield data
+        self.capture.finish(complete=True)
+
+    async def aclose(self) -> None:
+        self.capture.finish(complete=False)
+        await self.inner.aclose()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Passes requests to `inner` and records each exchange as its body is read.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, upstream: str, recorder: Recorder):
+        self.inner, self.upstream, self.recorder = inner, upstream, recorder
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        capture = _Capture(self.recorder, self.upstream, request, await request.aread())
+        response = await self.inner.handle_async_request(request)
+        capture.respond(response)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_AsyncRecordingStream(response.stream, capture), extensions=response.extensions)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+        self.recorder.flush()
+
+
+def read_archive(path: str) -> list[dict]:
+    """
+    Reads every recorded exchange from an archive, in recording order.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != ARCHIVE_FORMAT:
+            raise ValueError(f"{path} is not an upstream replay archive")
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayArchive:
+    """
+    Serves recorded exchanges by request key.
+
+    Repeated identical requests get the recorded responses in order (cycling
+    when exhausted). A request that was never recorded, e.g. because a new build
+    changed a prompt, falls back to the responses recorded for the same
+    endpoint, so a replay run still has realistic payloads and timings.
+    """
+
+    def __init__(self, records: list[dict]):
+        self._by_key: dict[str, list[dict]] = defaultdict(list)
+        self._by_route: dict[str, list[dict]] = defaultdict(list)
+        for record in records:
+            if record.get("complete", True):
+                self._by_key[record["key"]].append(record)
+                self._by_route[record["route"]].append(record)
+        self._next: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.counters = {"exact": 0, "fallback": 0, "missing": 0}
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayArchive":
+        records = read_archive(path)
+        logger.info("Loaded %d recorded upstream exchanges from %s", len(records), path)
+        return cls(records)
+
+    def _take(self, table: dict, key: str) -> Optional[dict]:
+        candidates = table.get(key)
+        if not candidates:
+            return None
+        index = self._next[key]
+        self._next[key] = index + 1
+        return candidates[index % len(candidates)]
+
+    def match(self, request: httpx.Request, body: bytes) -> Optional[dict]:
+        with self._lock:
+            record = self._take(self._by_key, request_key(request, body))
+            if record is not None:
+                self.counters["exact"] += 1
+                return record
+            record = self._take(self._by_route, _route(request))
+            self.counters["fallback" if record else "missing"] += 1
+            return record
+
+
+def _replay_response(record: dict, stream) -> httpx.Response:
+    return httpx.Response(record["status"], headers=record["headers"], stream=stream)
+
+
+def _missing(request: httpx.Request) -> httpx.ConnectError:
+    return httpx.ConnectError(f"No recorded response for {request.method} {_public_url(request.url)}", request=request)
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, record: dict, scale: float):
+        self.record, self.scale = record, scale
+
+    async def __aiter__(self):
+        previous = self.record["ttfb"]
+        for offset, *chunk in self.record["chunks"]:
+            if self.scale > 0 and offset > previous:
+                await asyncio.sleep((offset - previous) * self.scale)
+            previous = offset
+            yield _decode(chunk)
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers requests from a `ReplayArchive` at the recorded latencies times `scale`.
+
+    At most `max_connections` replayed requests are in flight at once, like the
+    connection pool of the real transport, so queueing behaviour is preserved.
+    Streamed bodies are paced chunk by chunk.
+    """
+
+    def __init__(self, archive: ReplayArchive, scale: float = 1.0, max_connections: Optional[int] = None):
+        self.archive, self.scale = archive, scale
+        self.max_connections = max_connections
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        record = self.archive.match(request, await request.aread())
+        if record is None:
+            raise _missing(request)
+        if self.max_connections and self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        if self._slots:
+            await self._slots.acquire()
+        try:
+            await asyncio.sleep(record["ttfb"] * self.scale)
+        except BaseException:
+            if self._slots:
+                self._slots.release()
+            raise
+        return _replay_response(record, _SlotStream(_AsyncReplayStream(record, self.scale), self._slots))
+
+
+class _SlotStream(httpx.AsyncByteStream):
+    """
+    Holds a replay connection slot until the body has been read or closed.
+    """
+
+    def __init__(self, inner: httpx.AsyncByteStream, slots: Optional[asyncio.Semaphore]):
+        self.inner, self.slots = inner, slots
+
+    async def __aiter__(self):
+        async for data in self.inner:
+            yield data
+
+    async def aclose(self) -> None:
+        if self.slots:
+            self.slots.release()
+            self.slots = None
+
+
+_recorder: Optional[Recorder] = None
+_archive: Optional[ReplayArchive] = None
+_state_lock = threading.Lock()
+
+
+def get_recorder() -> Recorder:
+    """
+    Returns the process-wide recorder for `REPLAY_ARCHIVE`.
+    """
+    global _recorder
+    with _state_lock:
+        if _recorder is None:
+            _recorder = Recorder(REPLAY_ARCHIVE, REPLAY_FLUSH_EVERY)
+            logger.info("Recording upstream traffic to %s", REPLAY_ARCHIVE)
+        return _recorder
+
+
+def get_archive() -> ReplayArchive:
+    """
+    Returns the process-wide replay archive, loading `REPLAY_ARCHIVE` on first use.
+    """
+    global _archive
+    with _state_lock:
+        if _archive is None:
+            _archive = ReplayArchive.load(REPLAY_ARCHIVE)
+        return _archive
+
+
+def replay_stats() -> dict:
+    """
+    Returns the recorder / replay counters for this process (empty when replay is off).
+    """
+    stats = {"mode": REPLAY_MODE}
+    if _recorder is not None:
+        stats["recorded"] = _recorder.recorded
+    if _archive is not None:
+        stats.update(_archive.counters)
+    return stats
+
+
+def summarize(path: str) -> dict:
+    """
+    Summarizes an archive per upstream: exchanges, statuses, latency percentiles and payload size.
+    """
+    groups: dict[str, list[dict]] = defaultdict(list)
+    for record in read_archive(path):
+        groups[record["upstream"]].append(record)
+
+    def percentile(values: list[float], q: float) -> float:
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+    summary = {}
+    for upstream, records in sorted(groups.items()):
+        durations = [r["duration"] for r in records]
+        statuses: dict[str, int] = defaultdict(int)
+        for r in records:
+            statuses[str(r["status"])] += 1
+        summary[upstream] = {
+            "exchanges": len(records),
+            "statuses": dict(statuses),
+            "ttfb_p50_s": percentile([r["ttfb"] for r in records], 0.5),
+            "duration_p50_s": percentile(durations, 0.5),
+            "duration_p95_s": percentile(durations, 0.95),
+            "response_bytes": sum(len(_decode(chunk[1:])) for r in records for chunk in r["chunks"]),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect upstream replay archives.")
+    parser.add_argument("command", choices=["summary"])
+    parser.add_argument("archive", nargs="?", default=REPLAY_ARCHIVE)
+    args = parser.parse_args()
+    print(json.dumps(summarize(args.archive), indent=2))
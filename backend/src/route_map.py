@@ -0,0 +1,49 @@
+import folium
+from typing import Optional
+from src.cities import city_coordinates
+from src.airports import lookup_airport
+
+
+def _coordinates(city: Optional[str], airport_code: Optional[str] = None) -> Optional[list[float]]:
+    """
+    Resolves map coordinates from the city index, falling back to the airport.
+    """
+    coords = city_coordinates(city) if city else None
+    if coords is None and airport_code:
+        airport = lookup_airport(airport_code)
+        if airport and airport["lat"] is not None:
+            coords = (airport["lat"], airport["lng"])
+    return list(coords) if coords else None
+
+
+def render_route_map(origin: Optional[str], destination: Optional[str],
+                     origin_code: Optional[str] = None, airport_code: Optional[str] = None) -> str:
+    """
+    Renders a standalone Folium route map between two cities.
+
+    Coordinates come from the local city and airport indexes, so no geocoding
+    service is called.
+
+    Args:
+        origin (str): The departure city.
+        destination (str): The destination city.
+        origin_code (str, optional): Departure airport code, used if the city is unknown.
+        airport_code (str, optional): Destination airport code, used if the city is unknown.
+
+    Returns:
+        str: A self-contained HTML page with origin/destination markers and a route line.
+    """
+    origin_coords = _coordinates(origin, origin_code)
+    dest_coords = _coordinates(destination, airport_code)
+
+    if not origin_coords or not dest_coords:
+        # Show a blank map with a warning
+        m = folium.Map(location=[20, 0], zoom_start=2)
+        folium.Marker([20, 0], tooltip="No route available").add_to(m)
+        return m.get_root().render()
+
+    m = folium.Map(location=origin_coords, zoom_start=4)
+    folium.Marker(origin_coords, tooltip="Origin", icon=folium.Icon(color='green')).add_to(m)
+    folium.Marker(dest_coords, tooltip="Destination", icon=folium.Icon(color='red')).add_to(m)
+    folium.PolyLine([origin_coords, dest_coords], color="blue", weight=3).add_to(m)
+    return m.get_root().render()
@@ -1,14 +1,70 @@
-import httpx
+import asyncio
+import os
 import yaml
+from src.clients import get_client
+from src.cache import MemoryCache, SQLiteCache, TieredCache
 
 # Load YAML config
 with open("config/settings.yaml", "r") as f:
     config = yaml.safe_load(f)
 
 SEARX_URL = config["SEARX_API_URL"]
+SEARX_MAX_CONCURRENCY = config.get("SEARX_MAX_CONCURRENCY", 8)
+SEARX_QUERY_TIMEOUT = config.get("SEARX_QUERY_TIMEOUT", 12)
 LISTICLE_KEYWORDS = ["top", "best"]
 
-def search_searx(query: str, categories="general", language="en", max_results=6, tag=None):
+CACHE_SETTINGS = config.get("SEARX_CACHE", {})
+CACHE_TTLS = CACHE_SETTINGS.get("ttl_seconds", {})
+SEARX_CACHE = None
+if CACHE_SETTINGS.get("enabled", False):
+    SEARX_CACHE = TieredCache(
+        "searx",
+        MemoryCache(CACHE_SETTINGS.get("memory_max_entries", 512)),
+        SQLiteCache(
+            os.path.join(config.get("CACHE_DIR", "cache"), "searx.sqlite3"),
+            max_entries=CACHE_SETTINGS.get("disk_max_entries", 20000)
+        ) if CACHE_SETTINGS.get("persistent", True) else None
+    )
+
+
+def _cache_key(query: str, categories: str, language: str, max_results: int) -> str:
+    """
+    Builds the cache key for a search from its normalized query and parameters.
+
+    Args:
+        query (str): The raw search query.
+        categories (str): Searx categories.
+        language (str): Language code.
+        max_results (int): Maximum number of results requested.
+
+    Returns:
+        str: A key that is identical for equivalent searches.
+    """
+    normalized = " ".join(query.casefold().split())
+    return f"{normalized}|{categories}|{language}|{max_results}"
+
+
+def _error_result(message: str, tag=None) -> list[dict]:
+    """
+    Builds the single-item error stub returned when a live search fails.
+
+    Args:
+        message (str): Human-readable failure reason.
+        tag (str, optional): Tag/category of the failed search.
+
+    Returns:
+        list[dict]: A one-element list describing the failure, flagged with `"error": True`.
+    """
+    return [{
+        "title": "SearxNG Error",
+        "url": SEARX_URL,
+        "content": f"Live search failed: {message}",
+        "category": tag or "error",
+        "error": True
+    }]
+
+
+async def search_searx(query: str, categories="general", language="en", max_results=6, tag=None):
     """
     Sends a search query to a SearxNG instance and retrieves filtered web results.
 
@@ -32,6 +88,12 @@ def search_searx(query: str, categories="general", language="en", max_results=6,
         
         If an error occurs, a single-item list with an error message is returned.
     """
+    cache_key = _cache_key(query, categories, language, max_results)
+    if SEARX_CACHE is not None:
+        cached = SEARX_CACHE.get(cache_key)
+        if cached is not None:
+            return [{**r, "category": tag or "general"} for r in cached]
+
     headers = {
         "User-Agent": "Mozilla/5.0",
         "Accept": "application/json"
@@ -44,7 +106,7 @@ def search_searx(query: str, categories="general", language="en", max_results=6,
     }
 
     try:
-        r = httpx.get(SEARX_URL, params=params, headers=headers, timeout=10)
+        r = await get_client("searx").get(SEARX_URL, params=params, headers=headers)
         r.raise_for_status()
         raw_results = r.json().get("results", [])
 
@@ -58,7 +120,7 @@ def search_searx(query: str, categories="general", language="en", max_results=6,
 
         results_to_use = filtered if filtered else raw_results[:max_results]
 
-        return [
+        results = [
             {
                 "title": r.get("title", "").strip(),
                 "url": r.get("url", "").strip(),
@@ -68,10 +130,46 @@ def search_searx(query: str, categories="general", language="en", max_results=6,
             for r in results_to_use if r.get("content")
         ]
 
+        # Only successful, non-empty searches are cached; error stubs never reach this point
+        if SEARX_CACHE is not None and results:
+            ttl = CACHE_TTLS.get(tag or "general", CACHE_TTLS.get("general", 21600))
+            SEARX_CACHE.set(cache_key, [{k: v for k, v in r.items() if k != "category"} for r in results], ttl)
+
+        return results
+
     except Exception as e:
-        return [{
-            "title": "SearxNG Error",
-            "url": SEARX_URL,
-            "content": f"Live search failed: {str(e)}",
-            "category": tag or "error"
-        }]
+        return _error_result(str(e), tag)
+
+
+async def search_searx_many(
+    searches: list[dict],
+    max_concurrency: int = SEARX_MAX_CONCURRENCY,
+    timeout: float = SEARX_QUERY_TIMEOUT
+) -> list[list[dict]]:
+    """
+    Runs several SearxNG searches concurrently and returns their results in input order.
+
+    Every entry of `searches` is a dict of keyword arguments for `search_searx`
+    (e.g. {"query": "best hotels in Dubai", "tag": "hotel", "max_results": 7}).
+    At most `max_concurrency` requests are in flight at once, and each search is
+    bounded by `timeout` seconds. A search that times out yields the same error
+    stub as any other failed search, so one slow query never blocks the rest.
+
+    Args:
+        searches (list[dict]): Keyword arguments for each `search_searx` call.
+        max_concurrency (int, optional): Maximum number of searches in flight.
+        timeout (float, optional): Per-search timeout in seconds.
+
+    Returns:
+        list[list[dict]]: One result list per search, in the same order as `searches`.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run_one(search: dict) -> list[dict]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(search_searx(**search), timeout=timeout)
+            except asyncio.TimeoutError:
+                return _error_result(f"timed out after {timeout}s", search.get("tag"))
+
+    return await asyncio.gather(*(run_one(search) for search in searches))
@@ -0,0 +1,151 @@
+import os
+import copy
+import time
+import uuid
+import yaml
+import sqlite3
+from typing import Optional
+from src.cache import MemoryCache, SQLiteCache
+from src.logger import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+SESSION_SETTINGS = config.get("SESSIONS", {})
+SESSION_TTL = SESSION_SETTINGS.get("ttl_seconds", 86400)
+SESSION_HEADER = SESSION_SETTINGS.get("header", "X-Session-ID")
+SESSION_COOKIE = SESSION_SETTINGS.get("cookie", "session_id")
+
+
+def new_session() -> dict:
+    """
+    Returns the state of a fresh conversation.
+    """
+    return {
+        "context": {
+            "city": None,
+            "airport": None,
+            "arrival_time": None,
+            "arrival_date": None
+        },
+        "chat_history": []
+    }
+
+
+class SessionStore:
+    """
+    Conversation state keyed by session ID.
+
+    Implementations must be safe to share between requests. Every `save`
+    refreshes the session's time-to-live.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    def load(self, session_id: str) -> dict:
+        """
+        Returns the stored state for `session_id`, or a fresh one if it is unknown or expired.
+        """
+        state = self._get(session_id)
+        return state if state is not None else new_session()
+
+    def save(self, session_id: str, state: dict) -> None:
+        self._set(session_id, state, time.time() + self.ttl)
+
+    def load_summary(self, session_id: str) -> dict:
+        """
+        Returns the session's chat summary as `{"text", "folded"}`, where `folded` is the
+        number of the last turn merged into it.
+
+        The summary is stored apart from the session state, so a request that saves
+        the session while a summary update is in flight cannot overwrite it.
+        """
+        summary = self._get(f"{session_id}:summary")
+        return summary if summary is not None else {"text": "", "folded": 0}
+
+    def save_summary(self, session_id: str, summary: dict) -> None:
+        self._set(f"{session_id}:summary", summary, time.time() + self.ttl)
+
+    def _get(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _set(self, session_id: str, state: dict, expires_at: float) -> None:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store with TTL and LRU eviction. Only valid with a single worker.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        super().__init__(ttl)
+        self._cache = MemoryCache(max_entries)
+
+    def _get(self, session_id: str) -> Optional[dict]:
+        entry = self._cache.get(session_id)
+        # Handed-out state is mutated by the request, so never share the stored object
+        return copy.deepcopy(entry[0]) if entry else None
+
+    def _set(self, session_id: str, state: dict, expires_at: float) -> None:
+        self._cache.set(session_id, copy.deepcopy(state), expires_at)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Store backed by a SQLite file, shared by every uvicorn worker on the host.
+    """
+
+    def __init__(self, ttl: float, path: str, max_entries: int = 10000):
+        super().__init__(ttl)
+        self._cache = SQLiteCache(path, table="sessions", max_entries=max_entries)
+
+    def _get(self, session_id: str) -> Optional[dict]:
+        try:
+            entry = self._cache.get(session_id)
+        except sqlite3.Error as e:
+            logger.warning("Session read failed: %s", e)
+            return None
+        return entry[0] if entry else None
+
+    def _set(self, session_id: str, state: dict, expires_at: float) -> None:
+        try:
+            self._cache.set(session_id, state, expires_at)
+        except sqlite3.Error as e:
+            logger.warning("Session write failed: %s", e)
+
+
+def _create_store() -> SessionStore:
+    backend = SESSION_SETTINGS.get("backend", "sqlite")
+    max_entries = SESSION_SETTINGS.get("max_entries", 10000)
+    if backend == "memory":
+        return MemorySessionStore(SESSION_TTL, max_entries)
+    if backend != "sqlite":
+        logger.warning("Unknown session backend '%s'; using sqlite", backend)
+    path = os.path.join(config.get("CACHE_DIR", "cache"), "sessions.sqlite3")
+    return SQLiteSessionStore(SESSION_TTL, path, max_entries)
+
+
+SESSION_STORE = _create_store()
+
+
+def resolve_session_id(header_value: Optional[str], cookie_value: Optional[str]) -> tuple[str, bool]:
+    """
+    Picks the session ID from the request header or cookie, or creates one.
+
+    Args:
+        header_value (str, optional): Value of the session header.
+        cookie_value (str, optional): Value of the session cookie.
+
+    Returns:
+        tuple[str, bool]: The session ID and whether it was newly created.
+    """
+    for value in (header_value, cookie_value):
+        if value and 8 <= len(value) <= 128 and value.replace("-", "").isalnum():
+            return value, False
+    return uuid.uuid4().hex, True
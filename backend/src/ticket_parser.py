@@ -0,0 +1,209 @@
+import re
+import yaml
+from datetime import date
+from typing import Optional
+from src.cities import match_city
+from src.airports import enrich_with_airports, lookup_airport
+
+# Load YAML config
+with open("config/settings.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+PARSER_SETTINGS = config.get("TICKET_PARSER", {})
+FAST_PATH_ENABLED = PARSER_SETTINGS.get("enabled", True)
+FAST_PATH_MIN_CONFIDENCE = PARSER_SETTINGS.get("min_confidence", 0.75)
+
+# How much each extracted field contributes to the confidence score
+FIELD_WEIGHTS = {
+    "destination": 0.35,
+    "origin": 0.2,
+    "flight_number": 0.15,
+    "arrival_date": 0.15,
+    "arrival_time": 0.1,
+    "airport_code": 0.05,
+}
+
+MONTHS = {
+    "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
+}
+
+# Words that turn a route label into another field, e.g. "ARRIVAL DATE" or "DEPARTURE GATE"
+LABEL_FIELDS = r"(?!\s*(?:DATE|TIME|GATE|TERMINAL|HALL)\b)"
+FROM_LABEL = re.compile(r"^\s*(?:FROM|ORIGIN|DEPART(?:URE|ING)?(?:\s+FROM)?)\b" + LABEL_FIELDS + r"\s*[:\-]?\s*(.*)$", re.MULTILINE)
+TO_LABEL = re.compile(r"^\s*(?:TO|DESTINATION|ARRIV(?:AL|ING)(?:\s+AT)?)\b" + LABEL_FIELDS + r"\s*[:\-]?\s*(.*)$", re.MULTILINE)
+INLINE_ROUTE = re.compile(r"\bFROM\s+([A-Z][A-Z .'\-]+?)\s+TO\s+([A-Z][A-Z .'\-]+?)(?=\s*(?:\(|\n|$|ON\b|FLIGHT\b))")
+# No "/" separator: it would match passenger names such as "LEE/ANN"
+IATA_PAIR = re.compile(r"\b([A-Z]{3})\s*(?:-|–|—|→|->|>|\bTO\b)\s*([A-Z]{3})\b")
+IATA_IN_PARENS = re.compile(r"\(([A-Z]{3})\)")
+BARE_IATA = re.compile(r"^([A-Z]{3})\b")
+FLIGHT_LABELED = re.compile(r"\b(?:FLIGHT(?:\s+(?:NO|NUMBER))?|FLT)\.?\s*[:#]?\s*([A-Z][A-Z0-9]|[0-9][A-Z])\s?(\d{1,4}[A-Z]?)\b")
+FLIGHT_BARE = re.compile(r"\b([A-Z]{2})\s?(\d{2,4})\b")
+TIME_LABELED = re.compile(r"\b(ARRIVAL|ARRIVES|ARR|ETA|BOARDING(?:\s+TIME)?|DEPARTURE|DEPARTS|DEP|ETD)\b\.?\s*(?:TIME)?\s*[:\-]?\s*(\d{1,2})[:.h]?(\d{2})\b")
+DATE_NUMERIC = re.compile(r"\b(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2,4})\b")
+DATE_ISO = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+DATE_TEXT = re.compile(r"\b(\d{1,2})\s?(JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)[A-Z]*\.?\s?(\d{2,4})?\b")
+
+
+def _city_from_label(value: str) -> Optional[str]:
+    """
+    Resolves the city in a labelled value such as "LONDON HEATHROW (LHR)".
+
+    Tries progressively shorter word prefixes with exact lookups first, then
+    falls back to a single fuzzy lookup of the first word.
+    """
+    value = IATA_IN_PARENS.sub(" ", value)
+    words = re.findall(r"[A-Z][A-Z.'\-]*", value.upper())[:4]
+    for size in range(len(words), 0, -1):
+        city = match_city(" ".join(words[:size]), fuzzy=False)
+        if city:
+            return city
+    if words and len(words[0]) >= 4:
+        return match_city(words[0], score_threshold=90.0)
+    return None
+
+
+def _parse_route(text: str) -> dict:
+    result = {}
+
+    inline = INLINE_ROUTE.search(text)
+    if inline:
+        result["origin"] = _city_from_label(inline.group(1))
+        result["destination"] = _city_from_label(inline.group(2))
+
+    for key, pattern in (("origin", FROM_LABEL), ("destination", TO_LABEL)):
+        if result.get(key):
+            continue
+        for match in pattern.finditer(text):
+            value = match.group(1).strip()
+            if not value:
+                # Label on its own line, value on the next one
+                rest = text[match.end():].lstrip("\n")
+                value = rest.split("\n", 1)[0]
+            code_key = "airport_code" if key == "destination" else "origin_code"
+            city = _city_from_label(value)
+            if city:
+                result[key] = city
+                code = IATA_IN_PARENS.search(value)
+                if code:
+                    result[code_key] = code.group(1)
+                break
+            code = BARE_IATA.match(value.strip())
+            if code and not result.get(code_key):
+                # e.g. "TO: DXB" - the airport index resolves the city later
+                result[code_key] = code.group(1)
+
+    for pair in IATA_PAIR.finditer(text):
+        # Only trust pairs of real airports, not any two three-letter words
+        if lookup_airport(pair.group(1)) and lookup_airport(pair.group(2)):
+            result.setdefault("origin_code", pair.group(1))
+            result.setdefault("airport_code", pair.group(2))
+            break
+
+    return {k: v for k, v in result.items() if v}
+
+
+def _parse_flight_number(text: str) -> Optional[str]:
+    match = FLIGHT_LABELED.search(text)
+    if match:
+        return f"{match.group(1)}{match.group(2)}"
+    candidates = {f"{m.group(1)}{m.group(2)}" for m in FLIGHT_BARE.finditer(text)}
+    return candidates.pop() if len(candidates) == 1 else None
+
+
+def _infer_year(day: int, month: int, today: date) -> int:
+    """
+    Picks the year for a day/month without one: this year, unless that is over a month ago.
+    """
+    try:
+        candidate = date(today.year, month, day)
+    except ValueError:
+        return today.year
+    return today.year + 1 if (today - candidate).days > 31 else today.year
+
+
+def _parse_date(text: str, today: Optional[date] = None) -> Optional[str]:
+    today = today or date.today()
+    day = month = year = None
+
+    if match := DATE_ISO.search(text):
+        year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    elif match := DATE_TEXT.search(text):
+        day, month = int(match.group(1)), MONTHS[match.group(2)]
+        if match.group(3):
+            year = int(match.group(3))
+    elif match := DATE_NUMERIC.search(text):
+        day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+
+    if day is None:
+        return None
+    if year is None:
+        year = _infer_year(day, month, today)
+    elif year < 100:
+        year += 2000
+
+    try:
+        return date(year, month, day).strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+def _parse_times(text: str) -> dict:
+    times = {}
+    for match in TIME_LABELED.finditer(text):
+        hours, minutes = int(match.group(2)), int(match.group(3))
+        if hours > 23 or minutes > 59:
+            continue
+        label = match.group(1)
+        value = f"{hours:02d}:{minutes:02d}"
+        if label.startswith(("ARR", "ETA")):
+            times.setdefault("arrival_time", value)
+        elif label.startswith("BOARDING"):
+            times.setdefault("boarding time", value)
+        else:
+            times.setdefault("departure_time", value)
+    return times
+
+
+def parse_ticket_text(text: str, today: Optional[date] = None) -> dict:
+    """
+    Extracts travel fields from OCR text with deterministic rules, without calling an LLM.
+
+    Recognizes labelled FROM/TO lines, IATA code pairs (e.g. "LHR → DXB"), flight
+    numbers, dates in common boarding-pass formats and labelled times. City names
+    are validated against the known-city list, and airport codes are resolved to
+    cities through the airport index, so a high score means the fields can be
+    trusted.
+
+    Args:
+        text (str): Raw OCR-extracted text from a travel document.
+        today (date, optional): Reference date used to infer missing years.
+
+    Returns:
+        dict: The same fields as the LLM extraction ('origin', 'destination',
+              'airport_code', 'flight_number', 'boarding time', 'arrival_time',
+              'arrival_date', ...) plus a 'confidence' score between 0 and 1.
+              Missing fields are None.
+    """
+    upper = text.upper()
+    result = {
+        "origin": None,
+        "destination": None,
+        "airport_name": None,
+        "airport_code": None,
+        "flight_number": None,
+        "boarding time": None,
+        "arrival_time": None,
+        "arrival_date": None,
+    }
+    result.update(_parse_route(upper))
+    result.update(_parse_times(upper))
+    result["flight_number"] = _parse_flight_number(upper)
+    result["arrival_date"] = _parse_date(upper, today)
+    enrich_with_airports(result)
+
+    confidence = 0.0
+    if result["destination"]:
+        confidence = sum(weight for field, weight in FIELD_WEIGHTS.items() if result.get(field))
+    result["confidence"] = round(min(confidence, 1.0), 2)
+    return result
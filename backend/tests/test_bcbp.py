@@ -0,0 +1,40 @@
+"""
+Tests for boarding-pass barcode (BCBP) decoding and its hand-off to trip extraction.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import asyncio
+from datetime import date
+from app import extract_trip
+from src.bcbp import bcbp_to_text, parse_bcbp
+
+TODAY = date(2026, 10, 1)
+
+# LHR -> DXB on EK 002, Julian day 326 (22 Nov), seat 12A
+BCBP = "M1DESMARAIS/LUC       EABC123 LHRDXBEK 0002 326Y012A0025 100"
+
+
+def test_parse_bcbp_returns_flight_date():
+    fields = parse_bcbp(BCBP, TODAY)
+    assert fields["origin_code"] == "LHR"
+    assert fields["airport_code"] == "DXB"
+    assert fields["flight_number"] == "EK002"
+    assert fields["flight_date"] == "22/11/2026"
+    assert "arrival_date" not in fields
+
+
+def test_barcode_text_has_no_date():
+    text = bcbp_to_text(parse_bcbp(BCBP, TODAY))
+    assert "22/11/2026" not in text
+    assert "DATE" not in text
+
+
+def test_extract_trip_keeps_flight_date_out_of_arrival_date():
+    fields = parse_bcbp(BCBP, TODAY)
+    context = {}
+    trip = asyncio.run(extract_trip({"text": bcbp_to_text(fields), "barcode": fields}, context))
+    assert trip["destination"] == "Dubai"
+    assert trip["flight_date"] == "22/11/2026"
+    assert not trip.get("arrival_date")
+    assert not context.get("arrival_date")
@@ -0,0 +1,103 @@
+"""
+Tests for the memory / SQLite / tiered response caches shared by searx, gemma and ocr.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+from types import SimpleNamespace
+import pytest
+import src.cache as cache
+from src.cache import MemoryCache, SQLiteCache, TieredCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces the cache module's clock with one the test moves by hand.
+    """
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def disk(tmp_path, clock):
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=100)
+
+
+def test_memory_entry_expires(clock):
+    memory = MemoryCache()
+    memory.set("k", "v", clock.value + 10)
+    assert memory.get("k") == ("v", clock.value + 10)
+    clock.value += 10
+    assert memory.get("k") is None
+    assert len(memory) == 0
+
+
+def test_memory_evicts_least_recently_used(clock):
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", 1, clock.value + 60)
+    memory.set("b", 2, clock.value + 60)
+    memory.get("a")
+    memory.set("c", 3, clock.value + 60)
+    assert memory.get("b") is None
+    assert memory.get("a")[0] == 1
+    assert memory.get("c")[0] == 3
+
+
+def test_sqlite_round_trip_and_expiry(disk, clock):
+    disk.set("k", {"items": [1, 2]}, clock.value + 10)
+    assert disk.get("k") == ({"items": [1, 2]}, clock.value + 10)
+    clock.value += 10
+    assert disk.get("k") is None
+
+
+def test_sqlite_purges_and_trims_every_64_writes(tmp_path, clock):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    disk.set("expired", 0, clock.value + 1)
+    clock.value += 2
+    for i in range(62):
+        clock.value += 1
+        disk.set(f"k{i}", i, clock.value + 3600)
+    # 63 writes: nothing removed yet
+    assert disk._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 63
+
+    clock.value += 1
+    disk.set("k62", 62, clock.value + 3600)
+    keys = {row[0] for row in disk._conn.execute("SELECT key FROM cache")}
+    assert keys == {f"k{i}" for i in range(53, 63)}
+
+
+def test_sqlite_without_max_entries_never_trims(tmp_path, clock):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    for i in range(64):
+        disk.set(f"k{i}", i, clock.value - 1)
+    assert disk._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 64
+
+
+def test_tiered_promotes_disk_hits_with_remaining_ttl(disk, clock):
+    TieredCache("first", MemoryCache(), disk).set("k", "v", 100)
+    clock.value += 40
+
+    tiered = TieredCache("second", MemoryCache(), disk)
+    assert tiered.get("k") == "v"
+    assert tiered.memory.get("k") == ("v", clock.value + 60)
+    assert tiered.get("k") == "v"
+    assert tiered.counters == {"memory_hits": 1, "disk_hits": 1, "misses": 0, "sets": 0}
+
+
+def test_tiered_miss_after_ttl(disk, clock):
+    tiered = TieredCache("test", MemoryCache(), disk)
+    tiered.set("k", "v", 5)
+    clock.value += 5
+    assert tiered.get("k") is None
+    assert tiered.stats()["misses"] == 1
+    assert tiered.stats()["hit_ratio"] == 0.0
+
+
+def test_tiered_memory_only(clock):
+    tiered = TieredCache("test", MemoryCache())
+    tiered.set("k", [1], 60)
+    assert tiered.get("k") == [1]
+    assert tiered.get("other") is None
+    assert tiered.stats()["hit_ratio"] == 0.5
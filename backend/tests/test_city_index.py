@@ -0,0 +1,116 @@
+"""
+Tests for the memory-mapped city index and the city lookups built on it.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import os
+import pandas as pd
+import pytest
+from rapidfuzz import process
+import src.cities as cities
+from src.city_index import CityIndex, build_city_index
+
+CSV = """city,city_ascii,lat,lng,country,population
+Dubai,Dubai,25.2631,55.2972,United Arab Emirates,5000000
+London,London,51.5072,-0.1275,United Kingdom,11262000
+Islamabad,Islamabad,33.6931,73.0639,Pakistan,1014825
+Paris,Paris,48.8567,2.3522,France,11060000
+São Paulo,Sao Paulo,-23.5504,-46.6339,Brazil,22046000
+New York,New York,40.6943,-73.9249,United States,18972871
+San Francisco,San Francisco,37.7558,-122.4449,United States,3364862
+Karachi,Karachi,24.86,67.01,Pakistan,14835000
+Kraków,Krakow,50.0614,19.9372,Poland,766683
+Frankfurt,Frankfurt,50.1136,8.6797,Germany,791000
+Date,Date,37.8188,140.5631,Japan,58000
+Hall in Tirol,Hall in Tirol,47.2833,11.5,Austria,14000
+London,London,42.9836,-81.2497,Canada,422324
+Paris,Paris,33.6688,-95.5462,United States,24476
+Lahore,Lahore,31.5497,74.3436,Pakistan,13004135
+Lagos,Lagos,6.455,3.3841,Nigeria,15388000
+Lisbon,Lisbon,38.7452,-9.1604,Portugal,506654
+"""
+
+QUERIES = [
+    "London", "london", "  PARIS ", "Londn", "Dubaii", "Islamabd", "Karachy", "San Fransisco",
+    "new york", "Sao Paulo", "Krakow", "Frankfort", "Lahor", "Lagoss", "Lisboa", "Date", "Zzzz", "",
+]
+
+
+@pytest.fixture
+def city_csv(tmp_path):
+    path = tmp_path / "worldcities.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def index(city_csv, tmp_path, monkeypatch):
+    path = str(tmp_path / "worldcities.idx")
+    build_city_index(city_csv, path)
+    city_index = CityIndex(path)
+    monkeypatch.setattr(cities, "CITY_INDEX", city_index)
+    cities.match_city.cache_clear()
+    yield city_index
+    cities.match_city.cache_clear()
+    city_index.close()
+
+
+def legacy_match(city_csv: str, name: str, score_threshold: float = 85.0):
+    """
+    The linear scan the index replaced: fuzzy match against every unique city name.
+    """
+    city_list = pd.read_csv(city_csv)["city"].dropna().unique().tolist()
+    name = name.strip().title()
+    if not name:
+        return None
+    match = process.extractOne(name, city_list, score_cutoff=score_threshold)
+    return match[0] if match else None
+
+
+def test_index_keeps_first_row_per_name(index):
+    assert index.size == 15
+    paris = index.lookup("paris")
+    assert index.name(paris) == "Paris"
+    assert index.coordinates(paris) == pytest.approx((48.8567, 2.3522), abs=1e-3)
+    assert index.lookup("Atlantis") is None
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_match_city_agrees_with_linear_scan(index, city_csv, query):
+    assert cities.match_city(query) == legacy_match(city_csv, query)
+
+
+@pytest.mark.parametrize("query", ["Londn", "Islamabd", "San Fransisco", "Frankfort", "Lahor"])
+def test_trigram_prefilter_keeps_best_match(index, city_csv, query):
+    best = legacy_match(city_csv, query)
+    assert best in [index.name(name_id) for name_id in index.candidates(query.title(), limit=3)]
+
+
+def test_exact_only_lookup(index):
+    assert cities.match_city("LONDON", fuzzy=False) == "London"
+    assert cities.match_city("Londn", fuzzy=False) is None
+
+
+def test_rebuilds_stale_index(city_csv, tmp_path, monkeypatch):
+    index_path = str(tmp_path / "worldcities.idx")
+    monkeypatch.setattr(cities, "CITY_FILE_PATH", city_csv)
+    monkeypatch.setattr(cities, "CITY_INDEX_PATH", index_path)
+
+    first = cities._load_city_index()
+    assert first.lookup("Lisbon") is not None and first.lookup("Porto") is None
+    first.close()
+    built_at = os.path.getmtime(index_path)
+
+    # Up to date: reused as is
+    cities._load_city_index().close()
+    assert os.path.getmtime(index_path) == built_at
+
+    with open(city_csv, "a", encoding="utf-8") as f:
+        f.write("Porto,Porto,41.1495,-8.6108,Portugal,237591\n")
+    os.utime(city_csv, (built_at + 10, built_at + 10))
+
+    second = cities._load_city_index()
+    assert second.lookup("Porto") is not None
+    second.close()
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
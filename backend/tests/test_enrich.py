@@ -0,0 +1,85 @@
+"""
+Tests for the search result de-duplication and annotation stage.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import hashlib
+import pytest
+from src.enrich import TOKEN, ResultEnricher, canonical_url, enrich_results, simhash, url_key
+
+SNIPPET = (
+    "Family run spot near the marina serving grilled seafood and fresh salads, open daily from 9am. "
+    "Reviews mention friendly staff, generous portions, quick service and views of the old town."
+)
+
+
+def reference_simhash(text):
+    """
+    The per-bit weight loop the column counting replaced.
+    """
+    tokens = TOKEN.findall(text.lower())
+    if len(tokens) < 8:
+        return None
+    weights = [0] * 64
+    for shingle in zip(tokens, tokens[1:]):
+        digest = int.from_bytes(hashlib.blake2b(" ".join(shingle).encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if digest >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+@pytest.mark.parametrize("text", [
+    SNIPPET,
+    SNIPPET * 40,
+    "a b c d e f g h",
+    "a a a a a a a a a",
+    "Too short to hash",
+    "",
+])
+def test_simhash_matches_reference(text):
+    assert simhash(text) == reference_simhash(text)
+
+
+def test_near_duplicate_snippets_are_close():
+    distance = bin(simhash(SNIPPET) ^ simhash(SNIPPET.replace("9am", "10am"))).count("1")
+    assert distance <= 16
+    assert bin(simhash(SNIPPET) ^ simhash("Rooftop bar with live jazz, craft cocktails and city views every night")).count("1") > 3
+
+
+def test_url_variants_share_a_key():
+    urls = [
+        "https://www.example.com/menu/?utm_source=x&b=2&a=1",
+        "HTTP://example.com:80/menu?a=1&b=2#reviews",
+    ]
+    assert len({url_key(canonical_url(url)) for url in urls}) == 1
+
+
+def test_duplicates_are_dropped_per_category():
+    results = [
+        {"category": "restaurant", "url": "https://a.example/1", "title": "Marina Grill", "content": SNIPPET},
+        {"category": "restaurant", "url": "https://www.a.example/1/", "title": "Other", "content": "x"},
+        {"category": "restaurant", "url": "https://b.example/2", "title": "Marina  grill!", "content": SNIPPET.upper()},
+        {"category": "restaurant", "url": "https://c.example/3", "title": "Grill", "content": SNIPPET + " Book now."},
+        {"category": "hotel", "url": "https://d.example/4", "title": "Marina Grill", "content": SNIPPET},
+        {"category": "restaurant", "url": "https://e.example/5", "title": "", "content": ""},
+        {"category": "restaurant", "url": "https://f.example/6", "title": "", "content": ""},
+        {"error": "timeout"},
+    ]
+    enricher = ResultEnricher()
+    kept = [item for item in map(enricher.add, results) if item is not None]
+    assert [item["url"] for item in kept] == [
+        "https://a.example/1", "https://d.example/4", "https://e.example/5", "https://f.example/6",
+    ]
+    assert enricher.counters == {"kept": 4, "duplicate_url": 1, "duplicate_text": 1, "near_duplicate": 1, "error": 1}
+
+
+def test_results_get_price_tiers():
+    enriched = enrich_results([
+        {"url": "https://a.example", "title": "Cheap eats", "content": "Michelin starred tasting menu"},
+        {"url": "https://b.example", "title": "Cafe", "content": "Mains from AED 45"},
+        {"url": "https://c.example", "title": "Cafe", "content": "Open daily"},
+    ])
+    assert [item["tier"] for item in enriched] == ["Luxury", "Mid-Range", "Mid-Range"]
+    assert enriched[0]["category_hint"] == "cheap"
+    assert enriched[1]["price"] == "from AED 45"
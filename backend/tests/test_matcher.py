@@ -0,0 +1,91 @@
+"""
+Tests for the phrase matcher and the price-tier cues built on it.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import pytest
+import src.matcher as matcher
+from config.prompts import PRICE_CUES, PRICE_MATCHER, categorize_by_price, guess_price_range, result_price
+from src.matcher import PhraseMatcher
+
+TIERS = {"$$$": "Luxury", "$$": "Mid-Range", "$": "Cheap"}
+
+
+def legacy_guess_price_range(text):
+    """
+    The chained `in` checks that PRICE_CUES / PRICE_MATCHER replaced.
+    """
+    text = text.lower()
+    if (
+        "$$$" in text or "fine dining" in text or "michelin" in text or
+        "luxury" in text or "five-star" in text or "expensive" in text or
+        "suite" in text or "penthouse" in text or "exclusive" in text or
+        "high-end" in text or "gourmet" in text
+    ):
+        return "$$$"
+    if (
+        "$$" in text or "mid-range" in text or "bistro" in text or
+        "popular" in text or "moderate" in text or "brasserie" in text or
+        "boutique" in text or "modern" in text or "4-star" in text or
+        "casual dining" in text or "stylish" in text or "quality food" in text
+    ):
+        return "$$"
+    if (
+        "$" in text or "affordable" in text or "cheap" in text or
+        "budget" in text or "fast food" in text or "pizza" in text or
+        "diner" in text or "grab-and-go" in text or "street food" in text or
+        "food court" in text or "local eatery" in text or "value for money" in text
+    ):
+        return "$"
+    return None
+
+
+CUES = [cue for cues in PRICE_CUES.values() for cue in cues]
+TEXTS = (
+    [f"A {cue} place near the marina" for cue in CUES]
+    + [f"{cue.upper()} spot" for cue in CUES]
+    + [
+        "Budget bistro with Michelin ambitions",
+        "Popular street food stalls",
+        "Cheap eats; dinner around $$",
+        "Open daily from 9am, friendly staff",
+        "",
+    ]
+)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_price_tier_matches_legacy_checks(text):
+    expected = legacy_guess_price_range(text)
+    assert guess_price_range(text) == expected
+    assert PRICE_MATCHER.first(text, ("$$$", "$$", "$")) == expected
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_result_price_and_tier_match_legacy_checks(text):
+    result = {"title": "Somewhere", "content": text}
+    expected = legacy_guess_price_range(text)
+    assert result_price(result) == expected
+    grouped = categorize_by_price([result])
+    assert grouped[TIERS.get(expected, "Mid-Range")] == [result]
+
+
+def test_title_is_checked_after_content():
+    result = {"title": "Gourmet kitchen", "content": "Open daily"}
+    assert result_price(result) == "$$$"
+    assert categorize_by_price([result])["Luxury"] == [result]
+
+
+@pytest.mark.parametrize("max_phrases", [matcher.SUBSTRING_MAX_PHRASES, 0])
+def test_substring_and_regex_strategies_agree(monkeypatch, max_phrases):
+    monkeypatch.setattr(matcher, "SUBSTRING_MAX_PHRASES", max_phrases)
+    price_matcher = PhraseMatcher(PRICE_CUES)
+    for text in TEXTS:
+        assert price_matcher.first(text, ("$$$", "$$", "$")) == legacy_guess_price_range(text)
+
+    flags = PhraseMatcher({"skip_hotels": ["no hotel", "airbnb"], "skip_food": ["no food"], "car": ["have a car"]})
+    assert flags.labels("Airbnb booked\nI HAVE A CAR") == {"skip_hotels", "car"}
+    assert flags.labels("museums") == set()
+    assert flags.first("no hotel, no food", ("skip_food", "skip_hotels")) == "skip_food"
+    assert flags.first("no hotel", ("unknown", "skip_hotels")) == "skip_hotels"
@@ -0,0 +1,73 @@
+"""
+Tests for the rolling chat memory (recent turns plus a background summary).
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import asyncio
+import pytest
+import src.memory as memory
+from src.memory import RECENT_TURNS, fold_chat_memory, load_chat_summary, memory_turns, remember_turn
+from src.sessions import MemorySessionStore
+
+SESSION_ID = "test-session-0001"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemorySessionStore(ttl=3600)
+    monkeypatch.setattr(memory, "SESSION_STORE", store)
+    return store
+
+
+def ask(store, question):
+    """
+    What /ask does with the session around its LLM call.
+    """
+    session = store.load(SESSION_ID)
+    load_chat_summary(SESSION_ID, session)
+    pending = remember_turn(session, question, f"answer to {question}")
+    store.save(SESSION_ID, session)
+    return pending
+
+
+def test_old_turns_queue_for_summary(store):
+    for i in range(RECENT_TURNS + 2):
+        ask(store, f"q{i}")
+    session = store.load(SESSION_ID)
+    assert [turn["question"] for turn in session["pending_turns"]] == ["q0", "q1"]
+    assert len(session["chat_history"]) == RECENT_TURNS
+    assert [turn["question"] for turn in memory_turns(session)][:3] == ["q0", "q1", "q2"]
+
+
+def test_fold_keeps_turns_saved_while_it_runs(store, monkeypatch):
+    for i in range(RECENT_TURNS + 1):
+        ask(store, f"q{i}")
+
+    async def call_gemma_async(prompt, use_cache=False):
+        # Another question is answered and saved while the summary is generated
+        ask(store, "during fold")
+        return {"summary": "Asked about q0."}
+
+    monkeypatch.setattr(memory, "call_gemma_async", call_gemma_async)
+    asyncio.run(fold_chat_memory(SESSION_ID))
+
+    session = store.load(SESSION_ID)
+    assert session["chat_history"][-1]["question"] == "during fold"
+    assert load_chat_summary(SESSION_ID, session) == "Asked about q0."
+    assert [turn["question"] for turn in session["pending_turns"]] == ["q1"]
+
+
+def test_failed_fold_leaves_turns_pending(store, monkeypatch):
+    for i in range(RECENT_TURNS + 1):
+        ask(store, f"q{i}")
+
+    async def call_gemma_async(prompt, use_cache=False):
+        return {"error": "Gemma call failed"}
+
+    monkeypatch.setattr(memory, "call_gemma_async", call_gemma_async)
+    asyncio.run(fold_chat_memory(SESSION_ID))
+
+    session = store.load(SESSION_ID)
+    assert load_chat_summary(SESSION_ID, session) == ""
+    assert [turn["question"] for turn in session["pending_turns"]] == ["q0"]
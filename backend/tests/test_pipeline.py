@@ -0,0 +1,118 @@
+"""
+Tests for the async stage graph behind the itinerary pipeline.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import asyncio
+import pytest
+from src.pipeline import StageGraph
+
+
+def run(graph, **kwargs):
+    return asyncio.run(graph.run(**kwargs))
+
+
+def test_stages_receive_dependency_results():
+    graph = StageGraph()
+
+    async def text():
+        return "LHR-DXB"
+
+    async def keywords():
+        return ["food"]
+
+    async def search(text, keywords):
+        return f"{text}:{','.join(keywords)}"
+
+    graph.add("text", text)
+    graph.add("keywords", keywords)
+    graph.add("search", search, deps=("text", "keywords"))
+    results, timings = run(graph)
+    assert results == {"text": "LHR-DXB", "keywords": ["food"], "search": "LHR-DXB:food"}
+    assert set(timings) == {"text", "keywords", "search"}
+
+
+def test_dependents_start_after_their_inputs():
+    graph = StageGraph()
+    started = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def after(slow):
+        return slow + 1
+
+    graph.add("slow", slow)
+    graph.add("after", after, deps=("slow",))
+    results, timings = run(graph, on_start=started.append)
+    assert started == ["slow", "after"]
+    assert results["after"] == 2
+    assert timings["after"]["start_ms"] >= timings["slow"]["duration_ms"]
+
+
+def test_independent_stages_overlap():
+    graph = StageGraph()
+    running, peak = set(), []
+
+    def stage(name):
+        async def func():
+            running.add(name)
+            peak.append(len(running))
+            await asyncio.sleep(0.05)
+            running.discard(name)
+            return name
+        return func
+
+    for name in ("a", "b", "c"):
+        graph.add(name, stage(name))
+    results, _ = run(graph)
+    assert max(peak) == 3
+    assert results == {"a": "a", "b": "b", "c": "c"}
+
+
+def test_failing_stage_raises_and_cancels_the_rest():
+    graph = StageGraph()
+    cancelled = []
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("no destination")
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def dependent(fail):
+        return fail
+
+    graph.add("fail", fail)
+    graph.add("slow", slow)
+    graph.add("dependent", dependent, deps=("fail",))
+    with pytest.raises(ValueError, match="no destination"):
+        run(graph)
+    assert cancelled == ["slow"]
+
+
+def test_unknown_dependency_is_rejected():
+    graph = StageGraph()
+    with pytest.raises(ValueError, match="unknown stages"):
+        graph.add("search", lambda text: text, deps=("text",))
+
+
+def test_cycles_cannot_be_declared():
+    graph = StageGraph()
+
+    async def stage(**inputs):
+        return None
+
+    graph.add("a", stage)
+    graph.add("b", stage, deps=("a",))
+    with pytest.raises(ValueError, match="already registered"):
+        graph.add("a", stage, deps=("b",))
+    with pytest.raises(ValueError, match="unknown stages"):
+        graph.add("c", stage, deps=("c",))
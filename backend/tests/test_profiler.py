@@ -0,0 +1,21 @@
+"""
+Tests for the on-demand sampling profiler.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import time
+import src.profiler as profiler
+
+
+def test_window_is_capped_and_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiler, "MAX_WINDOW_SECONDS", 0.2)
+
+    profile_id, seconds = profiler.start_window(30, interval=0.01)
+    assert seconds == 0.2
+
+    deadline = time.monotonic() + 5
+    while not profiler.list_profiles() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [meta["id"] for meta in profiler.list_profiles()] == [profile_id]
@@ -0,0 +1,73 @@
+"""
+Tests for the per-session conversation stores and session ID handling.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+import pytest
+from src.sessions import MemorySessionStore, SQLiteSessionStore, new_session, resolve_session_id
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(ttl=3600)
+    return SQLiteSessionStore(ttl=3600, path=str(tmp_path / "sessions.sqlite3"))
+
+
+def test_round_trip(store):
+    session = new_session()
+    session["context"]["city"] = "Dubai"
+    session["chat_history"].append({"n": 1, "question": "Weather?", "answer": "Hot."})
+    store.save("session-a", session)
+    assert store.load("session-a") == session
+
+
+def test_unknown_session_is_fresh(store):
+    assert store.load("never-saved") == new_session()
+
+
+def test_sessions_are_isolated(store):
+    session = new_session()
+    session["context"]["city"] = "Dubai"
+    store.save("session-a", session)
+    assert store.load("session-b")["context"]["city"] is None
+
+
+def test_loaded_state_is_a_copy(store):
+    store.save("session-a", new_session())
+    store.load("session-a")["context"]["city"] = "Paris"
+    assert store.load("session-a")["context"]["city"] is None
+
+
+def test_expired_session_is_fresh(tmp_path):
+    store = SQLiteSessionStore(ttl=-1, path=str(tmp_path / "sessions.sqlite3"))
+    session = new_session()
+    session["context"]["city"] = "Dubai"
+    store.save("session-a", session)
+    assert store.load("session-a") == new_session()
+
+
+def test_summary_is_stored_apart_from_the_session(store):
+    assert store.load_summary("session-a") == {"text": "", "folded": 0}
+    store.save_summary("session-a", {"text": "Asked about food.", "folded": 3})
+    store.save("session-a", new_session())
+    assert store.load_summary("session-a") == {"text": "Asked about food.", "folded": 3}
+    assert "summary" not in store.load("session-a")
+
+
+@pytest.mark.parametrize("header, cookie, expected", [
+    ("abcdef12-3456", None, ("abcdef12-3456", False)),
+    (None, "cookie-id-0001", ("cookie-id-0001", False)),
+    ("header-id-0001", "cookie-id-0001", ("header-id-0001", False)),
+    ("bad id; drop table", "cookie-id-0001", ("cookie-id-0001", False)),
+])
+def test_resolve_session_id(header, cookie, expected):
+    assert resolve_session_id(header, cookie) == expected
+
+
+@pytest.mark.parametrize("value", [None, "", "short", "x" * 129, "../etc/passwd", "id:summary"])
+def test_invalid_session_ids_get_a_new_one(value):
+    session_id, created = resolve_session_id(value, None)
+    assert created
+    assert session_id != value and len(session_id) == 32
@@ -0,0 +1,66 @@
+"""
+Tests for the rule-based boarding-pass parser.
+
+Run from backend/ (settings are loaded relative to it):
+    python -m pytest tests
+"""
+from datetime import date
+import pytest
+import src.ticket_parser as ticket_parser
+from src.ticket_parser import parse_ticket_text
+
+TODAY = date(2026, 10, 1)
+
+# Real cities that are also boarding-pass field names (Date, Japan; Hall in Tirol)
+CITIES = {"London": "London", "Dubai": "Dubai", "Date": "Date", "Hall": "Hall"}
+
+
+@pytest.fixture(autouse=True)
+def known_cities(monkeypatch):
+    def match_city(name, score_threshold=85.0, fuzzy=True):
+        return CITIES.get(name.strip().title())
+    monkeypatch.setattr(ticket_parser, "match_city", match_city)
+
+
+@pytest.mark.parametrize("line", [
+    "ARRIVAL DATE: 12 NOV 2026",
+    "ARRIVAL TIME: 14:05",
+    "ARRIVAL TERMINAL: 3",
+    "ARRIVAL HALL: B",
+    "ARRIVING AT GATE B12",
+])
+def test_arrival_field_lines_are_not_destinations(line):
+    result = parse_ticket_text(f"BOARDING PASS\nFROM: LONDON\nFLIGHT EK 2\n{line}", TODAY)
+    assert result["destination"] is None
+    assert result["confidence"] == 0.0
+
+
+@pytest.mark.parametrize("line", [
+    "DEPARTURE DATE: 12 NOV 2026",
+    "DEPARTURE TIME 10:30",
+    "DEPARTURE GATE: 22",
+    "DEPARTURE TERMINAL 3",
+])
+def test_departure_field_lines_are_not_origins(line):
+    result = parse_ticket_text(f"{line}\nTO: DUBAI", TODAY)
+    assert result["origin"] is None
+    assert result["destination"] == "Dubai"
+
+
+def test_field_lines_do_not_hide_the_route_labels():
+    text = "DEPARTURE TIME 10:30\nDEPARTURE: LONDON\nARRIVAL DATE: 12 NOV 2026\nARRIVAL: DUBAI"
+    result = parse_ticket_text(text, TODAY)
+    assert (result["origin"], result["destination"]) == ("London", "Dubai")
+    assert result["arrival_date"] == "12/11/2026"
+
+
+def test_passenger_name_is_not_an_airport_pair():
+    result = parse_ticket_text("PASSENGER: LEE/ANN\nFROM: LONDON\nTO: DUBAI", TODAY)
+    assert result.get("origin_code") is None
+    assert result["airport_code"] is None
+
+
+def test_airport_pair_needs_known_airports():
+    result = parse_ticket_text("REF ABC-XYZ\nLHR - DXB\nFLIGHT EK 2", TODAY)
+    assert (result["origin_code"], result["airport_code"]) == ("LHR", "DXB")
+    assert result["destination"] == "Dubai"
@@ -2,15 +2,10 @@ import streamlit as st
 import requests
 from streamlit_folium import st_folium
 from route import build_basic_route_map
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Flowable
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.lib.units import inch
-from io import BytesIO
-from datetime import datetime
+import streamlit.components.v1 as components
 import re
-import os
+import json
+import uuid
 
 st.set_page_config(page_title="AI Travel Planner", layout="wide")
 st.markdown("""
@@ -20,110 +15,24 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def iter_sse(resp):
+    """Yields (event, data) pairs from a Server-Sent Events response."""
+    event, data_lines = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 def format_links(text):
     return re.sub(r'\[([^\]]+)\]\((http[^\)]+)\)', r'[Website Link](\2)', text)
 
-class LogoRightCorner(Flowable):
-    def __init__(self, path, size=0.6 * inch):
-        super().__init__()
-        self.img_path = path
-        self.width = size
-        self.height = size
-
-    def draw(self):
-        self.canv.drawImage(self.img_path, self.canv._pagesize[0] - self.width - 40, self.canv._pagesize[1] - self.height - 30, width=self.width, height=self.height, mask='auto')
-
-def generate_pdf(itinerary_text: str, destination: str = "", logo_path: str = "assets/logo.png") -> bytes:
-    buffer = BytesIO()
-
-    safe_destination = re.sub(r'[^\w\- ]+', '', destination).replace(" ", "_").lower()
-
-    # Prepare styles
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='CoverTitle', fontSize=28, alignment=TA_CENTER, spaceAfter=20, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='CoverSubtitle', fontSize=16, alignment=TA_CENTER, spaceAfter=10))
-    styles.add(ParagraphStyle(name='MainHeading', fontSize=18, spaceAfter=16, spaceBefore=18, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='SubHeading', fontSize=14, spaceAfter=10, spaceBefore=14, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='NormalText', fontSize=11.5, leading=16, alignment=TA_LEFT))
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=40, leftMargin=40,
-        topMargin=60, bottomMargin=40,
-        title=f"Travel Itinerary for {destination or 'Destination'}"
-    )
-
-    elements = []
-
-    # Load logo if exists
-    show_logo = os.path.exists(logo_path)
-
-    # --- Cover Page ---
-    elements.append(Spacer(1, 100))
-    elements.append(Paragraph("Travel Itinerary", styles['CoverTitle']))
-    elements.append(Paragraph(f"Destination: {destination or 'Unknown'}", styles['CoverSubtitle']))
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['CoverSubtitle']))
-    if show_logo:
-        elements.append(Spacer(1, 50))
-        elements.append(Image(logo_path, width=1.5 * inch, height=1.5 * inch, hAlign='CENTER'))
-    elements.append(PageBreak())
-
-    # Insert corner logo on each page except cover
-    def corner_logo():
-        return LogoRightCorner(logo_path) if show_logo else None
-
-    # Line filtering + formatting
-    def is_bare_url(line):
-        return line.startswith("http://") or line.startswith("https://")
-
-    def strip_markdown(text: str) -> str:
-        return re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-
-    major_sections = {"restaurants", "hotels", "rental cars", "weather forecast"}
-
-    def parse_line(line):
-        line = line.strip()
-        if is_bare_url(line):
-            return None
-
-        # Replace markdown links with clickable [Website Link]
-        line = re.sub(r'\[([^\]]+)\]\((https?://[^\)]+)\)', r'<link href="\2"><u>[Website Link]</u></link>', line)
-        line = strip_markdown(line)
-
-        # Major section (force page break + top-right logo)
-        if line.lower().replace(" ", "") in major_sections:
-            elements.append(PageBreak())
-            logo_flow = corner_logo()
-            if logo_flow:
-                elements.append(logo_flow)
-            return Paragraph(line.title(), styles['MainHeading'])
-
-        elif line.startswith("###") or line.startswith("####"):
-            cleaned = re.sub(r"#+", "", line).replace("■", "").strip()
-            return Paragraph(cleaned, styles['SubHeading'])
-
-        elif line.startswith("- "):
-            return Paragraph(line[2:].strip(), styles['NormalText'])
-
-        elif line:
-            return Paragraph(line, styles['NormalText'])
-
-        else:
-            return Spacer(1, 6)
-
-    # Build content
-    for raw_line in itinerary_text.splitlines():
-        element = parse_line(raw_line)
-        if element:
-            elements.append(element)
-            elements.append(Spacer(1, 4))
-
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.read()
-
-
 # Sidebar
 with st.sidebar:
     st.header("⚙️ Customize Your Trip")
@@ -151,6 +60,12 @@ st.session_state.setdefault('chat_summary', "")
 st.session_state.setdefault('city', "")
 st.session_state.setdefault('airport', "")
 st.session_state.setdefault('arrival_time', "")
+st.session_state.setdefault('itinerary_id', "")
+# Identifies this browser session to the backend, which keeps the trip context and chat per session
+st.session_state.setdefault('session_id', uuid.uuid4().hex)
+session_headers = {"X-Session-ID": st.session_state.session_id}
+st.session_state.setdefault('pdf_bytes', None)
+st.session_state.setdefault('map_html', None)
 
 st.title("AI Travel Planner")
 
@@ -176,20 +91,39 @@ if not st.session_state.is_generating:
             )
         }
         data = {"preferences": free_prefs, "top_k": num_suggestions}
-        with st.spinner("🧭 Generating itinerary..."):
-            resp = requests.post("http://localhost:8000/display-itinerary", files=files, data=data)
-        if resp.ok:
-            resp_data = resp.json()
-            st.session_state["itinerary_origin"] = resp_data.get("origin", "")
-            st.session_state["city"] = resp_data.get("city", "")
-            st.session_state["airport"] = resp_data.get("airport", "")
-            st.session_state["arrival_time"] = resp_data.get("arrival_time", "")
-
-            itinerary = resp_data.get("itinerary", {})
-            st.session_state.itinerary = itinerary.get("output", "") if isinstance(itinerary, dict) else itinerary
-            st.session_state.chat_answer = ""
-        else:
-            st.error(f"Error {resp.status_code}: {resp.text}")
+        status = st.status("🧭 Generating itinerary...", expanded=False)
+        live_itinerary = st.empty()
+        streamed_text, finished = "", False
+        try:
+            with requests.post("http://localhost:8000/display-itinerary/stream", files=files, data=data, headers=session_headers, stream=True) as resp:
+                if not resp.ok:
+                    st.error(f"Error {resp.status_code}: {resp.text}")
+                else:
+                    for event, payload in iter_sse(resp):
+                        if event == "progress":
+                            status.update(label=f"🧭 {payload.get('message', '')}")
+                        elif event == "meta":
+                            st.session_state["itinerary_origin"] = payload.get("origin", "")
+                            st.session_state["city"] = payload.get("city", "")
+                            st.session_state["airport"] = payload.get("airport", "")
+                            st.session_state["arrival_time"] = payload.get("arrival_time", "")
+                        elif event == "token":
+                            streamed_text += payload.get("text", "")
+                            live_itinerary.markdown(format_links(streamed_text), unsafe_allow_html=False)
+                        elif event == "error":
+                            st.error(f"Error {payload.get('status')}: {payload.get('detail')}")
+                        elif event == "done":
+                            st.session_state.itinerary = streamed_text
+                            st.session_state.itinerary_id = payload.get("itinerary_id", "")
+                            st.session_state.pdf_bytes = None
+                            st.session_state.map_html = None
+                            st.session_state.chat_answer = ""
+                            finished = True
+        except requests.RequestException as e:
+            st.error(f"Could not reach the backend: {e}")
+        status.update(label="🧭 Itinerary ready" if finished else "🧭 Generation stopped", state="complete")
+        # The full itinerary is rendered below once streaming finishes
+        live_itinerary.empty()
         st.session_state.is_generating = False
 else:
     if st.button("Cancel", use_container_width=True):
@@ -204,34 +138,50 @@ if st.session_state.uploaded and st.session_state.itinerary:
     with col_map:
         origin = st.session_state.get("itinerary_origin")
         destination = st.session_state.get("city")
-        if origin and destination:
+        if origin and destination and st.toggle("🗺️ Show route map"):
             st.markdown(f"### 🗺️ Route Preview: {origin} → {destination}")
-            route_map = build_basic_route_map(origin, destination)
-            if route_map:
-                st_folium(route_map, width=340, height=250)
+            # The backend renders the map once per itinerary; fetch it only when asked for
+            if st.session_state.map_html is None and st.session_state.itinerary_id:
+                try:
+                    resp = requests.get(f"http://localhost:8000/itinerary/{st.session_state.itinerary_id}/map")
+                    if resp.ok:
+                        st.session_state.map_html = resp.text
+                except requests.RequestException:
+                    pass
+            if st.session_state.map_html:
+                components.html(st.session_state.map_html, width=340, height=250)
             else:
-                st.warning("Could not generate map — check city names.")
+                route_map = build_basic_route_map(origin, destination)
+                if route_map:
+                    st_folium(route_map, width=340, height=250)
+                else:
+                    st.warning("Could not generate map — check city names.")
 
 # Show itinerary
 if st.session_state.itinerary:
     st.markdown("---")
     st.markdown(format_links(st.session_state.itinerary), unsafe_allow_html=False)
 
-    ### 🆕 PDF download button
-    destination = st.session_state.get("city", "").strip()
-    pdf_bytes = generate_pdf(st.session_state.itinerary, destination, logo_path="assets/logo.png")
-
-
-    safe_destination = re.sub(r'[^\w\- ]+', '', destination).replace(" ", "_").lower()
-    file_name = f"travel_itinerary_{safe_destination or 'destination'}.pdf"
-
-    st.download_button(
-        label="📄 Download Itinerary as PDF",
-        data=pdf_bytes,
-        file_name=file_name,
-        mime="application/pdf"
-    )
-
+    ### 🆕 PDF download button (rendered and cached by the backend on first request)
+    if st.session_state.itinerary_id:
+        if st.session_state.pdf_bytes is None:
+            if st.button("📄 Prepare PDF"):
+                with st.spinner("Preparing PDF..."):
+                    resp = requests.get(f"http://localhost:8000/itinerary/{st.session_state.itinerary_id}/pdf")
+                if resp.ok:
+                    st.session_state.pdf_bytes = resp.content
+                else:
+                    st.error(f"Error {resp.status_code}: {resp.text}")
+        if st.session_state.pdf_bytes is not None:
+            destination = st.session_state.get("city", "").strip()
+            safe_destination = re.sub(r'[^\w\- ]+', '', destination).replace(" ", "_").lower()
+            file_name = f"travel_itinerary_{safe_destination or 'destination'}.pdf"
+            st.download_button(
+                label="📄 Download Itinerary as PDF",
+                data=st.session_state.pdf_bytes,
+                file_name=file_name,
+                mime="application/pdf"
+            )
 
     # Chat form
     st.subheader("💬 Ask Anything About Your Trip")
@@ -241,7 +191,7 @@ if st.session_state.itinerary:
 
     if submitted and user_query:
         with st.spinner("Thinking..."):
-            resp = requests.post("http://localhost:8000/ask", json={"user_query": user_query})
+            resp = requests.post("http://localhost:8000/ask", json={"user_query": user_query}, headers=session_headers)
         if resp.ok:
             result = resp.json()
             st.session_state.chat_answer = result.get("answer", "")
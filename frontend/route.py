@@ -1,31 +1,134 @@
+import os
+import csv
+import sqlite3
+import threading
 import folium
-from geopy.geocoders import Nominatim
 
-geolocator = Nominatim(user_agent="travel_planner")
+# Local geocoding data: worldcities.csv (lat/lng columns), shared with the backend
+WORLDCITIES_PATHS = [
+    os.getenv("WORLDCITIES_PATH", ""),
+    os.path.join("data", "worldcities.csv"),
+    os.path.join("..", "backend", "data", "worldcities.csv"),
+]
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join("cache", "geocode.sqlite3"))
+NOMINATIM_FALLBACK = os.getenv("GEOCODER_NOMINATIM_FALLBACK", "true").lower() in ("1", "true", "yes")
 
-def get_coords(city_name: str) -> list[float] | None:
-    """
-    Fetches the geographic coordinates (latitude, longitude) for a given city name.
+_city_coords: dict[str, list[float]] | None = None
+_memo: dict[str, list[float] | None] = {}
+_lock = threading.Lock()
+_cache_conn: sqlite3.Connection | None = None
+_geolocator = None
 
-    Args:
-        city_name (str): The name of the city to geocode.
 
-    Returns:
-        list[float] | None: A list [latitude, longitude] if found, else None.
+def _normalize(city_name: str) -> str:
+    return " ".join(city_name.casefold().split())
+
+
+def _load_city_coords() -> dict[str, list[float]]:
     """
+    Loads city coordinates from worldcities.csv once (first row per name wins,
+    i.e. the most populous city with that name).
+    """
+    global _city_coords
+    if _city_coords is not None:
+        return _city_coords
+
+    coords = {}
+    path = next((p for p in WORLDCITIES_PATHS if p and os.path.exists(p)), None)
+    if path is None:
+        print("worldcities.csv not found; local geocoding disabled")
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    point = [float(row["lat"]), float(row["lng"])]
+                except (KeyError, TypeError, ValueError):
+                    continue
+                for name in (row.get("city"), row.get("city_ascii")):
+                    if name:
+                        coords.setdefault(_normalize(name), point)
+        print(f"Loaded {len(coords)} city coordinates from {path}")
+    _city_coords = coords
+    return coords
+
+
+def _persistent_cache() -> sqlite3.Connection | None:
+    global _cache_conn
+    if _cache_conn is None:
+        try:
+            os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH) or ".", exist_ok=True)
+            _cache_conn = sqlite3.connect(GEOCODE_CACHE_PATH, check_same_thread=False, isolation_level=None)
+            _cache_conn.execute("CREATE TABLE IF NOT EXISTS geocode (city TEXT PRIMARY KEY, lat REAL, lng REAL, source TEXT)")
+        except sqlite3.Error as e:
+            print("Geocode cache unavailable:", e)
+            return None
+    return _cache_conn
+
+
+def _geocode_nominatim(city_name: str) -> list[float] | None:
+    global _geolocator
     try:
-        print(f"Geocoding city: {city_name}")
-        location = geolocator.geocode(city_name, timeout=10)
+        if _geolocator is None:
+            from geopy.geocoders import Nominatim
+            _geolocator = Nominatim(user_agent="travel_planner")
+        print(f"Geocoding city via Nominatim: {city_name}")
+        location = _geolocator.geocode(city_name, timeout=10)
         if location:
-            print(f"Found: {city_name} at {location.latitude}, {location.longitude}")
             return [location.latitude, location.longitude]
-        print(f"NOT FOUND: {city_name}")
         return None
     except Exception as e:
         print("Geopy error:", e)
         return None
 
 
+def get_coords(city_name: str) -> list[float] | None:
+    """
+    Fetches the geographic coordinates (latitude, longitude) for a given city name.
+
+    Lookups go through an in-process memo and a persistent SQLite cache, then the
+    local worldcities.csv data. Nominatim is only queried for names that are not
+    in the local data (and can be disabled with GEOCODER_NOMINATIM_FALLBACK=false).
+
+    Args:
+        city_name (str): The name of the city to geocode (as corrected by the backend).
+
+    Returns:
+        list[float] | None: A list [latitude, longitude] if found, else None.
+    """
+    if not city_name or not city_name.strip():
+        return None
+    key = _normalize(city_name)
+
+    with _lock:
+        if key in _memo:
+            return _memo[key]
+
+        conn = _persistent_cache()
+        if conn is not None:
+            row = conn.execute("SELECT lat, lng FROM geocode WHERE city = ?", (key,)).fetchone()
+            if row:
+                _memo[key] = [row[0], row[1]]
+                return _memo[key]
+
+        coords, source = _load_city_coords().get(key), "worldcities"
+
+    # Network lookup without the lock, so a slow Nominatim call does not block other sessions
+    if coords is None and NOMINATIM_FALLBACK:
+        coords, source = _geocode_nominatim(city_name), "nominatim"
+
+    with _lock:
+        if _memo.get(key) is not None:
+            # Resolved by another session in the meantime
+            return _memo[key]
+        if coords is None:
+            print(f"NOT FOUND: {city_name}")
+        elif conn is not None:
+            conn.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", (key, coords[0], coords[1], source))
+        # Misses are memoized in-process only, so a later data update can still resolve them
+        _memo[key] = coords
+        return coords
+
+
 def build_basic_route_map(origin_city: str, dest_city: str) -> folium.Map:
     """
     Builds a Folium route map between two cities using their coordinates.